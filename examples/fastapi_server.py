@@ -2,13 +2,23 @@
 
 Run:
     uvicorn examples.fastapi_server:app --reload
+
+or with several worker processes (see `scripts/serve.py`):
+    python scripts/serve.py examples.fastapi_server:app --workers 4
 """
 
+import asyncio
+import functools
+import logging
 import os
 import sys
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
 # Import local `langchain_ollama` lazily inside `_get_llm()` to avoid modifying
@@ -17,13 +27,53 @@ from pydantic import BaseModel
 # Load environment variables from .env at repository root (optional)
 load_dotenv()
 
-app = FastAPI()
-MODEL = os.environ.get("OLLAMA_MODEL")
+
+@asynccontextmanager
+async def lifespan(app):
+    # Optionally refresh /health in the background every N seconds.
+    interval = float(os.environ.get("OLLAMA_HEALTH_INTERVAL", "0"))
+    if interval > 0 and MODEL:
+        _get_health_monitor().start(interval)
+    yield
+    if health_monitor is not None:
+        await health_monitor.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+# Optional model routing, smallest model first, e.g. "llama3.2:1b=2048,llama3.1:8b"
+# (`=N`: longest prompt in tokens for that model). See langchain_ollama.router.
+ROUTER_MODELS = os.environ.get("OLLAMA_ROUTER_MODELS")
+MODEL = os.environ.get("OLLAMA_MODEL") or (
+    ROUTER_MODELS.split(",")[-1].partition("=")[0].strip() if ROUTER_MODELS else None
+)
+# Seconds a request may wait in the scheduler queue before it is dropped.
+QUEUE_TIMEOUT = float(os.environ.get("OLLAMA_QUEUE_TIMEOUT", "60"))
+# Upper bound in seconds for a whole request (queueing plus generation);
+# clients may ask for less with `timeout`. The model call is aborted when
+# it runs out.
+REQUEST_TIMEOUT = float(os.environ.get("OLLAMA_REQUEST_TIMEOUT", "120"))
+# OLLAMA_TRACE=1 records a span per request and per step of the model call
+# (GET /debug/trace) and enables GET /debug/profile; "otel" also emits the
+# spans through OpenTelemetry.
+TRACE = os.environ.get("OLLAMA_TRACE")
+# OLLAMA_DROP_THINKING=1 removes <think>...</think> reasoning from replies
+# (also while streaming) and trims surrounding whitespace.
+DROP_THINKING = os.environ.get("OLLAMA_DROP_THINKING")
+# When set, GET /admin/stats requires this value in an X-Admin-Token header.
+ADMIN_TOKEN = os.environ.get("OLLAMA_ADMIN_TOKEN")
+logger = logging.getLogger(__name__)
+
+# Ends a streamed reply whose generation failed after the first piece
+STREAM_ERROR_MARKER = "\n[error] "
+
 llm = None
+scheduler = None
+health_monitor = None
+response_cache = None
 
 
 def _get_llm():
-    global llm
+    global llm, response_cache
     if llm is None:
         if not MODEL:
             raise RuntimeError(
@@ -39,62 +89,431 @@ def _get_llm():
             sys.path.insert(0, os.path.join(repo_root, "src"))
             from langchain_ollama.ollama_wrapper import OllamaLLM
 
-        llm = OllamaLLM(model=MODEL)
+        recorder = None
+        if os.environ.get("OLLAMA_RECORD_PATH"):
+            from langchain_ollama.recording import RequestRecorder
+
+            recorder = RequestRecorder(os.environ["OLLAMA_RECORD_PATH"])
+        response_cache = None
+        if os.environ.get("OLLAMA_RESPONSE_CACHE"):
+            # SQLite file shared by all worker processes
+            from langchain_ollama.store import ResponseCache
+
+            ttl = os.environ.get("OLLAMA_RESPONSE_CACHE_TTL")
+            response_cache = ResponseCache(
+                os.environ["OLLAMA_RESPONSE_CACHE"], ttl=float(ttl) if ttl else None
+            )
+        # Opt-in micro-batching: requests arriving within the window are sent
+        # together (embeddings as one request).
+        window_ms = os.environ.get("OLLAMA_BATCH_WINDOW_MS")
+        settings = dict(
+            base_url=os.environ.get("OLLAMA_BASE_URL"),
+            system_prompt=os.environ.get("OLLAMA_SYSTEM_PROMPT"),
+            keep_alive=os.environ.get("OLLAMA_KEEP_ALIVE"),
+            recorder=recorder,
+            response_cache=response_cache,
+            batch_window=float(window_ms) / 1000 if window_ms else None,
+            max_batch_size=int(os.environ.get("OLLAMA_MAX_BATCH", "16")),
+        )
+        if DROP_THINKING:
+            from langchain_ollama.transforms import DropThinking, StripWhitespace
+
+            settings["transforms"] = [DropThinking(), StripWhitespace()]
+        if ROUTER_MODELS:
+            from langchain_ollama.router import ModelRouter, parse_routes
+
+            llm = ModelRouter(
+                parse_routes(ROUTER_MODELS), llm_factory=OllamaLLM, **settings
+            )
+        else:
+            llm = OllamaLLM(model=MODEL, **settings)
     return llm
 
 
+def _get_scheduler():
+    """Shared scheduler so interactive chat is not starved by batch work."""
+    global scheduler
+    if scheduler is None:
+        try:
+            from langchain_ollama.scheduler import PriorityClass, RequestScheduler
+        except Exception:
+            repo_root = os.path.dirname(os.path.dirname(__file__))
+            sys.path.insert(0, os.path.join(repo_root, "src"))
+            from langchain_ollama.scheduler import PriorityClass, RequestScheduler
+
+        interactive = int(os.environ.get("OLLAMA_INTERACTIVE_CONCURRENCY", "4"))
+        batch = int(os.environ.get("OLLAMA_BATCH_CONCURRENCY", "1"))
+        scheduler = RequestScheduler(
+            classes=[
+                PriorityClass("interactive", priority=0, max_concurrency=interactive),
+                PriorityClass("batch", priority=10, max_concurrency=batch),
+            ],
+            max_concurrency=max(interactive, batch),
+        )
+    return scheduler
+
+
+def _get_health_monitor():
+    """Shared monitor probing OLLAMA_MODEL plus any OLLAMA_HEALTH_MODELS."""
+    global health_monitor
+    if health_monitor is None:
+        try:
+            from langchain_ollama.health import HealthMonitor, ProbeTarget
+        except Exception:
+            repo_root = os.path.dirname(os.path.dirname(__file__))
+            sys.path.insert(0, os.path.join(repo_root, "src"))
+            from langchain_ollama.health import HealthMonitor, ProbeTarget
+
+        base_url = os.environ.get("OLLAMA_BASE_URL")
+        extra = [
+            ProbeTarget(m.strip(), base_url=base_url)
+            for m in os.environ.get("OLLAMA_HEALTH_MODELS", "").split(",")
+            if m.strip() and m.strip() != MODEL
+        ]
+        # A cached reply says nothing about Ollama, so with a response cache
+        # the primary model is probed through a wrapper of its own.
+        uncached = ProbeTarget(MODEL, base_url=base_url)
+
+        def targets():
+            # Resolved per check so the primary probe uses the live `llm`.
+            live = _get_llm()
+            primary = (
+                uncached if response_cache is not None else ProbeTarget(MODEL, llm=live)
+            )
+            return [primary, *extra]
+
+        health_monitor = HealthMonitor(
+            targets,
+            prompt=os.environ.get("OLLAMA_HEALTH_PROMPT", "Say hi in one sentence."),
+            timeout=float(os.environ.get("OLLAMA_HEALTH_TIMEOUT", "30")),
+            cache_seconds=float(os.environ.get("OLLAMA_HEALTH_CACHE_SECONDS", "5")),
+        )
+    return health_monitor
+
+
+def _get_tracing():
+    """The tracing module, recording once OLLAMA_TRACE is set."""
+    try:
+        from langchain_ollama import tracing
+    except Exception:
+        repo_root = os.path.dirname(os.path.dirname(__file__))
+        sys.path.insert(0, os.path.join(repo_root, "src"))
+        from langchain_ollama import tracing
+
+    if tracing.active() is None:
+        tracing.enable(opentelemetry=TRACE == "otel")
+    return tracing
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if not TRACE:
+        return await call_next(request)
+    name = f"http {request.method} {request.url.path}"
+    with _get_tracing().span(name, concurrent=True) as span:
+        response = await call_next(request)
+        span.set(status=response.status_code)
+        return response
+
+
+def _invoke(local_llm, text: str, **kwargs):
+    # The wrapper exposes a simple interface; it may be an LLM object or callable
+    if hasattr(local_llm, "__call__"):
+        return local_llm(text, **kwargs)
+    if hasattr(local_llm, "generate_text"):
+        return local_llm.generate_text(text, **kwargs)
+    # try to call generate via LangChain API
+    return local_llm._call(text, **kwargs)
+
+
+def _request_timeout(requested: Optional[float]) -> float:
+    return REQUEST_TIMEOUT if requested is None else min(requested, REQUEST_TIMEOUT)
+
+
+async def _schedule(
+    local_llm,
+    text: str,
+    priority: str,
+    session: Optional[str],
+    timeout: Optional[float] = None,
+    **kwargs,
+):
+    """Run one model call through the scheduler.
+
+    It may wait QUEUE_TIMEOUT seconds for a slot, and the whole request is
+    bounded by `timeout` (default REQUEST_TIMEOUT). On timeout or client
+    disconnect the `cancel` event aborts the model call's HTTP stream or
+    CLI process instead of leaving it running in its worker thread.
+    """
+    timeout = _request_timeout(timeout)
+    cancel = threading.Event()
+    try:
+        return await asyncio.wait_for(
+            _get_scheduler().run(
+                _invoke,
+                local_llm,
+                text,
+                cancel=cancel,
+                **kwargs,
+                priority=priority,
+                session=session,
+                timeout=min(QUEUE_TIMEOUT, timeout),
+            ),
+            timeout=timeout,
+        )
+    finally:
+        # Harmless once the call has finished
+        cancel.set()
+
+
 class Message(BaseModel):
     text: str
+    session_id: Optional[str] = None
+    timeout: Optional[float] = None
+    # Seconds the reply should take; with OLLAMA_ROUTER_MODELS it steers
+    # the choice of model.
+    latency_budget: Optional[float] = None
+
+
+class Batch(BaseModel):
+    texts: List[str]
+    session_id: Optional[str] = None
+    timeout: Optional[float] = None
 
 
 @app.post("/chat")
 async def chat(msg: Message):
-    # The wrapper exposes a simple interface; it may be an LLM object or callable
     try:
         local_llm = _get_llm()
     except RuntimeError as e:
         return {"error": str(e)}
 
-    if hasattr(local_llm, "__call__"):
-        text = local_llm(msg.text)
-    elif hasattr(local_llm, "generate_text"):
-        text = local_llm.generate_text(msg.text)
-    else:
-        # try to call generate via LangChain API
-        try:
-            text = local_llm._call(msg.text)
-        except Exception as e:
-            return {"error": str(e)}
+    from langchain_ollama.scheduler import DeadlineExceeded
+
+    extra = {}
+    if ROUTER_MODELS and msg.latency_budget is not None:
+        extra["latency_budget"] = msg.latency_budget
+    try:
+        text = await _schedule(
+            local_llm, msg.text, "interactive", msg.session_id, msg.timeout, **extra
+        )
+    except DeadlineExceeded:
+        return JSONResponse({"error": "request timed out in queue"}, status_code=503)
+    except (asyncio.TimeoutError, TimeoutError):
+        return JSONResponse({"error": "request timed out"}, status_code=504)
+    except Exception as e:
+        return {"error": str(e)}
     return {"reply": text}
 
 
-@app.get("/health")
-async def health():
-    """Lightweight health check for the configured model.
+@app.post("/chat/stream")
+async def chat_stream(msg: Message):
+    """Stream the reply as plain text while it is generated.
 
-    Returns JSON with ok=True if the model responds to a brief probe prompt.
+    The request holds an interactive scheduler slot until the stream ends;
+    a client disconnect cancels the model call.
     """
-    probe = os.environ.get("OLLAMA_HEALTH_PROMPT", "Say hi in one sentence.")
     try:
         local_llm = _get_llm()
     except RuntimeError as e:
-        return {"ok": False, "model": MODEL, "error": str(e)}
+        return {"error": str(e)}
+
+    from langchain_ollama.scheduler import DeadlineExceeded
+
+    loop = asyncio.get_running_loop()
+    pieces: asyncio.Queue = asyncio.Queue()
+    cancel = threading.Event()
+    timeout = _request_timeout(msg.timeout)
+    extra = {}
+    if ROUTER_MODELS and msg.latency_budget is not None:
+        extra["latency_budget"] = msg.latency_budget
+
+    def produce(text: str) -> None:
+        # Runs in a scheduler worker thread
+        for piece in local_llm.stream_text(
+            text, timeout=timeout, cancel=cancel, **extra
+        ):
+            loop.call_soon_threadsafe(pieces.put_nowait, piece)
+
+    job = asyncio.ensure_future(
+        _get_scheduler().run(
+            produce,
+            msg.text,
+            priority="interactive",
+            session=msg.session_id,
+            timeout=min(QUEUE_TIMEOUT, timeout),
+        )
+    )
+    # Queued after every piece, since those were queued before the job ended
+    job.add_done_callback(lambda _: pieces.put_nowait(None))
+    first = await pieces.get()
+    if first is None and job.exception() is not None:
+        # Failed before the first token: report it like /chat does
+        error = job.exception()
+        if isinstance(error, DeadlineExceeded):
+            return JSONResponse(
+                {"error": "request timed out in queue"}, status_code=503
+            )
+        if isinstance(error, TimeoutError):
+            return JSONResponse({"error": "request timed out"}, status_code=504)
+        return {"error": str(error)}
+
+    async def body():
+        try:
+            piece = first
+            while piece is not None:
+                yield piece
+                piece = await pieces.get()
+            error = None if job.cancelled() else job.exception()
+            if error is not None:
+                # The 200 status is already sent; end with an explicit marker
+                # rather than a reply that looks complete
+                logger.error("streamed reply failed", exc_info=error)
+                yield f"{STREAM_ERROR_MARKER}{str(error) or type(error).__name__}\n"
+        finally:
+            cancel.set()
+            # On a client disconnect the job ends with OllamaCancelledError;
+            # retrieve it so asyncio doesn't report it as unhandled
+            job.add_done_callback(lambda j: j.cancelled() or j.exception())
+
+    return StreamingResponse(body(), media_type="text/plain")
+
 
+@app.post("/batch")
+async def batch(req: Batch):
+    """Run several prompts at batch priority; interactive chat always goes first."""
     try:
-        if hasattr(local_llm, "__call__"):
-            out = local_llm(probe)
-        elif hasattr(local_llm, "generate_text"):
-            out = local_llm.generate_text(probe)
-        else:
-            out = local_llm._call(probe)
-        return {
-            "ok": True,
-            "model": MODEL,
-            "response_preview": (
-                out
-                if isinstance(out, str) and len(out) < 300
-                else (out[:300] + "..." if isinstance(out, str) else str(type(out)))
-            ),
-        }
+        local_llm = _get_llm()
+    except RuntimeError as e:
+        return {"error": str(e)}
+
+    results = await asyncio.gather(
+        *(
+            _schedule(local_llm, t, "batch", req.session_id, req.timeout)
+            for t in req.texts
+        ),
+        return_exceptions=True,
+    )
+    return {
+        "replies": [
+            (
+                {"error": str(r) or type(r).__name__}
+                if isinstance(r, BaseException)
+                else {"reply": r}
+            )
+            for r in results
+        ]
+    }
+
+
+class Embed(BaseModel):
+    texts: List[str]
+    model: Optional[str] = None
+
+
+@app.post("/embed")
+async def embed(req: Embed):
+    """Embedding vectors for `texts` (model: OLLAMA_EMBED_MODEL or the chat model).
+
+    With OLLAMA_BATCH_WINDOW_MS set, texts from concurrent requests are
+    coalesced into shared `/api/embed` calls.
+    """
+    try:
+        local_llm = _get_llm()
+    except RuntimeError as e:
+        return {"error": str(e)}
+
+    model = req.model or os.environ.get("OLLAMA_EMBED_MODEL") or MODEL
+    try:
+        vectors = await local_llm.aembed(req.texts, model=model)
     except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=502)
+    return {"model": model, "embeddings": vectors}
+
+
+@app.get("/health")
+async def health():
+    """Lightweight health check for the configured model(s).
+
+    Returns JSON with ok=True if every probed model responds to a brief probe
+    prompt. Top-level fields describe `OLLAMA_MODEL`; `probes` lists every
+    model in `OLLAMA_HEALTH_MODELS` with its latency. Results are cached for
+    `OLLAMA_HEALTH_CACHE_SECONDS` and probes never block the event loop.
+    """
+    try:
+        _get_llm()
+    except RuntimeError as e:
         return {"ok": False, "model": MODEL, "error": str(e)}
+
+    result = await _get_health_monitor().check()
+    probes = [{k: v for k, v in p.items() if k != "trace"} for p in result["probes"]]
+    return {
+        **probes[0],
+        "ok": result["ok"],
+        "checked_at": result["checked_at"],
+        "probes": probes,
+    }
+
+
+@app.get("/admin/stats")
+async def admin_stats(x_admin_token: Optional[str] = Header(default=None)):
+    """What the server is doing right now.
+
+    In-flight model calls (and the oldest one's age), scheduler queue
+    depth per class, thread pool utilisation, response cache hit rate,
+    recent latency percentiles and histograms, micro-batching and router
+    stats, and the models Ollama has loaded (`ollama ps`).
+    """
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        return JSONResponse({"error": "invalid admin token"}, status_code=403)
+    try:
+        from langchain_ollama import metrics
+    except Exception:
+        repo_root = os.path.dirname(os.path.dirname(__file__))
+        sys.path.insert(0, os.path.join(repo_root, "src"))
+        from langchain_ollama import metrics
+
+    stats = await asyncio.get_running_loop().run_in_executor(
+        None,
+        functools.partial(
+            metrics.snapshot,
+            scheduler=scheduler,
+            response_cache=response_cache,
+            base_url=os.environ.get("OLLAMA_BASE_URL"),
+        ),
+    )
+    if ROUTER_MODELS and llm is not None:
+        stats["router"] = llm.stats()
+    return stats
+
+
+@app.get("/debug/trace")
+async def debug_trace(clear: bool = False, summary: bool = False):
+    """Recorded spans as Chrome trace JSON (or per-span totals with `summary`).
+
+    Load the JSON in chrome://tracing or https://ui.perfetto.dev. Needs
+    OLLAMA_TRACE.
+    """
+    if not TRACE:
+        return JSONResponse({"error": "set OLLAMA_TRACE=1"}, status_code=404)
+    recorder = _get_tracing().active()
+    result = recorder.summary() if summary else recorder.export()
+    if clear:
+        recorder.clear()
+    return JSONResponse(result)
+
+
+@app.get("/debug/profile")
+async def debug_profile(seconds: float = 5.0, interval_ms: float = 5.0):
+    """Sample all threads for `seconds` of live traffic (at most 60).
+
+    Returns folded stacks for flamegraph.pl or speedscope. Needs
+    OLLAMA_TRACE.
+    """
+    if not TRACE:
+        return JSONResponse({"error": "set OLLAMA_TRACE=1"}, status_code=404)
+    tracing = _get_tracing()
+    stacks = await asyncio.get_running_loop().run_in_executor(
+        None, tracing.sample_stacks, min(seconds, 60.0), interval_ms / 1000
+    )
+    return PlainTextResponse(tracing.collapsed(stacks))
@@ -32,26 +32,22 @@ def run_example():
         repo_root = os.path.dirname(os.path.dirname(__file__))
         sys.path.insert(0, os.path.join(repo_root, "src"))
         from langchain_ollama.ollama_wrapper import OllamaLLM
+    from langchain_ollama.history import ConversationHistory
+
     llm = OllamaLLM(model=model)
     print("Contextual LangChain chat agent. Type 'exit' to quit.")
-    history = []  # List of (user, assistant) message tuples
+    history = ConversationHistory()  # compact transcript of earlier turns
     prompt = PromptTemplate.from_template("""{context}User: {user_input}\nAssistant:""")
     while True:
         user_input = input("User: ")
         if user_input.strip().lower() in ("exit", "quit"):
             break
-        history.append(("user", user_input))
-        # Build context string for this session
-        context = ""
-        for role, msg in history:
-            if role == "user":
-                context += f"User: {msg}\n"
-            else:
-                context += f"Assistant: {msg}\n"
-        prompt_text = prompt.format(context=context, user_input=user_input)
+        # The template adds the new user turn after the earlier ones
+        prompt_text = prompt.format(context=history.text, user_input=user_input)
         out = llm(prompt_text)
         print("Model:", out)
-        history.append(("assistant", out))
+        history.append("user", user_input)
+        history.append("assistant", out)
 
 
 if __name__ == "__main__":
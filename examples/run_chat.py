@@ -4,6 +4,7 @@ Run:
     python examples/run_chat.py
 """
 
+import asyncio
 import os
 import sys
 
@@ -55,7 +56,8 @@ def langchain_example():
         return
 
     try:
-        from langchain import LLMChain, PromptTemplate
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.runnables import RunnableParallel
 
         # Import OllamaLLM lazily so this example works without an editable install
         try:
@@ -65,14 +67,24 @@ def langchain_example():
             sys.path.insert(0, os.path.join(repo_root, "src"))
             from langchain_ollama.ollama_wrapper import OllamaLLM
 
-        # Some LangChain versions expect the model to follow their LLM base API
         llm = OllamaLLM(model=model)
-        prompt = PromptTemplate("{input}", input_variables=["input"])
-        chain = LLMChain(llm=llm, prompt=prompt)
-        prompt_text = "Write a short haiku about coding."
-        input_dict = {"input": prompt_text}
-        out = chain.run(input_dict)
-        print(out)
+        # Two branches fed by the same input; with `ainvoke` both model calls
+        # are in flight at once on the event loop.
+        chain = RunnableParallel(
+            haiku=PromptTemplate.from_template("Write a short haiku about {topic}.")
+            | llm,
+            tip=PromptTemplate.from_template("Give one practical tip about {topic}.")
+            | llm,
+        )
+        out = asyncio.run(chain.ainvoke({"topic": "coding"}))
+        print(out["haiku"])
+        print(out["tip"])
+
+        # `abatch` sends all prompts together instead of one after the other
+        replies = asyncio.run(
+            llm.abatch(["Name a prime number.", "Name a primary colour."])
+        )
+        print(replies)
     except Exception as e:
         print("LangChain example failed: possible missing LangChain or API mismatch", e)
 
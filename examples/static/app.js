@@ -53,8 +53,22 @@ form.addEventListener('submit', async (e) => {
   }
 });
 
+// Show the session's recent turns again after a reload or server restart
+async function restoreHistory() {
+  try {
+    const resp = await fetch('/api/history');
+    const data = await resp.json();
+    for (const turn of data.turns ?? []) {
+      appendMessage(turn.text, turn.role === 'user' ? 'user' : 'assistant');
+    }
+  } catch (err) {
+    // Nothing to restore
+  }
+}
+
 // Auto-focus input on load and after sending
 window.onload = () => {
+  restoreHistory();
   input.focus();
 };
 input.addEventListener('blur', () => setTimeout(() => input.focus(), 100));
@@ -1,20 +1,36 @@
 
 
+import asyncio
 import os
 import sys
+import threading
+from contextlib import asynccontextmanager
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
-from fastapi import FastAPI, Request, Depends, Cookie
-from fastapi.responses import JSONResponse, Response
+from fastapi import FastAPI, Request, Depends, Cookie, Header
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from uuid import uuid4
-from typing import Dict, List, Tuple
 
 load_dotenv()
 
-app = FastAPI(title="Ollama Web Chat")
+
+@asynccontextmanager
+async def lifespan(app):
+    # Open the SQLite stores (schema set-up included) in a worker thread, so
+    # requests never do it on the event loop
+    def open_stores():
+        _get_sessions()
+        _get_usage()
+        _get_response_cache()
+
+    await asyncio.get_running_loop().run_in_executor(None, open_stores)
+    yield
+
+
+app = FastAPI(title="Ollama Web Chat", lifespan=lifespan)
 
 # Allow local browsers during development
 app.add_middleware(
@@ -29,8 +45,233 @@ app.add_middleware(
 app.mount("/static", StaticFiles(directory="examples/static"), name="static")
 templates = Jinja2Templates(directory="examples/templates")
 
-# In-memory store for chat history per session (for demo; not for production)
-user_histories: Dict[str, List[Tuple[str, str]]] = {}
+# Chat history per session. In memory by default (ConversationHistory keeps
+# each transcript in one compact buffer); set OLLAMA_STATE_DB to a SQLite file
+# to share histories and usage between worker processes, e.g. when running
+# `uvicorn examples.web_app:app --workers 4`. The file is a ConversationArchive:
+# it also keeps each session's Ollama context, so chats continue after a
+# restart without re-sending their transcript. Sessions without a usable
+# context are primed with their last OLLAMA_HISTORY_TURNS turns.
+STATE_DB = os.environ.get("OLLAMA_STATE_DB")
+HISTORY_TURNS = int(os.environ.get("OLLAMA_HISTORY_TURNS", "40"))
+_sessions = None
+
+
+def _get_sessions():
+    global _sessions
+    if _sessions is None:
+        from langchain_ollama.store import ConversationArchive, MemorySessionStore
+
+        _sessions = ConversationArchive(STATE_DB) if STATE_DB else MemorySessionStore()
+    return _sessions
+
+
+def _next_prompt(history, msg):
+    """Prompt for the reply to `msg` after `history`, without storing `msg`."""
+    from langchain_ollama.history import ConversationHistory
+
+    return history.text + ConversationHistory([("user", msg)]).prompt("assistant")
+
+
+def _archived_reply(llm, archive, session_id, msg, stop, cancel=None):
+    """Reply to `msg` in an archived session, then archive both turns.
+
+    When the stored context covers every earlier turn only the new message
+    is sent; otherwise the recent turns are, and the context Ollama returns
+    is stored for the next message. Falls back to a plain transcript call
+    (which can also use the CLI) when the context call fails. Nothing is
+    written unless a reply came back, so a failed call leaves no dangling
+    user turn behind.
+    """
+    from langchain_ollama.history import ConversationHistory
+    from langchain_ollama.ollama_wrapper import (
+        OllamaCancelledError,
+        OllamaTimeoutError,
+    )
+
+    info = archive.info(session_id)
+    turns = info["turns"] if info else 0
+    stored = archive.context(session_id)
+    if stored is not None and stored[1] == turns:
+        context = stored[0]
+        prompt_text = ConversationHistory([("user", msg)]).prompt("assistant")
+    else:
+        context = None
+        recent = archive.load(session_id, recent=HISTORY_TURNS - 1)
+        prompt_text = _next_prompt(recent, msg)
+    try:
+        result, new_context = llm.complete_in_context(
+            prompt_text, context, stop=stop, cancel=cancel
+        )
+    except (OllamaTimeoutError, OllamaCancelledError):
+        raise
+    except Exception:
+        archive.set_context(session_id, None)
+        recent = archive.load(session_id, recent=HISTORY_TURNS - 1)
+        result, new_context = (
+            llm.complete(_next_prompt(recent, msg), stop=stop, cancel=cancel),
+            None,
+        )
+    archive.append(session_id, "user", msg)
+    seq = archive.append(
+        session_id, "assistant", result.text, tokens=result.completion_tokens
+    )
+    if new_context is not None:
+        archive.set_context(session_id, new_context, seq + 1)
+    return result
+
+
+# Requests queue per session so one chatty browser tab can't monopolise the
+# model; anything still queued after OLLAMA_QUEUE_TIMEOUT seconds is dropped.
+QUEUE_TIMEOUT = float(os.environ.get("OLLAMA_QUEUE_TIMEOUT", "60"))
+# Whole-request budget (queue + generation); the model call is aborted when
+# it runs out or the browser disconnects.
+REQUEST_TIMEOUT = float(os.environ.get("OLLAMA_REQUEST_TIMEOUT", "120"))
+_scheduler = None
+
+
+def _get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        from langchain_ollama.scheduler import RequestScheduler
+
+        _scheduler = RequestScheduler(
+            max_concurrency=int(os.environ.get("OLLAMA_INTERACTIVE_CONCURRENCY", "4"))
+        )
+    return _scheduler
+
+
+# Token usage per session, and optional per-session limits so one heavy user
+# can't saturate the model: OLLAMA_SESSION_RPM (requests per minute),
+# OLLAMA_SESSION_BURST and OLLAMA_SESSION_TOKENS_PER_MIN.
+_usage = None
+_limiter = None
+
+
+def _get_usage():
+    global _usage, _limiter
+    if _usage is None:
+        from langchain_ollama.store import SharedUsageTracker
+        from langchain_ollama.usage import SessionLimiter, UsageTracker
+
+        def env(name):
+            value = os.environ.get(name)
+            return float(value) if value else None
+
+        burst = env("OLLAMA_SESSION_BURST")
+        _limiter = SessionLimiter(
+            requests_per_minute=env("OLLAMA_SESSION_RPM"),
+            burst=int(burst) if burst else None,
+            tokens_per_minute=env("OLLAMA_SESSION_TOKENS_PER_MIN"),
+        )
+        # The limiter's buckets stay per process (with N workers a session can
+        # get up to N times the limits); usage totals are shared
+        _usage = SharedUsageTracker(STATE_DB) if STATE_DB else UsageTracker()
+    return _usage, _limiter
+
+
+_response_cache = None
+
+
+def _get_response_cache():
+    # OLLAMA_RESPONSE_CACHE=<sqlite file> answers repeated identical requests
+    # from a cache shared by all workers (OLLAMA_RESPONSE_CACHE_TTL seconds)
+    global _response_cache
+    path = os.environ.get("OLLAMA_RESPONSE_CACHE")
+    if path and _response_cache is None:
+        from langchain_ollama.store import ResponseCache
+
+        ttl = os.environ.get("OLLAMA_RESPONSE_CACHE_TTL")
+        _response_cache = ResponseCache(path, ttl=float(ttl) if ttl else None)
+    return _response_cache
+
+
+_recorder = None
+
+
+def _get_recorder():
+    # Set OLLAMA_RECORD_PATH to log every model call for offline replay
+    global _recorder
+    path = os.environ.get("OLLAMA_RECORD_PATH")
+    if path and _recorder is None:
+        from langchain_ollama.recording import RequestRecorder
+
+        _recorder = RequestRecorder(path)
+    return _recorder
+
+
+# OLLAMA_TRACE=1 records a span per request and per step of the model call
+# (GET /debug/trace, Chrome trace JSON) and enables GET /debug/profile;
+# "otel" also emits the spans through OpenTelemetry.
+TRACE = os.environ.get("OLLAMA_TRACE")
+
+
+def _get_tracing():
+    from langchain_ollama import tracing
+
+    if tracing.active() is None:
+        tracing.enable(opentelemetry=TRACE == "otel")
+    return tracing
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if not TRACE:
+        return await call_next(request)
+    name = f"http {request.method} {request.url.path}"
+    with _get_tracing().span(name, concurrent=True) as span:
+        response = await call_next(request)
+        span.set(status=response.status_code)
+        return response
+
+
+@app.get("/debug/trace")
+async def debug_trace(clear: bool = False, summary: bool = False):
+    """Recorded spans as Chrome trace JSON, or per-span totals with `summary`."""
+    if not TRACE:
+        return JSONResponse({"error": "set OLLAMA_TRACE=1"}, status_code=404)
+    recorder = _get_tracing().active()
+    result = recorder.summary() if summary else recorder.export()
+    if clear:
+        recorder.clear()
+    return JSONResponse(result)
+
+
+@app.get("/debug/profile")
+async def debug_profile(seconds: float = 5.0, interval_ms: float = 5.0):
+    """Folded stacks of all threads sampled for `seconds` (at most 60)."""
+    if not TRACE:
+        return JSONResponse({"error": "set OLLAMA_TRACE=1"}, status_code=404)
+    tracing = _get_tracing()
+    stacks = await asyncio.get_running_loop().run_in_executor(
+        None, tracing.sample_stacks, min(seconds, 60.0), interval_ms / 1000
+    )
+    return PlainTextResponse(tracing.collapsed(stacks))
+
+
+# Set OLLAMA_ADMIN_TOKEN to require it in an X-Admin-Token header.
+ADMIN_TOKEN = os.environ.get("OLLAMA_ADMIN_TOKEN")
+
+
+@app.get("/admin/stats")
+async def admin_stats(x_admin_token: str = Header(default=None)):
+    """In-flight calls, queue depth, pool utilisation, cache hit rate,
+    latency histograms and the models Ollama has loaded."""
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        return JSONResponse({"error": "invalid admin token"}, status_code=403)
+    from functools import partial
+    from langchain_ollama import metrics
+
+    stats = await asyncio.get_running_loop().run_in_executor(
+        None,
+        partial(
+            metrics.snapshot,
+            scheduler=_scheduler,
+            response_cache=_get_response_cache(),
+            base_url=os.environ.get("OLLAMA_BASE_URL"),
+        ),
+    )
+    return JSONResponse(stats)
 
 
 def _import_wrapper():
@@ -38,6 +279,36 @@ def _import_wrapper():
     from langchain_ollama.ollama_wrapper import OllamaLLM
     return OllamaLLM
 
+
+_health_monitor = None
+
+
+@app.get("/health")
+async def health():
+    """Probe OLLAMA_MODEL (and OLLAMA_HEALTH_MODELS) without blocking the loop."""
+    global _health_monitor
+    model = os.environ.get("OLLAMA_MODEL")
+    if not model:
+        return JSONResponse({"ok": False, "error": "OLLAMA_MODEL not set"})
+    if _health_monitor is None:
+        from langchain_ollama.health import HealthMonitor, ProbeTarget
+
+        base_url = os.environ.get("OLLAMA_BASE_URL")
+        names = [model] + [
+            m.strip()
+            for m in os.environ.get("OLLAMA_HEALTH_MODELS", "").split(",")
+            if m.strip() and m.strip() != model
+        ]
+        _health_monitor = HealthMonitor(
+            [ProbeTarget(m, base_url=base_url) for m in names],
+            timeout=float(os.environ.get("OLLAMA_HEALTH_TIMEOUT", "30")),
+            cache_seconds=float(os.environ.get("OLLAMA_HEALTH_CACHE_SECONDS", "5")),
+        )
+    result = await _health_monitor.check()
+    probes = [{k: v for k, v in p.items() if k != "trace"} for p in result["probes"]]
+    return JSONResponse({**result, "probes": probes})
+
+
 @app.get("/")
 async def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -55,31 +326,112 @@ async def chat_endpoint(
         return JSONResponse({"error": "empty message"}, status_code=400)
 
     # Assign a session id if not present
-    if not session_id:
+    new_session = not session_id
+    if new_session:
         session_id = str(uuid4())
-        response.set_cookie(key="session_id", value=session_id)
-
-    # Get or create history for this session
-    history = user_histories.setdefault(session_id, [])
-    history.append(("user", msg))
 
     model = os.environ.get("OLLAMA_MODEL")
     if not model:
         return JSONResponse({"error": "OLLAMA_MODEL not set"}, status_code=400)
 
+    from langchain_ollama.usage import QuotaExceeded
+
+    usage, limiter = _get_usage()
+    try:
+        limiter.check(session_id)
+    except QuotaExceeded as e:
+        retry_after = max(1, int(e.retry_after + 0.999))
+        return JSONResponse(
+            {"error": str(e), "retry_after": retry_after},
+            status_code=429,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    sessions = _get_sessions()
+
     OllamaLLM = _import_wrapper()
     try:
-        llm = OllamaLLM(model=model, base_url=os.environ.get("OLLAMA_BASE_URL"))
-        # Build context string for this session
-        context = ""
-        for role, message in history:
-            if role == "user":
-                context += f"User: {message}\n"
-            else:
-                context += f"Assistant: {message}\n"
-        prompt_text = context + "Assistant:"
-        out = llm(prompt_text)
-        history.append(("assistant", out))
-        return JSONResponse({"reply": out})
+        llm = OllamaLLM(
+            model=model,
+            base_url=os.environ.get("OLLAMA_BASE_URL"),
+            system_prompt=os.environ.get("OLLAMA_SYSTEM_PROMPT"),
+            keep_alive=os.environ.get("OLLAMA_KEEP_ALIVE"),
+            recorder=_get_recorder(),
+            response_cache=_get_response_cache(),
+        )
+        if STATE_DB:
+            call, args = _archived_reply, (llm, sessions, session_id, msg)
+        else:
+            call, args = llm.complete, (_next_prompt(sessions.load(session_id), msg),)
+        # Stop before the model starts inventing the user's next turn.
+        cancel = threading.Event()
+        try:
+            result = await asyncio.wait_for(
+                _get_scheduler().run(
+                    call,
+                    *args,
+                    stop=["\nUser:"],
+                    cancel=cancel,
+                    priority="interactive",
+                    session=session_id,
+                    timeout=QUEUE_TIMEOUT,
+                ),
+                timeout=REQUEST_TIMEOUT,
+            )
+        finally:
+            cancel.set()
+        limiter.charge(session_id, result)
+        # SharedUsageTracker writes to SQLite; keep it off the event loop
+        totals = await asyncio.get_running_loop().run_in_executor(
+            None, usage.record, session_id, result
+        )
+        if not STATE_DB:
+            # Only a successful exchange is recorded (archived sessions
+            # store theirs in _archived_reply)
+            sessions.append(session_id, "user", msg)
+            sessions.append(
+                session_id, "assistant", result.text, tokens=result.completion_tokens
+            )
+        reply = JSONResponse(
+            {"reply": result.text, "usage": result.usage(), "session_usage": totals}
+        )
+        if new_session:
+            # Set on the returned response; cookies on the injected
+            # `response` are dropped when a Response is returned directly.
+            reply.set_cookie(key="session_id", value=session_id)
+        return reply
+    except (asyncio.TimeoutError, TimeoutError):
+        return JSONResponse({"error": "request timed out"}, status_code=504)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.get("/api/history")
+async def history_endpoint(
+    limit: int = 50, session_id: str = Cookie(default=None, alias="session_id")
+):
+    """The caller's last `limit` turns, so a reloaded page can show them."""
+    if not session_id:
+        return JSONResponse({"turns": []})
+    sessions = _get_sessions()
+    if STATE_DB:
+        history = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: sessions.load(session_id, recent=limit)
+        )
+    else:
+        history = list(sessions.load(session_id))[-limit:] if limit > 0 else []
+    return JSONResponse(
+        {"turns": [{"role": role, "text": text} for role, text in history]}
+    )
+
+
+@app.get("/api/usage")
+async def usage_endpoint(session_id: str = Cookie(default=None, alias="session_id")):
+    """Token usage of the caller's session and of the whole server."""
+    usage, _ = _get_usage()
+
+    def read():
+        return {"session": usage.get(session_id) if session_id else None,
+                "total": usage.totals()}
+
+    return JSONResponse(await asyncio.get_running_loop().run_in_executor(None, read))
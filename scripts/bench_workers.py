@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+"""Benchmark requests/sec of an example server against worker count.
+
+Starts a fake Ollama HTTP backend (``langchain_ollama.fake``), then, for
+each worker count, serves the app with ``scripts/serve.py`` and drives
+``POST /chat`` from a pool of client threads for a fixed time. The fake
+backend answers immediately (or after ``--delay-ms``), so the numbers
+measure the serving stack itself: request parsing, the wrapper and the
+Ollama client.
+
+    python scripts/bench_workers.py --workers 1,2,4 --duration 10
+
+Expect scaling up to roughly the number of CPU cores.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_backend(delay_s: float = 0.0) -> Any:
+    """Serve `langchain_ollama.fake` over HTTP on a free local port.
+
+    Replies are one token long and take `delay_s` seconds.
+    """
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    src = os.path.join(repo_root, "src")
+    if src not in sys.path:
+        sys.path.insert(0, src)
+    from langchain_ollama.fake import FakeOllama, FakeOllamaServer
+
+    return FakeOllamaServer(FakeOllama(reply="ok", token_delay=delay_s)).start()
+
+
+def _wait_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/openapi.json")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def drive_load(
+    port: int, duration: float, concurrency: int, path: str = "/chat"
+) -> Dict[str, Any]:
+    """POST to `path` from `concurrency` keep-alive clients for `duration`."""
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(n: int) -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        body = json.dumps({"text": "Hi", "session_id": f"bench-{n}"})
+        headers = {"Content-Type": "application/json"}
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                conn.request("POST", path, body, headers)
+                resp = conn.getresponse()
+                ok = resp.status == 200 and "reply" in json.loads(resp.read())
+            except (OSError, http.client.HTTPException, ValueError):
+                conn.close()
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    began = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - began
+    latencies.sort()
+
+    def pct(p: float) -> Optional[float]:
+        if not latencies:
+            return None
+        return round(
+            latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2
+        )
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+    }
+
+
+def bench(
+    app: str,
+    workers: List[int],
+    duration: float,
+    concurrency: int,
+    delay_s: float = 0.0,
+) -> List[Dict[str, Any]]:
+    backend = start_fake_backend(delay_s)
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(
+        os.environ,
+        OLLAMA_MODEL="bench-model",
+        OLLAMA_BASE_URL=backend.url,
+        # Only the serving stack is measured; lift the per-process queue cap
+        OLLAMA_INTERACTIVE_CONCURRENCY=str(concurrency),
+    )
+    results = []
+    try:
+        for n in workers:
+            port = _free_port()
+            server = subprocess.Popen(
+                [
+                    sys.executable,
+                    os.path.join(repo_root, "scripts", "serve.py"),
+                    app,
+                    "--workers",
+                    str(n),
+                    "--port",
+                    str(port),
+                    "--log-level",
+                    "warning",
+                ],
+                cwd=repo_root,
+                env=env,
+            )
+            try:
+                _wait_ready(port)
+                drive_load(port, min(1.0, duration), concurrency)  # warm-up
+                results.append(
+                    {"workers": n, **drive_load(port, duration, concurrency)}
+                )
+            finally:
+                server.terminate()
+                server.wait(30)
+    finally:
+        backend.stop()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="examples.fastapi_server:app")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--delay-ms", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    results = bench(
+        args.app,
+        [int(n) for n in args.workers.split(",") if n],
+        args.duration,
+        args.concurrency,
+        args.delay_ms / 1000,
+    )
+    print(json.dumps({"cpus": os.cpu_count(), "results": results}, indent=2))
+    return 0 if all(r["requests"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
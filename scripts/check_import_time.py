@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""Import-time budget check for the wrapper module.
+
+Runs `python -X importtime` in a fresh interpreter and fails if importing
+`langchain_ollama.ollama_wrapper` exceeds the budget, or if it eagerly pulls
+in a heavy dependency that should only load on first use. Run it manually or
+from CI:
+
+    python scripts/check_import_time.py --budget-ms 150
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict
+
+MODULE = "langchain_ollama.ollama_wrapper"
+# Top-level packages that must not be imported just by importing MODULE.
+HEAVY = ("langchain", "langchain_core", "ollama", "httpx", "pydantic")
+
+
+def measure_import(module: str = MODULE, runs: int = 3) -> Dict[str, Any]:
+    """Import `module` in fresh interpreters and return the fastest run.
+
+    Returns the cumulative import time in milliseconds and the set of
+    top-level packages that were imported along the way.
+    """
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (os.path.join(repo_root, "src"), env.get("PYTHONPATH")) if p
+    )
+    best = None
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        cumulative_us, imported = 0, set()
+        for line in completed.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            parts = line.split("|")
+            if len(parts) != 3 or not parts[1].strip().isdigit():
+                continue
+            name = parts[2].strip()
+            imported.add(name.split(".")[0])
+            if name == module:
+                cumulative_us = int(parts[1])
+        if best is None or cumulative_us < best["cumulative_ms"] * 1000:
+            best = {"cumulative_ms": cumulative_us / 1000, "imported": imported}
+    return best
+
+
+def check_import_time(budget_ms: float = 150.0, module: str = MODULE) -> Dict[str, Any]:
+    result = measure_import(module)
+    heavy = sorted(set(HEAVY) & result["imported"])
+    return {
+        "ok": result["cumulative_ms"] <= budget_ms and not heavy,
+        "module": module,
+        "cumulative_ms": round(result["cumulative_ms"], 1),
+        "budget_ms": budget_ms,
+        "heavy_imports": heavy,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.environ.get("IMPORT_TIME_BUDGET_MS", "150")),
+    )
+    args = parser.parse_args()
+    res = check_import_time(args.budget_ms)
+    print(json.dumps(res))
+    sys.exit(0 if res["ok"] else 1)
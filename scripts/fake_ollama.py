@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""Run a fake Ollama server for load tests without a model.
+
+Serves `langchain_ollama.fake.FakeOllama` over HTTP with Ollama's API, so
+the example servers (or anything else) can point OLLAMA_BASE_URL at it:
+
+    python scripts/fake_ollama.py --port 11435 --token-delay-ms 20 \\
+        --load-delay 2 --error-rate 0.01 --max-parallel 4
+    OLLAMA_BASE_URL=http://127.0.0.1:11435 uvicorn examples.fastapi_server:app
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--reply", default=None, help="fixed reply text")
+    parser.add_argument("--token-delay-ms", type=float, default=0.0)
+    parser.add_argument("--prompt-token-delay-ms", type=float, default=0.0)
+    parser.add_argument("--load-delay", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--max-parallel", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.join(repo_root, "src"))
+    from langchain_ollama.fake import DEFAULT_REPLY, FakeOllama, FakeOllamaServer
+
+    fake = FakeOllama(
+        reply=args.reply or DEFAULT_REPLY,
+        token_delay=args.token_delay_ms / 1000,
+        prompt_token_delay=args.prompt_token_delay_ms / 1000,
+        load_delay=args.load_delay,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        max_parallel=args.max_parallel,
+    )
+    server = FakeOllamaServer(fake, args.host, args.port)
+    print(f"Fake Ollama listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
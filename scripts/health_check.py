@@ -1,76 +1,81 @@
 #!/usr/bin/env python
-"""Simple health check for configured Ollama model.
+"""Simple health check for configured Ollama model(s).
 
-This script attempts a lightweight prompt to the model and reports status as JSON.
+This script sends a lightweight prompt to each model and reports status as
+JSON. Several models are probed concurrently:
+
+    python scripts/health_check.py                 # OLLAMA_MODEL
+    python scripts/health_check.py llama2 mistral  # or OLLAMA_HEALTH_MODELS
 """
+import asyncio
 import json
 import os
 import sys
-import traceback
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+def _import_health():
+    # Ensure the repository package path is importable
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    src = os.path.join(repo_root, "src")
+    if src not in sys.path:
+        sys.path.insert(0, src)
+    from langchain_ollama import health
+
+    return health
+
+
 def check_health(
     model: Optional[str] = None,
     probe: Optional[str] = None,
     llm: Any = None,
+    models: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
 ) -> Dict[str, Any]:
-    """Check the configured model and return a dict with the result.
+    """Check the configured model(s) and return a dict with the result.
 
     - model: override the model name (default reads from OLLAMA_MODEL)
     - probe: override the probe prompt
     - llm: optionally provide an already-constructed LLM object (for testing)
+    - models: probe several models concurrently; the result then holds an
+      aggregated `ok` plus one entry per model under `probes`
+    - timeout: per-probe timeout in seconds (default OLLAMA_HEALTH_TIMEOUT)
     """
-    model = model or os.environ.get("OLLAMA_MODEL", "")
-    if not model:
-        return {"ok": False, "error": "OLLAMA_MODEL not set"}
+    if not models:
+        model = model or os.environ.get("OLLAMA_MODEL", "")
+        if not model:
+            return {"ok": False, "error": "OLLAMA_MODEL not set"}
 
     probe = probe or os.environ.get("OLLAMA_HEALTH_PROMPT", "Say hi in one sentence.")
-
-    # If an llm is injected (for tests), use it directly
-    if llm is None:
-        # Ensure the repository package path is importable
-        repo_root = os.path.dirname(os.path.dirname(__file__))
-        sys.path.insert(0, os.path.join(repo_root, "src"))
-
-        try:
-            from langchain_ollama.ollama_wrapper import (
-                OllamaLLM,
-            )
-        except Exception as e:  # pragma: no cover - import-time failures
-            err_msg = "Cannot import wrapper: " + str(e)
-            return {"ok": False, "error": err_msg}
-
-        llm = OllamaLLM(model=model)
+    timeout = timeout or float(os.environ.get("OLLAMA_HEALTH_TIMEOUT", "60"))
 
     try:
-        if hasattr(llm, "__call__"):
-            out = llm(probe)
-        else:
-            out = llm._call(probe)
-
-        if isinstance(out, str) and len(out) < 300:
-            preview = out
-        elif isinstance(out, str):
-            preview = out[:300] + "..."
-        else:
-            preview = str(type(out))
+        health = _import_health()
+    except Exception as e:  # pragma: no cover - import-time failures
+        err_msg = "Cannot import wrapper: " + str(e)
+        return {"ok": False, "error": err_msg}
 
-        return {"ok": True, "model": model, "response_preview": preview}
+    base_url = os.environ.get("OLLAMA_BASE_URL")
+    if models:
+        targets = [health.ProbeTarget(m, base_url=base_url) for m in models]
+        return asyncio.run(health.probe_all(targets, probe, timeout))
 
-    except Exception as e:
-        # Distinguish Ollama-specific client errors when possible
-        err = str(e)
-        tb = traceback.format_exc()
-        return {"ok": False, "model": model, "error": err, "trace": tb}
+    target = health.ProbeTarget(model, base_url=base_url, llm=llm)
+    return asyncio.run(health.probe(target, probe, timeout))
 
 
 if __name__ == "__main__":
-    res = check_health()
+    names = sys.argv[1:] or [
+        m.strip() for m in os.environ.get("OLLAMA_HEALTH_MODELS", "").split(",")
+    ]
+    names = [n for n in names if n]
+    res = check_health(
+        models=names if len(names) > 1 else None, model=next(iter(names), None)
+    )
     print(json.dumps(res))
     if res.get("ok"):
         sys.exit(0)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""Replay a recorded request log against a real or fake Ollama server.
+
+Record traffic by passing `recorder=RequestRecorder(path)` to `OllamaLLM`
+(the FastAPI examples do this when OLLAMA_RECORD_PATH is set), then:
+
+    python scripts/replay_requests.py requests.jsonl --speed 4
+    python scripts/replay_requests.py requests.jsonl --speed 0 \
+        --base-url http://host:11434
+
+`--speed 1` keeps the original inter-arrival times, `--speed N` is N times
+faster and `--speed 0` sends requests as fast as `--concurrency` allows.
+Prints a JSON report with throughput and latency percentiles.
+"""
+import argparse
+import json
+import os
+import sys
+from itertools import islice
+
+
+def _import_recording():
+    # Ensure the repository package path is importable
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    src = os.path.join(repo_root, "src")
+    if src not in sys.path:
+        sys.path.insert(0, src)
+    from langchain_ollama import recording
+
+    return recording
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded request log.")
+    parser.add_argument("log", help="JSONL file written by RequestRecorder")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--base-url", default=os.environ.get("OLLAMA_BASE_URL"))
+    parser.add_argument("--model", default=None, help="override the recorded model")
+    parser.add_argument("--timeout", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    recording = _import_recording()
+    records = list(islice(recording.read_records(args.log), args.limit))
+    call = recording.llm_caller(args.base_url, args.model, args.timeout)
+    report = recording.replay(records, call, args.speed, args.concurrency)
+    print(json.dumps(report))
+    return 0 if not report.get("errors") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
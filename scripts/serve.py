@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""Run an example server with several worker processes.
+
+Each uvicorn worker is a separate process with its own module globals, so
+chat histories, usage totals and the response cache move into a SQLite file
+shared by all workers (``OLLAMA_STATE_DB``, default ``.ollama_state.db``):
+
+    python scripts/serve.py examples.web_app:app --workers 4
+    python scripts/serve.py examples.fastapi_server:app --workers 4 --cache
+
+Gunicorn works the same way with the uvicorn worker class, as long as the
+environment variables are set:
+
+    OLLAMA_STATE_DB=.ollama_state.db gunicorn -w 4 \\
+        -k uvicorn.workers.UvicornWorker examples.web_app:app
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("app", help="ASGI app, e.g. examples.web_app:app")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="worker processes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--state-db",
+        default=os.environ.get("OLLAMA_STATE_DB", ".ollama_state.db"),
+        help="SQLite file for state shared between workers",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="answer repeated identical requests from the shared cache",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="record request spans and enable /debug/trace and /debug/profile",
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    if args.workers > 1:
+        os.environ["OLLAMA_STATE_DB"] = args.state_db
+    if args.cache:
+        os.environ.setdefault("OLLAMA_RESPONSE_CACHE", args.state_db)
+    if args.trace:
+        os.environ.setdefault("OLLAMA_TRACE", "1")
+
+    # Workers import the app by name; make `examples.*` and `src/` importable
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = [os.getcwd(), os.path.join(repo_root, "src")]
+    sys.path[:0] = [p for p in paths if p not in sys.path]
+    os.environ["PYTHONPATH"] = os.pathsep.join(
+        p for p in (*paths, os.environ.get("PYTHONPATH")) if p
+    )
+
+    import uvicorn
+
+    uvicorn.run(
+        args.app,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -32,12 +32,14 @@ if __name__ == "__main__":
 
 try:
     from langchain_ollama.ollama_wrapper import OllamaLLM
+    from langchain_ollama.transforms import DropThinking, StripWhitespace
 except Exception:
     print("Could not import Ollama wrapper")
     raise
 
 if __name__ == "__main__":
-    llm = OllamaLLM(model=MODEL)
+    # Reasoning models may print their chain of thought in <think> tags
+    llm = OllamaLLM(model=MODEL, transforms=[DropThinking(), StripWhitespace()])
     print("HAS_CALL" if hasattr(llm, "__call__") else "NO_CALL")
     try:
         if hasattr(llm, "__call__"):
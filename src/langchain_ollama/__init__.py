@@ -1,3 +1,21 @@
 """LangChain + Ollama integration package."""
 
-__all__ = ["ollama_wrapper"]
+__all__ = [
+    "batching",
+    "fake",
+    "health",
+    "history",
+    "langchain_llm",
+    "metrics",
+    "ollama_wrapper",
+    "prefix",
+    "recording",
+    "resilience",
+    "router",
+    "scheduler",
+    "store",
+    "structured",
+    "tracing",
+    "transforms",
+    "usage",
+]
@@ -0,0 +1,188 @@
+"""Micro-batching of concurrent requests.
+
+Under bursty load many tiny requests arrive within milliseconds of each
+other. A ``MicroBatcher`` holds the first request of a burst for a short
+window (or until ``max_batch`` requests are waiting), hands the whole group
+to one batch function and resolves each caller's future with its own
+result. While all ``max_inflight`` batches are busy, new requests keep
+queueing, so batches grow with load (continuous batching) instead of each
+request waiting for a slot on its own.
+
+The wrappers use it for embeddings, which Ollama accepts as one
+``/api/embed`` call per batch, and optionally for short generation prompts
+(see ``batch_window`` on ``OllamaLLM``).
+"""
+
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .resilience import LatencyTracker
+
+
+def _resolve(future: Future, done: Future) -> None:
+    """Give `future` the outcome of the work future `done`."""
+    try:
+        future.set_result(done.result())
+    except BaseException as e:
+        future.set_exception(e)
+
+
+class MicroBatcher:
+    """Coalesce items submitted within `window` seconds into one call.
+
+    Parameters:
+        fn: batch function taking a list of items and returning a list of
+            results in the same order; an exception instance in the result
+            list fails only that item's caller. A `Future` in the list
+            resolves its caller when it completes: `fn` may just start the
+            work, and the batch's slot is freed as soon as `fn` returns.
+        window: seconds to wait for more items after the first one
+        max_batch: largest batch handed to `fn`
+        max_inflight: batches that may run at the same time
+        name: label for threads and stats
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        window: float = 0.01,
+        max_batch: int = 16,
+        max_inflight: int = 2,
+        name: str = "batch",
+    ):
+        if max_batch < 1 or max_inflight < 1:
+            raise ValueError("max_batch and max_inflight must be >= 1")
+        self.fn = fn
+        self.window = window
+        self.max_batch = max_batch
+        self.max_inflight = max_inflight
+        self.name = name
+        self._cond = threading.Condition()
+        self._pending: Deque[Tuple[Any, Future, float]] = deque()
+        self._slots = threading.Semaphore(max_inflight)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_inflight, thread_name_prefix=f"ollama-{name}"
+        )
+        self._collector: Optional[threading.Thread] = None
+        self._closed = False
+        self._queue_wait = LatencyTracker()
+        self._batch_time = LatencyTracker()
+        self._counters = {"batches": 0, "items": 0, "errors": 0, "largest": 0}
+
+    def submit(self, item: Any) -> Future:
+        """Queue `item` and return a future for its result."""
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} batcher is closed")
+            self._pending.append((item, future, time.monotonic()))
+            if self._collector is None:
+                self._collector = threading.Thread(
+                    target=self._collect, name=f"ollama-{self.name}", daemon=True
+                )
+                self._collector.start()
+            self._cond.notify()
+        return future
+
+    def __call__(self, item: Any) -> Any:
+        return self.submit(item).result()
+
+    async def run(self, item: Any) -> Any:
+        import asyncio
+
+        return await asyncio.wrap_future(self.submit(item))
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch sizes plus queue-wait and batch-run latency percentiles."""
+
+        def ms(tracker: LatencyTracker, pct: float) -> Optional[float]:
+            value = tracker.percentile(pct)
+            return None if value is None else round(value * 1000, 3)
+
+        with self._cond:
+            counters = dict(self._counters)
+            pending = len(self._pending)
+        batches = counters["batches"]
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "pending": pending,
+            **counters,
+            "avg_batch_size": counters["items"] / batches if batches else None,
+            "queue_wait_ms": {
+                "p50": ms(self._queue_wait, 50),
+                "p95": ms(self._queue_wait, 95),
+            },
+            "batch_ms": {
+                "p50": ms(self._batch_time, 50),
+                "p95": ms(self._batch_time, 95),
+            },
+        }
+
+    def close(self) -> None:
+        """Flush pending items and stop the collector thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._collector is not None:
+            self._collector.join()
+        self._executor.shutdown(wait=True)
+
+    def _collect(self) -> None:
+        while True:
+            self._slots.acquire()
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    self._slots.release()
+                    return
+                close_at = self._pending[0][2] + self.window
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = close_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                size = min(len(self._pending), self.max_batch)
+                batch = [self._pending.popleft() for _ in range(size)]
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch: List[Tuple[Any, Future, float]]) -> None:
+        started = time.monotonic()
+        # Callers that gave up while the window was open are left out
+        live = [b for b in batch if b[1].set_running_or_notify_cancel()]
+        try:
+            if not live:
+                return
+            for _, _, queued in live:
+                self._queue_wait.record(started - queued)
+            try:
+                results = self.fn([item for item, _, _ in live])
+                if len(results) != len(live):
+                    raise ValueError(
+                        f"{self.name} batch returned {len(results)} results "
+                        f"for {len(live)} items"
+                    )
+            except BaseException as e:
+                results = [e] * len(live)
+            errors = 0
+            for (_, future, _), result in zip(live, results):
+                if isinstance(result, Future):
+                    result.add_done_callback(functools.partial(_resolve, future))
+                elif isinstance(result, BaseException):
+                    errors += 1
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            self._batch_time.record(time.monotonic() - started)
+            with self._cond:
+                self._counters["batches"] += 1
+                self._counters["items"] += len(live)
+                self._counters["errors"] += errors
+                self._counters["largest"] = max(self._counters["largest"], len(live))
+        finally:
+            self._slots.release()
@@ -0,0 +1,602 @@
+"""Fake Ollama backend for tests and load tests without a model.
+
+``FakeOllama`` answers chat, generate and embedding requests
+deterministically with configurable timing and failures:
+
+- ``token_delay``: seconds per generated token (streamed token by token)
+- ``prompt_token_delay``: seconds per prompt token before the first token
+- ``load_delay``: one-off delay the first time each model is used
+- ``error_rate`` / ``error_status``: fraction of requests failing with an
+  HTTP-style status (503 by default, like a model that is still loading);
+  ``fail_next(n)`` fails the next `n` requests
+- ``max_parallel``: requests served at once, like ``OLLAMA_NUM_PARALLEL``
+
+Use it in process by pointing a wrapper at a ``fake://`` URL, which
+replaces the ``ollama`` client module for that wrapper::
+
+    OllamaLLM(model="m", base_url="fake://?token_delay=0.01&error_rate=0.1")
+
+or ``register("slow", FakeOllama(...))`` and ``base_url="fake://slow"``.
+``FakeOllamaServer`` serves the same fake over HTTP (``/api/chat``,
+``/api/generate``, ``/api/embed``, ``/api/ps``, ``/api/tags``) for services that talk to
+``OLLAMA_BASE_URL``; ``scripts/fake_ollama.py`` runs one from the shell.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+from urllib.parse import parse_qsl, urlsplit
+
+from .history import estimate_tokens
+
+DEFAULT_REPLY = "This is a reply from the fake Ollama backend."
+
+
+class FakeResponseError(Exception):
+    """Injected failure; mirrors ``ollama.ResponseError``."""
+
+    def __init__(self, error: str, status_code: int = 503):
+        super().__init__(error)
+        self.error = error
+        self.status_code = status_code
+
+
+class FakeOllama:
+    """Deterministic stand-in for an Ollama server.
+
+    Parameters:
+        reply: reply text, or a function of the last user message
+        token_delay, prompt_token_delay, load_delay: simulated timings in
+            seconds (see the module docstring)
+        error_rate: fraction of requests that fail with `error_status`
+        error_status: HTTP status of injected failures
+        max_parallel: requests served at once; others queue (default:
+            unlimited)
+        embedding_dim: length of the (hash-derived) embedding vectors
+        seed: seed for the error injection
+    """
+
+    def __init__(
+        self,
+        reply: Union[str, Callable[[str], str]] = DEFAULT_REPLY,
+        token_delay: float = 0.0,
+        prompt_token_delay: float = 0.0,
+        load_delay: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        max_parallel: Optional[int] = None,
+        embedding_dim: int = 8,
+        seed: Optional[int] = 0,
+    ):
+        self.reply = reply
+        self.token_delay = token_delay
+        self.prompt_token_delay = prompt_token_delay
+        self.load_delay = load_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_parallel = max_parallel
+        self.embedding_dim = embedding_dim
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_parallel) if max_parallel else None
+        self._fail_next = 0
+        self._loaded: Dict[str, float] = {}
+        self._counters = {
+            "requests": 0,
+            "errors": 0,
+            "in_flight": 0,
+            "running": 0,
+            "peak": 0,
+        }
+
+    # -- module-like API used by the wrapper for fake:// URLs --------------
+
+    def Client(self, host: Optional[str] = None, **kwargs: Any) -> "FakeClient":
+        return FakeClient(self)
+
+    def AsyncClient(
+        self, host: Optional[str] = None, **kwargs: Any
+    ) -> "FakeAsyncClient":
+        return FakeAsyncClient(self)
+
+    def chat(self, model: str, messages: List[Dict[str, Any]], **kwargs: Any) -> Any:
+        return FakeClient(self).chat(model, messages, **kwargs)
+
+    def generate(self, model: str, prompt: str = "", **kwargs: Any) -> Any:
+        return FakeClient(self).generate(model, prompt, **kwargs)
+
+    def embed(self, model: str, input: Union[str, List[str]], **kwargs: Any) -> Any:
+        return FakeClient(self).embed(model, input, **kwargs)
+
+    # -- configuration and inspection ---------------------------------------
+
+    def fail_next(self, n: int = 1) -> None:
+        """Make the next `n` requests fail with `error_status`."""
+        with self._lock:
+            self._fail_next += n
+
+    def unload(self, model: Optional[str] = None) -> None:
+        """Forget loaded models so the next request pays `load_delay` again."""
+        with self._lock:
+            if model is None:
+                self._loaded.clear()
+            else:
+                self._loaded.pop(model, None)
+
+    def ps(self) -> Dict[str, Any]:
+        """Loaded models, in the shape of ``ollama.ps()``."""
+        with self._lock:
+            names = list(self._loaded)
+        return {"models": [{"name": n, "model": n, "size": 0} for n in names]}
+
+    def stats(self) -> Dict[str, int]:
+        """Request and injected-error counts; `in_flight` includes queued
+        requests, `running` and its `peak` only those holding a slot."""
+        with self._lock:
+            return dict(self._counters)
+
+    # -- request simulation ---------------------------------------------------
+
+    def _begin(self, model: str) -> float:
+        """Admit one request; returns the load delay it has to pay."""
+        with self._lock:
+            self._counters["requests"] += 1
+            fail = self._fail_next > 0 or (
+                self.error_rate and self._random.random() < self.error_rate
+            )
+            if fail:
+                self._fail_next = max(0, self._fail_next - 1)
+                self._counters["errors"] += 1
+                raise FakeResponseError(
+                    f"fake error for model {model!r}", self.error_status
+                )
+            self._counters["in_flight"] += 1
+            if model in self._loaded:
+                return 0.0
+            self._loaded[model] = time.time()
+            return self.load_delay
+
+    def _end(self) -> None:
+        with self._lock:
+            self._counters["in_flight"] -= 1
+
+    def _plan(self, model: str, messages: List[Dict[str, Any]], options: Any) -> Any:
+        """Reply tokens (after `num_predict` and `stop`) and prompt tokens."""
+        prompt = ""
+        for message in messages:
+            if message.get("role") == "user":
+                prompt = message.get("content") or ""
+        reply = self.reply(prompt) if callable(self.reply) else self.reply
+        tokens = re.findall(r"\s*\S+", reply) or [reply]
+        options = dict(options or {})
+        if options.get("num_predict") is not None and options["num_predict"] >= 0:
+            tokens = tokens[: options["num_predict"]]
+        text = "".join(tokens)
+        cut = min(
+            (i for i in (text.find(s) for s in options.get("stop") or ()) if i >= 0),
+            default=-1,
+        )
+        if cut >= 0:
+            kept, size = [], 0
+            for token in tokens:
+                if size + len(token) >= cut:
+                    if cut > size:
+                        kept.append(token[: cut - size])
+                    break
+                kept.append(token)
+                size += len(token)
+            tokens = kept
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        return tokens, prompt_tokens
+
+    def _final(
+        self,
+        model: str,
+        content: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        load: float,
+        started: float,
+    ) -> Dict[str, Any]:
+        ns = 1_000_000_000
+        return {
+            **_chunk(model, content),
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((time.monotonic() - started) * ns),
+            "load_duration": int(load * ns),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_tokens * self.prompt_token_delay * ns),
+            "eval_count": completion_tokens,
+            "eval_duration": int(completion_tokens * self.token_delay * ns),
+        }
+
+    def _token_ids(self, text: str) -> List[int]:
+        """Stand-in token ids for `text`, one per word."""
+        return [
+            int.from_bytes(hashlib.blake2b(w.encode(), digest_size=2).digest(), "big")
+            for w in text.split()
+        ]
+
+    def _vector(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode()).digest()
+        return [
+            digest[i % len(digest)] / 255.0 * 2 - 1 for i in range(self.embedding_dim)
+        ]
+
+
+def _chunk(model: str, content: str) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "message": {"role": "assistant", "content": content},
+        "done": False,
+    }
+
+
+class FakeClient:
+    """Blocking client for a `FakeOllama`, like ``ollama.Client``."""
+
+    def __init__(self, fake: FakeOllama):
+        self.fake = fake
+
+    def chat(
+        self,
+        model: str = "",
+        messages: Optional[List[Dict[str, Any]]] = None,
+        stream: bool = False,
+        options: Any = None,
+        **kwargs: Any,
+    ) -> Any:
+        if stream:
+            return self._stream(model, messages or [], options)
+        fake = self.fake
+        started = time.monotonic()
+        load = fake._begin(model)
+        try:
+            tokens, prompt_tokens = fake._plan(model, messages or [], options)
+            with _Slot(fake):
+                time.sleep(
+                    load
+                    + prompt_tokens * fake.prompt_token_delay
+                    + len(tokens) * fake.token_delay
+                )
+        finally:
+            fake._end()
+        return fake._final(
+            model, "".join(tokens), prompt_tokens, len(tokens), load, started
+        )
+
+    def _stream(
+        self, model: str, messages: List[Dict[str, Any]], options: Any
+    ) -> Iterator[Dict[str, Any]]:
+        # Like the real client, the request (and any error) happens on the
+        # first iteration
+        fake = self.fake
+        started = time.monotonic()
+        load = fake._begin(model)
+        try:
+            tokens, prompt_tokens = fake._plan(model, messages, options)
+            with _Slot(fake):
+                time.sleep(load + prompt_tokens * fake.prompt_token_delay)
+                for token in tokens:
+                    if fake.token_delay:
+                        time.sleep(fake.token_delay)
+                    yield _chunk(model, token)
+                yield fake._final(model, "", prompt_tokens, len(tokens), load, started)
+        finally:
+            fake._end()
+
+    def generate(
+        self,
+        model: str = "",
+        prompt: str = "",
+        system: Optional[str] = None,
+        context: Optional[List[int]] = None,
+        options: Any = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Non-streaming ``/api/generate``. The returned `context` is the
+        given one plus ids for this prompt and reply; prompt tokens count
+        only the new prompt, as Ollama reuses the cache behind `context`."""
+        messages = [{"role": "user", "content": prompt}]
+        if system and not context:
+            messages.insert(0, {"role": "system", "content": system})
+        resp = self.chat(model, messages, options=options)
+        text = resp.pop("message")["content"]
+        ids = self.fake._token_ids(f"{prompt} {text}")
+        return {**resp, "response": text, "context": list(context or ()) + ids}
+
+    def embed(
+        self, model: str = "", input: Union[str, List[str]] = "", **kwargs: Any
+    ) -> Dict[str, Any]:
+        fake = self.fake
+        texts = [input] if isinstance(input, str) else list(input)
+        time.sleep(fake._begin(model))
+        fake._end()
+        return {"model": model, "embeddings": [fake._vector(t) for t in texts]}
+
+    def ps(self) -> Dict[str, Any]:
+        return self.fake.ps()
+
+
+class FakeAsyncClient:
+    """asyncio client for a `FakeOllama`, like ``ollama.AsyncClient``."""
+
+    def __init__(self, fake: FakeOllama):
+        self.fake = fake
+
+    async def chat(
+        self,
+        model: str = "",
+        messages: Optional[List[Dict[str, Any]]] = None,
+        stream: bool = False,
+        options: Any = None,
+        **kwargs: Any,
+    ) -> Any:
+        if stream:
+            return self._stream(model, messages or [], options)
+        fake = self.fake
+        started = time.monotonic()
+        load = fake._begin(model)
+        try:
+            tokens, prompt_tokens = fake._plan(model, messages or [], options)
+            async with _AsyncSlot(fake):
+                await asyncio.sleep(
+                    load
+                    + prompt_tokens * fake.prompt_token_delay
+                    + len(tokens) * fake.token_delay
+                )
+        finally:
+            fake._end()
+        return fake._final(
+            model, "".join(tokens), prompt_tokens, len(tokens), load, started
+        )
+
+    async def _stream(
+        self, model: str, messages: List[Dict[str, Any]], options: Any
+    ) -> Any:
+        fake = self.fake
+        started = time.monotonic()
+        load = fake._begin(model)
+        try:
+            tokens, prompt_tokens = fake._plan(model, messages, options)
+            async with _AsyncSlot(fake):
+                await asyncio.sleep(load + prompt_tokens * fake.prompt_token_delay)
+                for token in tokens:
+                    if fake.token_delay:
+                        await asyncio.sleep(fake.token_delay)
+                    yield _chunk(model, token)
+                yield fake._final(model, "", prompt_tokens, len(tokens), load, started)
+        finally:
+            fake._end()
+
+    async def embed(
+        self, model: str = "", input: Union[str, List[str]] = "", **kwargs: Any
+    ) -> Dict[str, Any]:
+        return FakeClient(self.fake).embed(model, input)
+
+
+class _Slot:
+    """Holds one of the fake's `max_parallel` slots while generating."""
+
+    def __init__(self, fake: FakeOllama):
+        self.fake = fake
+        self.slots = fake._slots
+
+    def __enter__(self) -> None:
+        if self.slots is not None:
+            self.slots.acquire()
+        self._running(1)
+
+    def __exit__(self, *exc: Any) -> None:
+        self._running(-1)
+        if self.slots is not None:
+            self.slots.release()
+
+    def _running(self, delta: int) -> None:
+        fake = self.fake
+        with fake._lock:
+            fake._counters["running"] += delta
+            fake._counters["peak"] = max(
+                fake._counters["peak"], fake._counters["running"]
+            )
+
+
+class _AsyncSlot(_Slot):
+    async def __aenter__(self) -> None:
+        if self.slots is not None:
+            # Poll instead of blocking the event loop on the semaphore
+            while not self.slots.acquire(blocking=False):
+                await asyncio.sleep(0.001)
+        self._running(1)
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.__exit__()
+
+
+# fake:// URL -> FakeOllama, shared by every wrapper using that URL
+fakes: Dict[str, FakeOllama] = {}
+_fakes_lock = threading.Lock()
+
+_PARAMS = {
+    "token_delay": float,
+    "prompt_token_delay": float,
+    "load_delay": float,
+    "error_rate": float,
+    "error_status": int,
+    "max_parallel": int,
+    "embedding_dim": int,
+    "seed": int,
+    "reply": str,
+}
+
+
+def register(name: str, fake: FakeOllama) -> str:
+    """Make `fake` available as ``fake://<name>``; returns that URL."""
+    url = f"fake://{name}"
+    with _fakes_lock:
+        fakes[url] = fake
+    return url
+
+
+def get_fake(url: str) -> FakeOllama:
+    """The `FakeOllama` for a ``fake://`` URL, created on first use.
+
+    Query parameters configure a new fake, e.g.
+    ``fake://?token_delay=0.01&load_delay=1&error_rate=0.05``.
+    """
+    with _fakes_lock:
+        fake = fakes.get(url)
+        if fake is None:
+            params = {}
+            for key, value in parse_qsl(urlsplit(url).query):
+                if key not in _PARAMS:
+                    raise ValueError(f"unknown fake backend option {key!r} in {url}")
+                params[key] = _PARAMS[key](value)
+            fake = fakes[url] = FakeOllama(**params)
+        return fake
+
+
+class FakeOllamaServer:
+    """Serve a `FakeOllama` over HTTP with Ollama's API.
+
+    Parameters:
+        fake: the backend to serve (default: a new `FakeOllama`)
+        host, port: where to listen (port 0 picks a free one)
+
+    Use as a context manager or call `start()` / `stop()`; `url` is the
+    ``OLLAMA_BASE_URL`` to give clients.
+    """
+
+    def __init__(
+        self, fake: Optional[FakeOllama] = None, host: str = "127.0.0.1", port: int = 0
+    ):
+        self.fake = fake or FakeOllama()
+        self._server = ThreadingHTTPServer((host, port), _handler(self.fake))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-ollama", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def _handler(fake: FakeOllama) -> type:
+    client = FakeClient(fake)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            if self.path == "/api/ps":
+                self._json(fake.ps())
+            elif self.path == "/api/tags":
+                self._json(fake.ps())
+            elif self.path == "/api/version":
+                self._json({"version": "0.0.0-fake"})
+            elif self.path == "/":
+                self._send(200, b"Ollama is running", "text/plain")
+            else:
+                self._json({"error": "not found"}, 404)
+
+        def do_HEAD(self) -> None:
+            self._send(200, b"", "text/plain")
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            try:
+                if self.path == "/api/chat":
+                    self._chat(body)
+                elif self.path == "/api/generate":
+                    # Always answered in one piece, which is also a valid
+                    # one-line stream
+                    self._json(
+                        client.generate(
+                            body.get("model", ""),
+                            body.get("prompt") or "",
+                            system=body.get("system"),
+                            context=body.get("context"),
+                            options=body.get("options"),
+                        )
+                    )
+                elif self.path == "/api/embed":
+                    self._json(client.embed(body.get("model", ""), body.get("input")))
+                else:
+                    self._json({"error": "not found"}, 404)
+            except FakeResponseError as e:
+                self._json({"error": e.error}, e.status_code)
+
+        def _chat(self, body: Dict[str, Any]) -> None:
+            stream = body.get("stream", True)
+            result = client.chat(
+                body.get("model", ""),
+                body.get("messages") or [],
+                stream=stream,
+                options=body.get("options"),
+            )
+            if not stream:
+                self._json(result)
+                return
+            # Injected errors surface on the first chunk; answer them with
+            # their status code like Ollama does
+            first = next(result)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for chunk in itertools.chain([first], result):
+                    line = json.dumps(chunk).encode() + b"\n"
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client closed the stream (stop sequence, cancellation)
+                result.close()
+                self.close_connection = True
+
+        def _json(self, payload: Any, status: int = 200) -> None:
+            self._send(status, json.dumps(payload).encode(), "application/json")
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    return Handler
@@ -0,0 +1,175 @@
+"""Async health probes for one or more Ollama models/endpoints.
+
+Probes run concurrently, each in a worker thread with its own timeout, so a
+slow or dead model never blocks the event loop or the other probes.
+``HealthMonitor`` caches the aggregated result and can refresh it in the
+background on an interval; ``scripts/health_check.py`` and the FastAPI
+examples' ``/health`` routes both use it.
+"""
+
+import asyncio
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+DEFAULT_PROBE = "Say hi in one sentence."
+
+
+@dataclass
+class ProbeTarget:
+    """A model to probe; `llm` is built on first use when not given."""
+
+    model: str
+    base_url: Optional[str] = None
+    llm: Any = None
+
+    @property
+    def endpoint(self) -> str:
+        return self.base_url or "default"
+
+
+def _invoke(llm: Any, prompt: str, timeout: float) -> Any:
+    # The wrappers take the timeout per call, so the worker thread gives up
+    # with the probe instead of staying blocked on a hung server
+    if hasattr(llm, "complete"):
+        return llm.complete(prompt, timeout=timeout).text
+    # Otherwise an LLM object or a plain callable
+    if hasattr(llm, "__call__"):
+        return llm(prompt)
+    if hasattr(llm, "generate_text"):
+        return llm.generate_text(prompt)
+    return llm._call(prompt)
+
+
+def _preview(out: Any) -> str:
+    if isinstance(out, str) and len(out) < 300:
+        return out
+    if isinstance(out, str):
+        return out[:300] + "..."
+    return str(type(out))
+
+
+async def probe(target: ProbeTarget, prompt: str, timeout: float) -> Dict[str, Any]:
+    """Send `prompt` to one target and report status and latency."""
+    if target.llm is None:
+        from .ollama_wrapper import SimpleOllamaLLM
+
+        target.llm = SimpleOllamaLLM(
+            model=target.model, base_url=target.base_url, timeout=timeout
+        )
+    result: Dict[str, Any] = {"model": target.model, "endpoint": target.endpoint}
+    started = time.perf_counter()
+    try:
+        out = await asyncio.wait_for(
+            asyncio.to_thread(_invoke, target.llm, prompt, timeout), timeout
+        )
+    except asyncio.TimeoutError:
+        result.update(ok=False, error=f"probe timed out after {timeout}s")
+    except Exception as e:
+        result.update(ok=False, error=str(e), trace=traceback.format_exc())
+    else:
+        result.update(ok=True, response_preview=_preview(out))
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+async def probe_all(
+    targets: Sequence[ProbeTarget],
+    prompt: str = DEFAULT_PROBE,
+    timeout: float = 10.0,
+) -> Dict[str, Any]:
+    """Probe all targets concurrently and aggregate the results."""
+    results = await asyncio.gather(*(probe(t, prompt, timeout) for t in targets))
+    return {
+        "ok": bool(results) and all(r["ok"] for r in results),
+        "checked_at": time.time(),
+        "probes": list(results),
+    }
+
+
+class HealthMonitor:
+    """Cached, optionally self-refreshing health status.
+
+    Parameters:
+        targets: probe targets, or a callable returning them (resolved at
+            each check, so lazily-created LLMs can be picked up)
+        prompt: probe prompt
+        timeout: per-probe timeout in seconds
+        cache_seconds: how long a result is served before re-probing
+    """
+
+    def __init__(
+        self,
+        targets: Union[Sequence[ProbeTarget], Callable[[], Sequence[ProbeTarget]]],
+        prompt: str = DEFAULT_PROBE,
+        timeout: float = 10.0,
+        cache_seconds: float = 5.0,
+    ):
+        self._targets = targets
+        self.prompt = prompt
+        self.timeout = timeout
+        self.cache_seconds = cache_seconds
+        self._latest: Optional[Dict[str, Any]] = None
+        self._checked = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Any = None
+        self._task: Optional[asyncio.Task] = None
+
+    def targets(self) -> List[ProbeTarget]:
+        targets = self._targets() if callable(self._targets) else self._targets
+        return list(targets)
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Last aggregated result without probing (None before the first)."""
+        return self._latest
+
+    def invalidate(self) -> None:
+        self._latest = None
+
+    async def check(self, force: bool = False) -> Dict[str, Any]:
+        """Return the cached result, probing again once it is stale.
+
+        Concurrent callers share a single probe round.
+        """
+        if not force and self._fresh():
+            return self._latest
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        async with self._lock:
+            if not force and self._fresh():
+                return self._latest
+            result = await probe_all(self.targets(), self.prompt, self.timeout)
+            self._latest, self._checked = result, time.monotonic()
+            return result
+
+    def start(self, interval: float) -> asyncio.Task:
+        """Re-probe every `interval` seconds in a background task."""
+
+        async def _loop():
+            while True:
+                try:
+                    await self.check(force=True)
+                except Exception:
+                    pass
+                await asyncio.sleep(interval)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(_loop())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _fresh(self) -> bool:
+        return (
+            self._latest is not None
+            and time.monotonic() - self._checked < self.cache_seconds
+        )
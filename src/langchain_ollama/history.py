@@ -0,0 +1,152 @@
+"""Compact conversation history for many concurrent chat sessions.
+
+The examples render a chat as a plain transcript::
+
+    User: hello
+    Assistant: hi there
+
+``ConversationHistory`` stores that transcript once, as UTF-8 in a single
+growing ``bytearray``, with the turn boundaries in ``array`` offsets and
+each turn's role as a one-byte id into a shared role table. Appending a
+turn is amortised O(1) and there is no per-turn tuple or string object.
+The rendered text is kept along with how many bytes it covers, so the next
+render decodes only the turns appended since, and appending never touches
+it. The token count is a running total.
+"""
+
+import threading
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Shared role table: role name -> id, and id -> transcript label bytes
+_role_ids: Dict[str, int] = {}
+_role_names: List[str] = []
+_role_labels: List[bytes] = []
+_roles_lock = threading.Lock()
+
+
+def _role_id(role: str) -> int:
+    rid = _role_ids.get(role)
+    if rid is not None:
+        return rid
+    with _roles_lock:
+        rid = _role_ids.get(role)
+        if rid is None:
+            if len(_role_names) >= 256:
+                raise ValueError("too many distinct roles")
+            rid = len(_role_names)
+            _role_names.append(role)
+            _role_labels.append(f"{role.capitalize()}: ".encode())
+            _role_ids[role] = rid
+        return rid
+
+
+for _role in ("user", "assistant", "system"):
+    _role_id(_role)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+class ConversationHistory:
+    """Append-only chat transcript in a single buffer.
+
+    `append(role, text, tokens=None)` adds a turn; pass `tokens` when the
+    server reported the real count (e.g. `Completion.completion_tokens`),
+    otherwise it is estimated. `prompt()` returns the transcript followed
+    by the next speaker's label, ready to send to the model. Iterating
+    yields `(role, text)` pairs like the list of tuples it replaces.
+    """
+
+    __slots__ = (
+        "_buf",
+        "_starts",
+        "_ends",
+        "_roles",
+        "_tokens",
+        "_text",
+        "_rendered",
+        "_prompt",
+    )
+
+    def __init__(self, turns: Optional[List[Tuple[str, str]]] = None):
+        self._buf = bytearray()
+        # Byte offsets of each turn's message text within `_buf`
+        self._starts = array("I")
+        self._ends = array("I")
+        self._roles = bytearray()
+        self._tokens = 0
+        # `_buf[:_rendered]` decoded; extended lazily by `text`
+        self._text = ""
+        self._rendered = 0
+        self._prompt: Optional[Tuple[str, str]] = None
+        for role, text in turns or ():
+            self.append(role, text)
+
+    def append(self, role: str, text: str, tokens: Optional[int] = None) -> None:
+        rid = _role_id(role)
+        buf = self._buf
+        buf += _role_labels[rid]
+        self._starts.append(len(buf))
+        buf += text.encode()
+        self._ends.append(len(buf))
+        buf += b"\n"
+        self._roles.append(rid)
+        self._tokens += estimate_tokens(text) if tokens is None else tokens
+        self._prompt = None
+
+    @property
+    def token_count(self) -> int:
+        """Tokens in the transcript (reported where known, else estimated)."""
+        return self._tokens
+
+    @property
+    def text(self) -> str:
+        """The rendered transcript, one ``Role: message`` line per turn."""
+        end = len(self._buf)
+        if self._rendered < end:
+            # Turns end on a character boundary, so the tail decodes alone
+            self._text += self._buf[self._rendered : end].decode()
+            self._rendered = end
+        return self._text
+
+    def prompt(self, next_role: str = "assistant") -> str:
+        """Transcript plus ``"Assistant:"`` (or `next_role`'s label)."""
+        cached = self._prompt
+        if cached is not None and cached[0] == next_role:
+            return cached[1]
+        label = _role_labels[_role_id(next_role)].decode().rstrip()
+        rendered = self.text + label
+        self._prompt = (next_role, rendered)
+        return rendered
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the history's buffers."""
+        return (
+            len(self._buf)
+            + len(self._roles)
+            + (len(self._starts) + len(self._ends)) * self._starts.itemsize
+        )
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def __len__(self) -> int:
+        return len(self._roles)
+
+    def __getitem__(self, index: int) -> Tuple[str, str]:
+        start, end = self._starts[index], self._ends[index]
+        role = _role_names[self._roles[index]]
+        return role, self._buf[start:end].decode()
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for i in range(len(self._roles)):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return (
+            f"ConversationHistory(turns={len(self)}, tokens={self._tokens}, "
+            f"bytes={len(self._buf)})"
+        )
@@ -0,0 +1,205 @@
+"""LangChain `LLM` subclass of the Ollama wrapper.
+
+Kept in its own module because importing LangChain is slow; it is loaded
+the first time `langchain_ollama.ollama_wrapper.OllamaLLM` is accessed.
+Raises ImportError when no LangChain `LLM` base class is installed.
+"""
+
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Union
+
+from .ollama_wrapper import _fanout_pool, _gather, _OllamaCallMixin
+from .resilience import RetryPolicy
+from .usage import Completion
+
+try:
+    # Current LangChain releases keep the base class in langchain_core
+    from langchain_core.language_models.llms import LLM
+    from langchain_core.outputs import Generation, GenerationChunk, LLMResult
+except ImportError:
+    from langchain.llms.base import LLM
+    from langchain.schema import Generation, LLMResult
+    from langchain.schema.output import GenerationChunk
+
+
+class OllamaLLM(_OllamaCallMixin, LLM):
+    """LangChain-compatible LLM wrapper for Ollama.
+
+    Parameters:
+        model: name of the local Ollama model (e.g., `llama2`)
+        base_url: Ollama server URL for the Python client (default:
+            the client's own default / `OLLAMA_HOST`)
+        timeout: overall deadline in seconds for one call across retries,
+            the Python client and all CLI fallbacks (default: unbounded);
+            a call's own `timeout=` keyword overrides it
+        retry: `RetryPolicy` for transient Python-client errors
+            (default: a single attempt)
+        hedge_urls: extra Ollama endpoints; when set, a backup request
+            is sent to the next endpoint if no token has streamed
+            within `hedge_after` seconds, and the slower one is cancelled
+        hedge_after: fixed hedging delay (default: the endpoint's p95
+            time-to-first-token, or `DEFAULT_HEDGE_AFTER` until known)
+        num_predict: maximum number of tokens to generate
+        options: Ollama generation options (temperature, top_p, ...);
+            `stop` and per-call keyword arguments are merged in and
+            sent to the server
+        system_prompt: system message sent before every prompt; kept
+            byte-identical so the server can reuse its evaluated prefix
+            (see `prefix_stats()`)
+        keep_alive: how long Ollama keeps the model (and the cached
+            prefix) loaded, e.g. `"30m"` or `-1` to pin it
+        recorder: `recording.RequestRecorder` that logs every call for
+            offline replay
+        response_cache: `store.ResponseCache` answering repeated identical
+            requests, shared by all worker processes
+        batch_window: opt-in micro-batching; requests (and `embed`
+            texts) arriving within this many seconds are sent together
+        max_batch_size: largest micro-batch (default 16)
+        transforms: `transforms` stages (e.g. `DropThinking()`) applied
+            to every reply, chunk by chunk when streaming
+        ollama_kwargs: dict forwarded to the Python client where
+            supported (for example: temperature, system messages)
+    """
+
+    model: str
+    base_url: Optional[str] = None
+    timeout: Optional[float] = None
+    retry: Optional[RetryPolicy] = None
+    hedge_urls: Optional[List[str]] = None
+    hedge_after: Optional[float] = None
+    num_predict: Optional[int] = None
+    options: Optional[Dict[str, Any]] = None
+    system_prompt: Optional[str] = None
+    keep_alive: Optional[Union[float, str]] = None
+    recorder: Optional[Any] = None
+    response_cache: Optional[Any] = None
+    batch_window: Optional[float] = None
+    max_batch_size: int = 16
+    transforms: Optional[List[Any]] = None
+    ollama_kwargs: Dict[str, Any] = None
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> str:
+        return self._complete(prompt, stop, **kwargs).text
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> str:
+        # Runs on the event loop with `ollama.AsyncClient` where possible;
+        # cancelling this task aborts the request.
+        return (await self._acomplete(prompt, stop, **kwargs)).text
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        # `llm.stream()`: filtered text as it is generated
+        for text in self.stream_text(prompt, stop, **kwargs):
+            if run_manager is not None:
+                run_manager.on_llm_new_token(text)
+            yield GenerationChunk(text=text)
+
+    async def _astream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[GenerationChunk]:
+        async for text in self.astream_text(prompt, stop, **kwargs):
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(text)
+            yield GenerationChunk(text=text)
+
+    def _generate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        # LangChain's default calls `_call` once per prompt, one after the
+        # other; `batch()` hands over all prompts at once, so run them
+        # concurrently in the shared fan-out pool.
+        if len(prompts) == 1:
+            completions = [self._complete(prompts[0], stop, **kwargs)]
+        else:
+            completions = list(
+                _fanout_pool.map(lambda p: self._complete(p, stop, **kwargs), prompts)
+            )
+        return self._llm_result(completions)
+
+    async def _agenerate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        # All prompts in flight at once on the event loop (`abatch`,
+        # `RunnableParallel` branches); no thread per call.
+        completions = await _gather(
+            [self._acomplete(p, stop, **kwargs) for p in prompts]
+        )
+        return self._llm_result(completions)
+
+    def _llm_result(self, completions: Sequence[Completion]) -> LLMResult:
+        """One generation per prompt, with Ollama's usage for callbacks."""
+        prompt_tokens = sum(c.prompt_tokens or 0 for c in completions)
+        completion_tokens = sum(c.completion_tokens or 0 for c in completions)
+        return LLMResult(
+            generations=[
+                [Generation(text=c.text, generation_info=c.usage())]
+                for c in completions
+            ],
+            llm_output={
+                "model_name": self.model,
+                "token_usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            },
+        )
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Any:
+        """Runnable returning replies parsed into `schema`.
+
+        Same arguments as `complete_structured`, e.g. ``attempts=2``.
+        """
+        from langchain_core.runnables import RunnableLambda
+
+        def invoke(value: Any) -> Any:
+            prompt = self._convert_input(value).to_string()
+            return self.complete_structured(prompt, schema, **kwargs)
+
+        async def ainvoke(value: Any) -> Any:
+            prompt = self._convert_input(value).to_string()
+            return await self.acomplete_structured(prompt, schema, **kwargs)
+
+        return RunnableLambda(invoke, afunc=ainvoke, name="OllamaStructuredOutput")
+
+    def __call__(
+        self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any
+    ) -> str:
+        # LangChain 0.2+ dropped `LLM.__call__`; keep `llm(prompt)` working.
+        return self.invoke(prompt, stop=stop, **kwargs)
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model}
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama"
@@ -0,0 +1,155 @@
+"""Live request counters for admin and stats endpoints.
+
+``CallStats`` answers "how many model calls are running right now, for
+how long, and how fast were the recent ones" without slowing the calls
+it counts: starting a call is a dict insert, finishing one a dict pop
+plus a deque append (both atomic in CPython, so no lock is taken), and
+all aggregation happens when ``stats()`` is read.
+
+The wrappers report to ``ollama_wrapper.call_stats``; the example servers
+serve it, with scheduler, executor, cache and batching stats, at
+``GET /admin/stats``.
+"""
+
+import itertools
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class _Call:
+    __slots__ = ("stats", "model", "token")
+
+    def __init__(self, stats: "CallStats", model: str):
+        self.stats = stats
+        self.model = model
+
+    def __enter__(self) -> "_Call":
+        self.token = self.stats.begin(self.model)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.stats.end(self.token, error=exc_type is not None)
+        return False
+
+
+def _percentile(data: List[float], pct: float) -> Optional[float]:
+    if not data:
+        return None
+    index = min(len(data) - 1, max(0, round(pct / 100 * len(data)) - 1))
+    return round(data[index] * 1000, 3)
+
+
+class CallStats:
+    """In-flight calls and a rolling window of finished ones.
+
+    Parameters:
+        window: finished calls kept for the latency histogram and rates
+    """
+
+    def __init__(self, window: int = 2048):
+        self._ids = itertools.count()
+        self._in_flight: Dict[int, Tuple[str, float]] = {}
+        self._recent: Deque[Tuple[str, float, bool, float]] = deque(maxlen=window)
+
+    def track(self, model: str) -> _Call:
+        """Context manager counting the enclosed block as one call."""
+        return _Call(self, model)
+
+    def begin(self, model: str) -> int:
+        token = next(self._ids)
+        self._in_flight[token] = (model, time.monotonic())
+        return token
+
+    def end(self, token: int, error: bool = False) -> None:
+        entry = self._in_flight.pop(token, None)
+        if entry is not None:
+            now = time.monotonic()
+            self._recent.append((entry[0], now - entry[1], error, now))
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def stats(self) -> Dict[str, Any]:
+        """In-flight counts (and the oldest call's age, to spot stuck ones),
+        plus error rate and latency percentiles/histogram per model over
+        the recent window."""
+        now = time.monotonic()
+        running = list(self._in_flight.values())
+        recent = list(self._recent)
+        by_model: Dict[str, Dict[str, Any]] = {}
+        for model, started in running:
+            entry = by_model.setdefault(model, {"in_flight": 0, "oldest_s": 0.0})
+            entry["in_flight"] += 1
+            entry["oldest_s"] = max(entry["oldest_s"], round(now - started, 3))
+        latencies: Dict[str, List[float]] = {}
+        errors: Dict[str, int] = {}
+        for model, seconds, error, _ in recent:
+            latencies.setdefault(model, []).append(seconds)
+            errors[model] = errors.get(model, 0) + error
+        for model, samples in latencies.items():
+            entry = by_model.setdefault(model, {"in_flight": 0, "oldest_s": 0.0})
+            entry["recent"] = len(samples)
+            entry["errors"] = errors[model]
+            entry["latency_ms"] = self._latency(samples)
+        window_s = now - recent[0][3] if recent else 0.0
+        return {
+            "in_flight": len(running),
+            "oldest_in_flight_s": (
+                round(now - min(r[1] for r in running), 3) if running else None
+            ),
+            "recent": len(recent),
+            "recent_errors": sum(errors.values()),
+            "recent_per_s": round(len(recent) / window_s, 3) if window_s else None,
+            "latency_ms": self._latency([r[1] for r in recent]),
+            "models": by_model,
+        }
+
+    @staticmethod
+    def _latency(samples: List[float]) -> Dict[str, Any]:
+        data = sorted(samples)
+        histogram: Dict[str, int] = {f"<={b}": 0 for b in LATENCY_BUCKETS_MS}
+        histogram["inf"] = 0
+        for seconds in data:
+            ms = seconds * 1000
+            bucket = next((f"<={b}" for b in LATENCY_BUCKETS_MS if ms <= b), "inf")
+            histogram[bucket] += 1
+        return {
+            "p50": _percentile(data, 50),
+            "p95": _percentile(data, 95),
+            "p99": _percentile(data, 99),
+            "histogram": histogram,
+        }
+
+
+def snapshot(
+    scheduler: Any = None,
+    response_cache: Any = None,
+    base_url: Optional[str] = None,
+    ps_timeout: float = 2.0,
+) -> Dict[str, Any]:
+    """Everything an admin endpoint shows, in one dict.
+
+    Model calls (`call_stats`), thread pool utilisation, micro-batching,
+    and, when given, the `scheduler`'s queues and the `response_cache`'s
+    hit rate, plus the models Ollama at `base_url` has loaded. Blocks for
+    up to `ps_timeout` seconds on Ollama and reads the cache's SQLite file,
+    so async servers should run it in a thread.
+    """
+    from . import ollama_wrapper
+
+    out: Dict[str, Any] = {
+        "calls": ollama_wrapper.call_stats.stats(),
+        "scheduler": None if scheduler is None else scheduler.stats(),
+        "executors": ollama_wrapper.executor_stats(),
+        "batching": ollama_wrapper.batch_stats(),
+        "cache": None if response_cache is None else response_cache.stats(),
+    }
+    try:
+        out["loaded_models"] = ollama_wrapper.loaded_models(base_url, ps_timeout)
+    except Exception as e:
+        out["loaded_models"] = {"error": str(e) or type(e).__name__}
+    return out
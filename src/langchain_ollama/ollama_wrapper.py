@@ -6,35 +6,83 @@ Provides a LangChain-friendly interface and a CLI fallback when the
 Features:
 - Threaded async support for sync clients
 - Compact API compatible with `LLM` base classes (when available)
+- Cheap to import: the `ollama` client and LangChain are only imported on
+  first use (`OllamaLLM` resolves to the LangChain class on first access,
+  `SimpleOllamaLLM` never needs LangChain)
 """
 
-import asyncio
+import dataclasses
+import functools
+import importlib
 import json
+import os
 import re
 import shlex
 import shutil
+import signal
 import subprocess
+import threading
+import time
+import weakref
 from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Dict, List, Optional
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-try:
-    # LangChain LLM base class (wrap to multiple lines to satisfy flake8)
-    from langchain.llms.base import LLM
+from . import tracing
+from .batching import MicroBatcher
+from .metrics import CallStats
+from .prefix import PrefixSession, _response_field, get_prefix_session
+from .resilience import (
+    BreakerRegistry,
+    Deadline,
+    LatencyTracker,
+    RetryPolicy,
+    hedged_call,
+    is_request_error,
+)
+from .transforms import Pipeline
+from .usage import Completion
 
-    LC_HAS_LLM = True
-except Exception:
-    LC_HAS_LLM = False
 
-try:
-    import ollama
+class OllamaClientError(RuntimeError):
+    pass
 
-    FROM_OLLAMA = True
-except Exception:
-    FROM_OLLAMA = False
 
+class CircuitOpenError(OllamaClientError):
+    """Raised without contacting Ollama while a backend's circuit is open."""
 
-class OllamaClientError(RuntimeError):
-    pass
+
+class OllamaTimeoutError(OllamaClientError, TimeoutError):
+    """The call's deadline passed before Ollama finished answering."""
+
+
+class OllamaCancelledError(OllamaClientError):
+    """The caller cancelled the call (see the `cancel` argument)."""
+
+
+# One circuit breaker per backend/endpoint, shared by all `OllamaLLM`
+# instances. Tune with `circuit_breakers.configure(...)`.
+circuit_breakers = BreakerRegistry()
+
+# In-flight and recent generation calls of all wrappers in this process.
+call_stats = CallStats()
+
+# Time-to-first-token per endpoint; its p95 is the default hedging delay.
+first_token_latency: Dict[Optional[str], LatencyTracker] = {}
+# Hedge after this many seconds until an endpoint has enough samples.
+DEFAULT_HEDGE_AFTER = 2.0
+_MIN_HEDGE_SAMPLES = 20
 
 
 def _extract_assistant_content(resp: Any) -> str:
@@ -105,12 +153,73 @@ def _extract_assistant_content(resp: Any) -> str:
         return ""
 
 
-def _call_ollama_cli(model: str, prompt: str, timeout: int = 30) -> str:
+# How often a running CLI command checks whether its caller cancelled.
+_CANCEL_POLL = 0.05
+
+
+def _check_deadline(deadline: Deadline, what: str) -> None:
+    if deadline.cancelled():
+        raise OllamaCancelledError(f"{what} cancelled")
+    if deadline.expired():
+        raise OllamaTimeoutError(f"{what} timed out after {deadline.timeout}s")
+
+
+def _run_cli(
+    cmd: str, timeout: Optional[float], cancel: Optional[threading.Event]
+) -> Tuple[int, bytes, bytes]:
+    """Run one CLI command; with `cancel`, kill it as soon as the event is set."""
+    if cancel is None:
+        completed = subprocess.run(
+            cmd,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout,
+            check=False,
+        )
+        return completed.returncode, completed.stdout, completed.stderr
+    # A new session puts the shell and `ollama` in one process group, so
+    # killing the group stops the model run as well.
+    proc = subprocess.Popen(
+        cmd,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+    expires = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            stdout, stderr = proc.communicate(timeout=_CANCEL_POLL)
+            return proc.returncode, stdout, stderr
+        except subprocess.TimeoutExpired:
+            pass
+        timed_out = expires is not None and time.monotonic() >= expires
+        if cancel.is_set() or timed_out:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except (AttributeError, OSError):
+                proc.kill()
+            proc.communicate()
+            if cancel.is_set():
+                raise OllamaCancelledError("`ollama` CLI call cancelled")
+            raise subprocess.TimeoutExpired(cmd, timeout)
+
+
+def _call_ollama_cli(
+    model: str,
+    prompt: str,
+    deadline: Optional[Deadline] = None,
+) -> str:
     """Fallback to calling the `ollama` CLI if the Python client is unavailable.
 
     We try `ollama chat` first, then fall back to older or alternate
     CLI commands such as `ollama generate` or `ollama run`.
 
+    `deadline` is the overall budget shared by all attempts (unbounded
+    when it has no timeout); setting its `cancel` event kills the running
+    command.
+
     The CLI output parsing is tolerant: it returns stdout (str) when
     no structured output is available.
     """
@@ -121,210 +230,1571 @@ def _call_ollama_cli(model: str, prompt: str, timeout: int = 30) -> str:
         )
 
     # Try `ollama chat` which typically accepts --model and --prompt
-    # or positional args depending on CLI version. We call a generic
-    # command and return stdout. Adjust if your CLI supports JSON.
-    cmd = f"ollama chat {shlex.quote(model)} --prompt {shlex.quote(prompt)}"
+    # or positional args depending on CLI version. If chat fails, try
+    # `ollama generate` (older/newer CLI variations) and finally
+    # `ollama run MODEL PROMPT`, which some CLI versions accept positionally.
+    quoted_model, quoted_prompt = shlex.quote(model), shlex.quote(prompt)
+    commands = [
+        f"ollama chat {quoted_model} --prompt {quoted_prompt}",
+        f"ollama generate {quoted_model} --prompt {quoted_prompt}",
+        f"ollama run {quoted_model} {quoted_prompt}",
+    ]
+    errors = []
+    deadline = deadline or Deadline()
+    for cmd in commands:
+        if deadline.cancelled():
+            raise OllamaCancelledError("`ollama` CLI call cancelled")
+        budget = deadline.remaining()
+        if budget is not None and budget <= 0:
+            raise OllamaTimeoutError("`ollama` CLI timed out: deadline exceeded")
+        try:
+            returncode, stdout, stderr = _run_cli(cmd, budget, deadline.cancel)
+        except subprocess.TimeoutExpired as e:
+            raise OllamaTimeoutError(f"`ollama` CLI timed out: {e}")
+        if returncode == 0:
+            out = stdout.decode(errors="ignore").strip()
+            # Try to parse structured output
+            try:
+                return _extract_assistant_content(json.loads(out))
+            except Exception:
+                return _extract_assistant_content(out)
+        errors.append(stderr.decode(errors="ignore"))
+    raise OllamaClientError(f"`ollama` CLI failed: {chr(10).join(errors).strip()}")
+
+
+def _load_ollama() -> Any:
+    """Import the `ollama` client on first use; None if it isn't installed.
+
+    Values already set on this module (e.g. monkeypatched `ollama` or
+    `FROM_OLLAMA` in tests) take precedence over a fresh import.
+    """
+    g = globals()
+    if "FROM_OLLAMA" not in g:
+        try:
+            module = importlib.import_module("ollama")
+        except Exception:
+            g.setdefault("ollama", None)
+            g["FROM_OLLAMA"] = False
+        else:
+            g.setdefault("ollama", module)
+            g["FROM_OLLAMA"] = True
+    return g["ollama"] if g["FROM_OLLAMA"] else None
+
+
+def __getattr__(name: str) -> Any:
+    # PEP 562 hook: heavy names are only resolved when first accessed.
+    if name in ("ollama", "FROM_OLLAMA"):
+        _load_ollama()
+        return globals()[name]
+    if name in ("OllamaLLM", "LC_HAS_LLM"):
+        try:
+            from .langchain_llm import OllamaLLM
+        except ImportError:
+            globals().update(OllamaLLM=SimpleOllamaLLM, LC_HAS_LLM=False)
+        else:
+            globals().update(OllamaLLM=OllamaLLM, LC_HAS_LLM=True)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _client_module(base_url: Optional[str]) -> Any:
+    """Client module for `base_url`: the `ollama` package, or None.
+
+    ``fake://`` URLs get the in-process `fake.FakeOllama` instead.
+    """
+    if base_url is not None and base_url.startswith("fake:"):
+        from .fake import get_fake
+
+        return get_fake(base_url)
+    return _load_ollama()
+
+
+_clients: Dict[Any, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _get_client(base_url: Optional[str], timeout: Optional[float]) -> Any:
+    """Return a cached `ollama.Client` for this endpoint and timeout."""
+    key = (base_url, timeout)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _client_module(base_url).Client(
+                host=base_url, timeout=timeout
+            )
+        return client
+
+
+# An attempt starting within this long of its call shares the cached client.
+_FRESH_CLIENT_AFTER = 0.05
+
+
+def _client_for(base_url: Optional[str], deadline: Deadline) -> Any:
+    """`ollama.Client` whose HTTP timeout is what is left of `deadline`.
+
+    A call's first attempt uses the cached client for its timeout. Later
+    ones (retries, late hedges) are rare, so they get a client of their
+    own with exactly the remaining budget rather than a cache entry each.
+    """
+    remaining = deadline.remaining()
+    if remaining is None or deadline.timeout - remaining < _FRESH_CLIENT_AFTER:
+        return _get_client(base_url, deadline.timeout)
+    _check_deadline(deadline, "Ollama call")
+    return _client_module(base_url).Client(host=base_url, timeout=remaining)
+
+
+def _wait_future(future: Any, deadline: Deadline, what: str) -> Any:
+    """`future.result()`, abandoned once `deadline` expires or is cancelled."""
+    while True:
+        poll = deadline.remaining(_CANCEL_POLL if deadline.cancel else None)
+        try:
+            return future.result(poll)
+        except FutureTimeoutError:
+            if deadline.cancelled() or deadline.expired():
+                future.cancel()
+                _check_deadline(deadline, what)
+
+
+def _messages(prompt: str, system: Optional[str] = None) -> List[Dict[str, str]]:
+    """Chat messages for one turn; the system message is a stable prefix."""
+    user = {"role": "user", "content": prompt}
+    return [{"role": "system", "content": system}, user] if system else [user]
+
+
+def _call_ollama_client(
+    model: str,
+    prompt: str,
+    base_url: Optional[str] = None,
+    timeout: Optional[float] = None,
+    system: Optional[str] = None,
+    **kwargs: Any,
+) -> Any:
+    """Call the Python client, handling the API shapes seen across versions.
+
+    Returns the raw response, or None if no compatible API was found.
+    """
+    client_module = _client_module(base_url)
+    messages = _messages(prompt, system)
+    if (base_url or timeout is not None) and hasattr(client_module, "Client"):
+        return _get_client(base_url, timeout).chat(model, messages=messages, **kwargs)
+    if hasattr(client_module, "chat"):
+        return client_module.chat(model, messages=messages, **kwargs)
+    if hasattr(client_module, "Ollama"):
+        client = client_module.Ollama()
+        if hasattr(client, "chat"):
+            return client.chat(model, messages=messages, **kwargs)
+        if hasattr(client, "predict"):
+            text = f"{system}\n\n{prompt}" if system else prompt
+            return client.predict(model, text, **kwargs)
+    return None
+
+
+def _chunk_text(chunk: Any) -> str:
+    """Return the raw (unstripped) text of one streamed response chunk."""
+    message = chunk.get("message") if isinstance(chunk, dict) else None
+    if message is None:
+        message = getattr(chunk, "message", None)
+    if isinstance(message, dict):
+        return message.get("content") or ""
+    return getattr(message, "content", None) or ""
+
+
+def _find_stop(text: str, stop: Optional[List[str]], start: int = 0) -> int:
+    """Index of the earliest stop sequence in `text[start:]`, or -1."""
+    hits = [i for i in (text.find(seq, start) for seq in stop or () if seq) if i >= 0]
+    return min(hits) if hits else -1
+
+
+def _truncate_at_stop(text: str, stop: Optional[List[str]]) -> str:
+    index = _find_stop(text, stop)
+    return text if index < 0 else text[:index].rstrip()
+
+
+def _stream_ollama_client(
+    model: str,
+    prompt: str,
+    base_url: Optional[str],
+    timeout: Optional[float],
+    on_token: Any,
+    cancel: threading.Event,
+    stop: Optional[List[str]] = None,
+    system: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+    **kwargs: Any,
+) -> Tuple[str, Any]:
+    """Stream one chat reply from `base_url`.
+
+    Records time-to-first-token for the endpoint and closes the HTTP
+    stream as soon as `cancel` is set (used by `hedged_call`) or a `stop`
+    sequence shows up, so generation stops even if the server ignores the
+    `stop` option. Returns the text and the final (`done`) chunk, which
+    carries the token counts, or None if the stream was cut short.
+
+    `deadline` is checked between chunks: once it expires or its caller
+    cancels, the stream is closed (which makes Ollama stop generating) and
+    `OllamaTimeoutError` / `OllamaCancelledError` is raised. With a
+    deadline, the client's HTTP timeout is the budget left, not `timeout`.
+    """
+    started, traced_from = time.monotonic(), time.perf_counter()
+    client = (
+        _get_client(base_url, timeout)
+        if deadline is None
+        else _client_for(base_url, deadline)
+    )
+    stream = client.chat(
+        model, messages=_messages(prompt, system), stream=True, **kwargs
+    )
+    longest = max((len(seq) for seq in stop or ()), default=0)
+    text, final, first = "", None, True
     try:
-        completed = subprocess.run(
-            cmd,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=timeout,
-            check=False,
+        for chunk in stream:
+            if cancel.is_set():
+                break
+            if deadline is not None:
+                _check_deadline(deadline, "Ollama stream")
+            if first:
+                first = False
+                first_token_latency.setdefault(base_url, LatencyTracker()).record(
+                    time.monotonic() - started
+                )
+                tracing.record(
+                    "ollama.first_token",
+                    traced_from,
+                    time.perf_counter(),
+                    base_url=base_url,
+                )
+                on_token()
+            # Only the tail can contain a stop sequence that just completed.
+            start = max(0, len(text) - longest + 1)
+            text += _chunk_text(chunk)
+            index = _find_stop(text, stop, start)
+            if index >= 0:
+                text = text[:index]
+                break
+            if _response_field(chunk, "done"):
+                final = chunk
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+    return text.strip(), final
+
+
+class _StreamPieces:
+    """Text of a chat stream as it arrives, cut at the first `stop` sequence.
+
+    Iterating yields raw pieces; only the few trailing characters that
+    could begin a stop sequence are held back. `final` is the ``done``
+    chunk carrying Ollama's metadata, once seen.
+    """
+
+    def __init__(self, stop: Optional[List[str]], deadline: Deadline):
+        self.stop = stop
+        self.deadline = deadline
+        self.hold = max((len(seq) for seq in stop or ()), default=1) - 1
+        self.final: Any = None
+        self.chars = 0
+        self._pending = ""
+
+    def add(self, chunk: Any) -> Tuple[str, bool]:
+        """Text that is safe to emit after `chunk`, and whether to stop."""
+        _check_deadline(self.deadline, "Ollama stream")
+        if _response_field(chunk, "done"):
+            self.final = chunk
+        text = self._pending + _chunk_text(chunk)
+        index = _find_stop(text, self.stop)
+        if index >= 0:
+            self._pending = ""
+            return self._emit(text[:index]), True
+        cut = max(0, len(text) - self.hold)
+        self._pending = text[cut:]
+        return self._emit(text[:cut]), False
+
+    def rest(self) -> str:
+        text, self._pending = self._pending, ""
+        return self._emit(text)
+
+    def _emit(self, text: str) -> str:
+        self.chars += len(text)
+        return text
+
+
+def _embed_ollama_client(
+    model: str,
+    inputs: Sequence[str],
+    base_url: Optional[str] = None,
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+) -> List[List[float]]:
+    """Embed `inputs` with one `/api/embed` request where supported."""
+    client_module = _client_module(base_url)
+    if client_module is None:
+        raise OllamaClientError("Embeddings need the `ollama` Python client")
+    client = client_module
+    if (base_url or timeout is not None) and hasattr(client_module, "Client"):
+        client = _get_client(base_url, timeout)
+    if hasattr(client, "embed"):
+        resp = client.embed(model=model, input=list(inputs), **kwargs)
+        return [list(v) for v in _response_field(resp, "embeddings")]
+    # Older clients only embed one prompt per request
+    return [
+        list(_response_field(client.embeddings(model=model, prompt=text), "embedding"))
+        for text in inputs
+    ]
+
+
+# `ollama.AsyncClient`s per event loop, then per (base_url, timeout); an
+# httpx async client must not be shared between loops.
+_async_clients: "weakref.WeakKeyDictionary[Any, Dict[Any, Any]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_async_client(base_url: Optional[str], timeout: Optional[float]) -> Any:
+    import asyncio
+
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get((base_url, timeout))
+    if client is None:
+        client = clients[(base_url, timeout)] = _client_module(base_url).AsyncClient(
+            host=base_url, timeout=timeout
         )
-        if completed.returncode != 0:
-            # If chat failed, try `ollama generate` (older/newer CLI variations)
-            cmd2 = (
-                f"ollama generate {shlex.quote(model)} --prompt {shlex.quote(prompt)}"
+    return client
+
+
+async def _achat_ollama_client(
+    model: str,
+    prompt: str,
+    base_url: Optional[str],
+    timeout: Optional[float],
+    deadline: Deadline,
+    streamed: bool = False,
+    stop: Optional[List[str]] = None,
+    system: Optional[str] = None,
+    **kwargs: Any,
+) -> Tuple[str, Any]:
+    """One chat request on the event loop through `ollama.AsyncClient`.
+
+    The asyncio counterpart of `_call_ollama_client` and
+    `_stream_ollama_client`: no thread is held while waiting for Ollama.
+    With `streamed`, `stop` sequences and `deadline` are checked between
+    chunks; the deadline's timeout bounds the whole request either way,
+    and cancelling the awaiting task closes the HTTP request.
+    """
+    import asyncio
+
+    client = _get_async_client(base_url, timeout)
+    messages = _messages(prompt, system)
+
+    async def request() -> Tuple[str, Any]:
+        if not streamed:
+            resp = await client.chat(model, messages=messages, **kwargs)
+            with tracing.span("ollama.extract"):
+                return _extract_assistant_content(resp), resp
+        started, traced_from = time.monotonic(), time.perf_counter()
+        stream = await client.chat(model, messages=messages, stream=True, **kwargs)
+        longest = max((len(seq) for seq in stop or ()), default=0)
+        text, final, first = "", None, True
+        try:
+            async for chunk in stream:
+                _check_deadline(deadline, "Ollama stream")
+                if first:
+                    first = False
+                    first_token_latency.setdefault(base_url, LatencyTracker()).record(
+                        time.monotonic() - started
+                    )
+                    tracing.record(
+                        "ollama.first_token",
+                        traced_from,
+                        time.perf_counter(),
+                        base_url=base_url,
+                    )
+                start = max(0, len(text) - longest + 1)
+                text += _chunk_text(chunk)
+                index = _find_stop(text, stop, start)
+                if index >= 0:
+                    text = text[:index]
+                    break
+                if _response_field(chunk, "done"):
+                    final = chunk
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        return text.strip(), final
+
+    remaining = deadline.remaining()
+    if remaining is None:
+        return await request()
+    try:
+        return await asyncio.wait_for(request(), remaining)
+    except asyncio.TimeoutError:
+        raise OllamaTimeoutError(
+            f"Ollama call timed out after {deadline.timeout}s"
+        ) from None
+
+
+# Micro-batchers per (kind, model, endpoint, window, size), shared by all
+# wrapper instances with the same settings; see `batch_stats()`.
+batchers: Dict[Tuple[Any, ...], MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+# Generation calls of micro-batches; grown by `_get_batcher` so every batch
+# that may be in flight gets a thread per call.
+_group_pool = ThreadPoolExecutor(thread_name_prefix="ollama-group")
+# Prompts of a sync `batch()`. Separate from `_group_pool`: these callers may
+# block on micro-batch futures, which need free group threads to complete.
+_fanout_pool = ThreadPoolExecutor(thread_name_prefix="ollama-fanout")
+
+
+def _get_batcher(
+    kind: str,
+    model: str,
+    base_url: Optional[str],
+    window: float,
+    max_batch: int,
+    fn: Callable[[List[Any]], List[Any]],
+) -> MicroBatcher:
+    key = (kind, model, base_url, window, max_batch)
+    with _batchers_lock:
+        batcher = batchers.get(key)
+        if batcher is None:
+            batcher = batchers[key] = MicroBatcher(
+                fn, window=window, max_batch=max_batch, name=kind
             )
-            completed2 = subprocess.run(
-                cmd2,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=timeout,
-                check=False,
+            if fn is _run_group:
+                needed = max_batch * batcher.max_inflight
+                # ThreadPoolExecutor starts threads up to `_max_workers` on
+                # demand, so raising it grows the pool (see `_pool_stats`)
+                if _group_pool._max_workers < needed:
+                    _group_pool._max_workers = needed
+        return batcher
+
+
+def _run_group(calls: List[Callable[[], Any]]) -> List[Any]:
+    """Start a batch of generation calls together.
+
+    Ollama has no multi-prompt generate endpoint, but it evaluates requests
+    that arrive together in one forward pass (up to `OLLAMA_NUM_PARALLEL`),
+    so the batch is released at once instead of trickling in. Returns the
+    calls' futures: the batcher's slot is free again once they are started,
+    not only after the slowest one has finished.
+    """
+    return [_group_pool.submit(call) for call in calls]
+
+
+def batch_stats() -> Dict[str, Any]:
+    """Batch sizes and latency percentiles of every active micro-batcher."""
+    with _batchers_lock:
+        items = list(batchers.items())
+    return {
+        f"{kind}:{model}@{base_url or 'default'}": batcher.stats()
+        for (kind, model, base_url, _, _), batcher in items
+    }
+
+
+# Async calls that cannot use `ollama.AsyncClient` (hedging, micro-batching,
+# the CLI, embeddings) run here; each in-flight call blocks one thread.
+_async_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="ollama-async")
+
+
+def _pool_stats(pool: ThreadPoolExecutor) -> Dict[str, Any]:
+    # ThreadPoolExecutor has no public stats; these attributes exist on
+    # every supported Python version
+    threads = len(getattr(pool, "_threads", ()))
+    idle_semaphore = getattr(pool, "_idle_semaphore", None)
+    idle = getattr(idle_semaphore, "_value", 0)
+    busy = max(0, threads - idle)
+    max_workers = getattr(pool, "_max_workers", None)
+    return {
+        "max_workers": max_workers,
+        "threads": threads,
+        "busy": busy,
+        "queued": pool._work_queue.qsize(),
+        "utilisation": round(busy / max_workers, 3) if max_workers else None,
+    }
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    """Busy threads and queued calls of the wrapper's thread pools."""
+    from .resilience import _hedge_pool
+
+    return {
+        "async": _pool_stats(_async_pool),
+        "group": _pool_stats(_group_pool),
+        "fanout": _pool_stats(_fanout_pool),
+        "hedge": _pool_stats(_hedge_pool),
+    }
+
+
+def loaded_models(
+    base_url: Optional[str] = None, timeout: Optional[float] = 5.0
+) -> List[Dict[str, Any]]:
+    """Models Ollama currently holds in memory (``ollama ps``)."""
+    resp = _get_client(base_url, timeout).ps()
+    models = []
+    for model in _response_field(resp, "models") or ():
+        entry = {
+            name: _response_field(model, name)
+            for name in ("name", "size", "size_vram", "context_length")
+        }
+        expires_at = _response_field(model, "expires_at")
+        entry["expires_at"] = None if expires_at is None else str(expires_at)
+        models.append(entry)
+    return models
+
+
+async def _run_in_executor(fn, *args, **kwargs):
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    if tracing.enabled():
+        call = functools.partial(_traced_call, call, time.perf_counter())
+    return await loop.run_in_executor(_async_pool, call)
+
+
+def _traced_call(call: Callable[[], Any], submitted: float) -> Any:
+    # Time spent waiting for a free thread in `_async_pool`
+    tracing.record("executor.queue", submitted, time.perf_counter())
+    return call()
+
+
+async def _run_cancellable(fn, *args, **kwargs):
+    """Run ``fn(*args, cancel=event, **kwargs)`` in a worker thread.
+
+    Cancelling the awaiting task (``asyncio.wait_for`` timeouts, client
+    disconnects) sets the event, so the blocking call closes its HTTP
+    stream or kills its CLI process instead of running on unobserved.
+    """
+    import asyncio
+
+    cancel = kwargs.get("cancel") or threading.Event()
+    kwargs["cancel"] = cancel
+    try:
+        return await _run_in_executor(fn, *args, **kwargs)
+    except asyncio.CancelledError:
+        cancel.set()
+        raise
+
+
+async def _gather(awaitables: Sequence[Any]) -> List[Any]:
+    """``asyncio.gather`` that cancels the other calls when one fails."""
+    import asyncio
+
+    tasks = [asyncio.ensure_future(a) for a in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+class _OllamaCallMixin:
+    """Backend selection shared by both `OllamaLLM` variants.
+
+    Tries the Python client first and falls back to the CLI. Each
+    backend/endpoint has a circuit breaker (see `circuit_breakers`) so an
+    outage fails in milliseconds instead of walking the whole chain, and
+    `timeout` bounds the entire chain rather than each attempt.
+
+    Every call also accepts `timeout` (overrides the instance's for that
+    call) and `cancel`, a `threading.Event` that aborts the call when set.
+    The async methods set it when their task is cancelled.
+
+    Replies pass through the `transforms` pipeline (see `transforms`);
+    `stream_text` applies it chunk by chunk. `complete_structured` returns
+    typed replies (see `structured`).
+    """
+
+    def complete(
+        self, prompt: str, stop: Optional[List[str]] = None, **options: Any
+    ) -> Completion:
+        """Like a plain call but returns a `usage.Completion`.
+
+        The result carries the text plus the model, backend, token counts
+        and durations Ollama reported for the request.
+        """
+        return self._complete(prompt, stop, **options)
+
+    async def acomplete(
+        self, prompt: str, stop: Optional[List[str]] = None, **options: Any
+    ) -> Completion:
+        return await self._acomplete(prompt, stop, **options)
+
+    def complete_in_context(
+        self,
+        prompt: str,
+        context: Optional[Sequence[int]] = None,
+        stop: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        **options: Any,
+    ) -> Tuple[Completion, Optional[List[int]]]:
+        """Continue a conversation from Ollama's `context` token ids.
+
+        Uses ``/api/generate``, which returns with each reply the context:
+        the tokens of the conversation so far. Passing it back makes Ollama
+        continue from there, so only `prompt` (the new message) is sent and
+        evaluated instead of the whole transcript. Returns the completion
+        and the new context (store it with `store.ConversationArchive`).
+        Needs the Python client; there is no CLI fallback, and `cancel` is
+        only checked before the request is sent.
+        """
+        if not hasattr(_client_module(self.base_url), "Client"):
+            raise OllamaClientError("Conversation context needs the Python client")
+        deadline = Deadline(self.timeout if timeout is None else timeout, cancel)
+        kwargs = self._request_kwargs(stop, options)
+        breaker = circuit_breakers.get(("client", self.base_url or "default"))
+        if not breaker.allow():
+            raise CircuitOpenError("Ollama Python client circuit is open")
+        started = time.perf_counter()
+        with call_stats.track(self.model), tracing.span(
+            "ollama.generate", model=self.model
+        ):
+            try:
+                resp = (self.retry or RetryPolicy(max_attempts=1)).call(
+                    lambda: _client_for(self.base_url, deadline).generate(
+                        self.model,
+                        prompt,
+                        system=self.system_prompt,
+                        context=list(context) if context else None,
+                        stream=False,
+                        **kwargs,
+                    ),
+                    deadline,
+                )
+            except OllamaCancelledError:
+                raise
+            except Exception as e:
+                if not is_request_error(e):
+                    breaker.record_failure()
+                if self.recorder is not None:
+                    self._record_call(prompt, kwargs, started, error=e)
+                _check_deadline(deadline, "Ollama call")
+                raise
+            else:
+                breaker.record_success()
+            finally:
+                breaker.release_probe()
+        text = _truncate_at_stop(str(_response_field(resp, "response") or ""), stop)
+        if self.recorder is not None:
+            self._record_call(
+                prompt,
+                kwargs,
+                started,
+                response=resp,
+                backend="client",
+                output_chars=len(text),
             )
-            if completed2.returncode == 0:
-                out = completed2.stdout.decode(errors="ignore").strip()
-                # Try to parse structured output
-                try:
-                    return _extract_assistant_content(json.loads(out))
-                except Exception:
-                    return out
-            # If generate also failed, try `ollama run MODEL PROMPT`.
-            # Some CLI versions accept the model and a prompt positionally.
-            cmd3 = "ollama run " + shlex.quote(model) + " " + shlex.quote(prompt)
-            completed3 = subprocess.run(
-                cmd3,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=timeout,
-                check=False,
+        new_context = _response_field(resp, "context")
+        result = Completion.from_response(text.strip(), resp, self.model, "client")
+        return (
+            self._transformed(result),
+            None if new_context is None else list(new_context),
+        )
+
+    async def acomplete_in_context(
+        self,
+        prompt: str,
+        context: Optional[Sequence[int]] = None,
+        stop: Optional[List[str]] = None,
+        **options: Any,
+    ) -> Tuple[Completion, Optional[List[int]]]:
+        return await _run_cancellable(
+            self.complete_in_context, prompt, context, stop, **options
+        )
+
+    def pipeline(self) -> Pipeline:
+        """A fresh `transforms.Pipeline` of the configured `transforms`."""
+        # Stages keep per-reply state, so every reply gets its own copies
+        return Pipeline(self.transforms or ()).start()
+
+    def _transformed(self, result: Completion) -> Completion:
+        if not self.transforms:
+            return result
+        return dataclasses.replace(result, text=self.pipeline().apply(result.text))
+
+    def stream_text(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        pipeline: Optional[Pipeline] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None,
+        **options: Any,
+    ) -> Iterator[str]:
+        """Yield the reply while it is generated, through `transforms`.
+
+        Pass `pipeline` (from `pipeline()`) to read its stages afterwards,
+        e.g. ``pipeline.find(DetectJSON).value``. `format` is Ollama's
+        output format, ``"json"`` or a JSON schema. Closing the generator
+        closes the HTTP stream, which stops generation. Hedging, batching
+        and the response cache do not apply; the CLI fallback yields its
+        whole reply at once.
+        """
+        pipeline = self.pipeline() if pipeline is None else pipeline
+        deadline = Deadline(self.timeout if timeout is None else timeout, cancel)
+        kwargs = self._request_kwargs(stop, options)
+        if format is not None:
+            kwargs["format"] = format
+        raw = self._stream_raw(prompt, stop, kwargs, deadline)
+        try:
+            with call_stats.track(self.model), tracing.span(
+                "ollama.stream", concurrent=True, model=self.model
+            ):
+                yield from pipeline.stream(raw)
+        finally:
+            # Also when a stage raises: the HTTP stream must not wait for GC
+            raw.close()
+
+    async def astream_text(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        pipeline: Optional[Pipeline] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None,
+        **options: Any,
+    ) -> AsyncIterator[str]:
+        """`stream_text` on the event loop through `ollama.AsyncClient`."""
+        pipeline = self.pipeline() if pipeline is None else pipeline
+        deadline = Deadline(self.timeout if timeout is None else timeout, cancel)
+        kwargs = self._request_kwargs(stop, options)
+        if format is not None:
+            kwargs["format"] = format
+        raw = self._astream_raw(prompt, stop, kwargs, deadline)
+        try:
+            with call_stats.track(self.model), tracing.span(
+                "ollama.stream", concurrent=True, model=self.model
+            ):
+                async for piece in pipeline.astream(raw):
+                    yield piece
+        finally:
+            await raw.aclose()
+
+    def complete_structured(
+        self,
+        prompt: str,
+        schema: Any,
+        stop: Optional[List[str]] = None,
+        attempts: int = 1,
+        **options: Any,
+    ) -> Any:
+        """A reply constrained to `schema`, validated while it streams.
+
+        `schema` is a Pydantic model class (the result is an instance of
+        it) or a JSON schema dict (the result is the parsed JSON). The
+        schema is sent as Ollama's `format`; generation is aborted as soon
+        as the output can no longer match, and retried up to `attempts`
+        times in total. Raises `structured.StructuredOutputError`.
+        """
+        from . import structured
+
+        for attempt in range(attempts):
+            pipeline, fmt = self._structured_pipeline(schema)
+            try:
+                text = "".join(
+                    self.stream_text(
+                        prompt, stop, pipeline=pipeline, format=fmt, **options
+                    )
+                )
+                return structured.parse(schema, text)
+            except structured.StructuredOutputError:
+                if attempt == attempts - 1:
+                    raise
+
+    async def acomplete_structured(
+        self,
+        prompt: str,
+        schema: Any,
+        stop: Optional[List[str]] = None,
+        attempts: int = 1,
+        **options: Any,
+    ) -> Any:
+        from . import structured
+
+        for attempt in range(attempts):
+            pipeline, fmt = self._structured_pipeline(schema)
+            try:
+                text = "".join(
+                    [
+                        piece
+                        async for piece in self.astream_text(
+                            prompt, stop, pipeline=pipeline, format=fmt, **options
+                        )
+                    ]
+                )
+                return structured.parse(schema, text)
+            except structured.StructuredOutputError:
+                if attempt == attempts - 1:
+                    raise
+
+    def _structured_pipeline(self, schema: Any) -> Tuple[Pipeline, Dict[str, Any]]:
+        """The wrapper's transforms plus a schema check, and the `format`."""
+        from .structured import SchemaValidator, json_schema
+
+        fmt = json_schema(schema)
+        pipeline = self.pipeline()
+        pipeline.stages.append(SchemaValidator(fmt))
+        return pipeline, fmt
+
+    def _stream_raw(
+        self,
+        prompt: str,
+        stop: Optional[List[str]],
+        kwargs: Dict[str, Any],
+        deadline: Deadline,
+    ) -> Iterator[str]:
+        """Untransformed reply pieces, with `_dispatch`'s breaker and retries
+        around opening the stream and its fallbacks before the first chunk."""
+        if not hasattr(_client_module(self.base_url), "Client"):
+            yield self._dispatch(prompt, stop, kwargs, deadline)[0]
+            return
+        started = time.perf_counter()
+        breaker = circuit_breakers.get(("client", self.base_url or "default"))
+        if not breaker.allow():
+            yield self._dispatch_cli(
+                prompt,
+                stop,
+                deadline,
+                CircuitOpenError("Ollama Python client circuit is open"),
             )
-            if completed3.returncode == 0:
-                out = completed3.stdout.decode(errors="ignore").strip()
-                try:
-                    return _extract_assistant_content(json.loads(out))
-                except Exception:
-                    return _extract_assistant_content(out)
-            else:
-                err = (
-                    completed.stderr.decode(errors="ignore")
-                    + "\n"
-                    + completed2.stderr.decode(errors="ignore")
-                    + "\n"
-                    + completed3.stderr.decode(errors="ignore")
+            return
+
+        def open_stream() -> Tuple[Any, Any]:
+            stream = _client_for(self.base_url, deadline).chat(
+                self.model,
+                messages=_messages(prompt, self.system_prompt),
+                stream=True,
+                **kwargs,
+            )
+            # The request is only sent once the stream is first read
+            return stream, next(iter(stream), None)
+
+        try:
+            stream, first = (self.retry or RetryPolicy(max_attempts=1)).call(
+                open_stream, deadline
+            )
+        except OllamaCancelledError:
+            raise
+        except Exception as e:
+            if is_request_error(e):
+                raise
+            breaker.record_failure()
+            _check_deadline(deadline, "Ollama call")
+            yield self._dispatch_cli(prompt, stop, deadline, e)
+            return
+        else:
+            breaker.record_success()
+        finally:
+            # A cancelled probe must not keep the circuit half-open
+            breaker.release_probe()
+        first_token_latency.setdefault(self.base_url, LatencyTracker()).record(
+            time.perf_counter() - started
+        )
+        pieces = _StreamPieces(stop, deadline)
+        try:
+            chunk, done = first, first is None
+            while not done:
+                text, done = pieces.add(chunk)
+                if text:
+                    yield text
+                chunk = next(stream, None)
+                done = done or chunk is None
+            text = pieces.rest()
+            if text:
+                yield text
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            if self.recorder is not None:
+                self._record_call(
+                    prompt,
+                    kwargs,
+                    started,
+                    response=pieces.final,
+                    backend="client",
+                    output_chars=pieces.chars,
                 )
-                raise OllamaClientError(f"`ollama` CLI failed: {err.strip()}")
-        out = completed.stdout.decode(errors="ignore").strip()
+
+    async def _astream_raw(
+        self,
+        prompt: str,
+        stop: Optional[List[str]],
+        kwargs: Dict[str, Any],
+        deadline: Deadline,
+    ) -> AsyncIterator[str]:
+        import asyncio
+
+        if not hasattr(_client_module(self.base_url), "AsyncClient"):
+            yield (
+                await _run_in_executor(self._dispatch, prompt, stop, kwargs, deadline)
+            )[0]
+            return
+        started = time.perf_counter()
+        breaker = circuit_breakers.get(("client", self.base_url or "default"))
+        if not breaker.allow():
+            yield await _run_in_executor(
+                self._dispatch_cli,
+                prompt,
+                stop,
+                deadline,
+                CircuitOpenError("Ollama Python client circuit is open"),
+            )
+            return
+
+        async def first_chunk() -> Tuple[Any, Any]:
+            stream = await _get_async_client(self.base_url, deadline.timeout).chat(
+                self.model,
+                messages=_messages(prompt, self.system_prompt),
+                stream=True,
+                **kwargs,
+            )
+            return stream, await stream.__anext__()
+
+        async def open_stream() -> Tuple[Any, Any]:
+            # A retry only gets what is left of the budget
+            return await asyncio.wait_for(first_chunk(), deadline.remaining())
+
         try:
-            return _extract_assistant_content(json.loads(out))
-        except Exception:
-            return _extract_assistant_content(out)
-    except subprocess.TimeoutExpired as e:
-        raise OllamaClientError(f"`ollama` CLI timed out: {e}")
+            stream, first = await (self.retry or RetryPolicy(max_attempts=1)).acall(
+                open_stream, deadline
+            )
+        except OllamaCancelledError:
+            raise
+        except Exception as e:
+            if is_request_error(e):
+                raise
+            breaker.record_failure()
+            _check_deadline(deadline, "Ollama call")
+            yield await _run_in_executor(self._dispatch_cli, prompt, stop, deadline, e)
+            return
+        else:
+            breaker.record_success()
+        finally:
+            breaker.release_probe()
+        first_token_latency.setdefault(self.base_url, LatencyTracker()).record(
+            time.perf_counter() - started
+        )
+        pieces = _StreamPieces(stop, deadline)
+        try:
+            chunk = first
+            while True:
+                text, done = pieces.add(chunk)
+                if text:
+                    yield text
+                if done:
+                    break
+                try:
+                    chunk = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+            text = pieces.rest()
+            if text:
+                yield text
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            if self.recorder is not None:
+                self._record_call(
+                    prompt,
+                    kwargs,
+                    started,
+                    response=pieces.final,
+                    backend="client",
+                    output_chars=pieces.chars,
+                )
 
+    def _complete(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        **options: Any,
+    ) -> Completion:
+        with call_stats.track(self.model), tracing.span(
+            "ollama.complete", model=self.model
+        ) as span:
+            result = self._complete_traced(prompt, stop, timeout, cancel, options)
+            span.set(backend=result.backend)
+            return self._transformed(result)
 
-async def _run_in_executor(fn, *args, **kwargs):
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(
-        ThreadPoolExecutor(max_workers=1), lambda: fn(*args, **kwargs)
-    )
+    def _complete_traced(
+        self,
+        prompt: str,
+        stop: Optional[List[str]],
+        timeout: Optional[float],
+        cancel: Optional[threading.Event],
+        options: Dict[str, Any],
+    ) -> Completion:
+        deadline = Deadline(self.timeout if timeout is None else timeout, cancel)
+        with tracing.span("ollama.build_request"):
+            kwargs = self._request_kwargs(stop, options)
+        if self.response_cache is None:
+            return self._complete_batched(prompt, stop, kwargs, deadline)
+        # keep_alive does not change the reply, so it is not part of the key
+        request = {k: v for k, v in kwargs.items() if k != "keep_alive"}
+        with tracing.span("ollama.cache_lookup") as span:
+            key = self.response_cache.key(
+                self.model, prompt, system=self.system_prompt, **request
+            )
+            hit = self.response_cache.get(key)
+            span.set(hit=hit is not None)
+        if hit is not None:
+            return Completion(**{**hit, "backend": "cache"})
+        result = self._complete_batched(prompt, stop, kwargs, deadline)
+        self.response_cache.put(key, dataclasses.asdict(result))
+        return result
 
+    def _complete_batched(
+        self,
+        prompt: str,
+        stop: Optional[List[str]],
+        kwargs: Dict[str, Any],
+        deadline: Deadline,
+    ) -> Completion:
+        if self.batch_window is None:
+            return self._complete_uncached(prompt, stop, kwargs, deadline)
+        batcher = _get_batcher(
+            "generate",
+            self.model,
+            self.base_url,
+            self.batch_window,
+            self.max_batch_size,
+            _run_group,
+        )
+        future = batcher.submit(
+            functools.partial(self._complete_uncached, prompt, stop, kwargs, deadline)
+        )
+        # Covers the batching window plus the call itself
+        with tracing.span("ollama.batch_wait"):
+            return _wait_future(future, deadline, "Ollama call")
 
-if LC_HAS_LLM:
+    def embed(
+        self,
+        texts: Union[str, Sequence[str]],
+        model: Optional[str] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Union[List[float], List[List[float]]]:
+        """Embedding vector(s) for one text or a list of texts.
 
-    class OllamaLLM(LLM):
-        """LangChain-compatible LLM wrapper for Ollama.
+        `model` defaults to the wrapper's model. With `batch_window` set,
+        texts from concurrent callers are coalesced into one request, and
+        `timeout` / `cancel` bound the wait for it. Needs the `ollama`
+        Python client (the CLI has no embeddings).
+        """
+        model = model or self.model
+        deadline = Deadline(self.timeout if timeout is None else timeout, cancel)
+        single = isinstance(texts, str)
+        items = [texts] if single else list(texts)
+        extra = {} if self.keep_alive is None else {"keep_alive": self.keep_alive}
+        if self.batch_window is None:
+            _check_deadline(deadline, "Ollama embed")
+            vectors = _embed_ollama_client(
+                model, items, self.base_url, deadline.timeout, **extra
+            )
+        else:
+            batcher = _get_batcher(
+                "embed",
+                model,
+                self.base_url,
+                self.batch_window,
+                self.max_batch_size,
+                functools.partial(
+                    _embed_ollama_client,
+                    model,
+                    base_url=self.base_url,
+                    timeout=self.timeout,
+                    **extra,
+                ),
+            )
+            futures = [batcher.submit(text) for text in items]
+            vectors = [_wait_future(f, deadline, "Ollama embed") for f in futures]
+        return vectors[0] if single else vectors
+
+    async def aembed(
+        self,
+        texts: Union[str, Sequence[str]],
+        model: Optional[str] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Union[List[float], List[List[float]]]:
+        return await _run_in_executor(self.embed, texts, model, timeout, cancel)
+
+    def _complete_uncached(
+        self,
+        prompt: str,
+        stop: Optional[List[str]],
+        kwargs: Dict[str, Any],
+        deadline: Deadline,
+    ) -> Completion:
+        if self.recorder is None:
+            text, resp, backend = self._dispatch(prompt, stop, kwargs, deadline)
+            return Completion.from_response(text, resp, self.model, backend)
+        started = time.perf_counter()
+        try:
+            text, resp, backend = self._dispatch(prompt, stop, kwargs, deadline)
+        except Exception as e:
+            self._record_call(prompt, kwargs, started, error=e)
+            raise
+        self._record_call(
+            prompt,
+            kwargs,
+            started,
+            response=resp,
+            backend=backend,
+            output_chars=len(text),
+        )
+        return Completion.from_response(text, resp, self.model, backend)
+
+    def _record_call(
+        self, prompt: str, kwargs: Dict[str, Any], started: float, **outcome: Any
+    ) -> None:
+        self.recorder.record(
+            model=self.model,
+            prompt=prompt,
+            system=self.system_prompt,
+            options=kwargs.get("options"),
+            latency_s=time.perf_counter() - started,
+            **outcome,
+        )
+
+    async def _acomplete(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+        **options: Any,
+    ) -> Completion:
+        """`_complete` on the event loop, without a thread per call.
 
-        Parameters:
-            model: name of the local Ollama model (e.g., `llama2`)
-            base_url: unused placeholder for HTTP-based clients
-            ollama_kwargs: dict forwarded to the Python client where
-                supported (for example: temperature, system messages)
+        Uses `ollama.AsyncClient` when available; hedging, micro-batching
+        and the CLI fallback still run in worker threads.
         """
+        if (
+            self.hedge_urls
+            or self.batch_window is not None
+            or not hasattr(_client_module(self.base_url), "AsyncClient")
+        ):
+            return await _run_cancellable(
+                self._complete, prompt, stop, timeout=timeout, cancel=cancel, **options
+            )
+        with call_stats.track(self.model):
+            return await self._acomplete_native(prompt, stop, timeout, cancel, options)
+
+    async def _acomplete_native(
+        self,
+        prompt: str,
+        stop: Optional[List[str]],
+        timeout: Optional[float],
+        cancel: Optional[threading.Event],
+        options: Dict[str, Any],
+    ) -> Completion:
+        import asyncio
 
-        model: str
-        base_url: Optional[str] = None
-        ollama_kwargs: Dict[str, Any] = None
+        # Stream only when something must be checked between chunks
+        streamed = bool(stop) or cancel is not None
+        # A CLI fallback thread notices task cancellation through this event
+        cancel = cancel or threading.Event()
+        deadline = Deadline(self.timeout if timeout is None else timeout, cancel)
+        kwargs = self._request_kwargs(stop, options)
+        key = None
+        if self.response_cache is not None:
+            request = {k: v for k, v in kwargs.items() if k != "keep_alive"}
+            key = self.response_cache.key(
+                self.model, prompt, system=self.system_prompt, **request
+            )
+            hit = await _run_in_executor(self.response_cache.get, key)
+            if hit is not None:
+                return self._transformed(Completion(**{**hit, "backend": "cache"}))
+        started = time.perf_counter()
+        try:
+            with tracing.span("ollama.acomplete", concurrent=True, model=self.model):
+                text, resp, backend = await self._adispatch(
+                    prompt, stop, kwargs, deadline, streamed
+                )
+        except asyncio.CancelledError:
+            cancel.set()
+            raise
+        except Exception as e:
+            if self.recorder is not None:
+                self._record_call(prompt, kwargs, started, error=e)
+            raise
+        if self.recorder is not None:
+            self._record_call(
+                prompt,
+                kwargs,
+                started,
+                response=resp,
+                backend=backend,
+                output_chars=len(text),
+            )
+        result = Completion.from_response(text, resp, self.model, backend)
+        if key is not None:
+            await _run_in_executor(
+                self.response_cache.put, key, dataclasses.asdict(result)
+            )
+        return self._transformed(result)
 
-        def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
-            # Prefer the Python client if available
-            resp = None
-            if FROM_OLLAMA:
+    async def _adispatch(
+        self,
+        prompt: str,
+        stop: Optional[List[str]],
+        kwargs: Dict[str, Any],
+        deadline: Deadline,
+        streamed: bool,
+    ) -> Tuple[str, Any, str]:
+        """Async `_dispatch`: the same breakers, retries and CLI fallback."""
+        _check_deadline(deadline, "Ollama call")
+        client_error: Optional[Exception] = None
+        breaker = circuit_breakers.get(("client", self.base_url or "default"))
+        if breaker.allow():
+            policy = self.retry or RetryPolicy(max_attempts=1)
+            session = self._prefix_session()
+            try:
+                if session is not None and session.claim_warmup():
+                    await _run_in_executor(self._warm_prefix, session, deadline, kwargs)
+                text, resp = await policy.acall(
+                    lambda: _achat_ollama_client(
+                        self.model,
+                        prompt,
+                        self.base_url,
+                        deadline.timeout,
+                        deadline,
+                        streamed,
+                        stop=stop,
+                        system=self.system_prompt,
+                        **kwargs,
+                    ),
+                    deadline,
+                )
+            except OllamaCancelledError:
+                raise
+            except Exception as e:
+                if is_request_error(e):
+                    # The CLI would fail the same way
+                    raise
+                breaker.record_failure()
+                client_error = e
+            else:
+                breaker.record_success()
+                if session is not None and resp is not None:
+                    session.record(resp)
+                return str(text), resp, "client"
+            finally:
+                # Also reached on asyncio.CancelledError, a BaseException
+                breaker.release_probe()
+        else:
+            client_error = CircuitOpenError("Ollama Python client circuit is open")
+        if deadline.cancelled() or deadline.expired():
+            _check_deadline(deadline, "Ollama call")
+        # The CLI blocks, so only the fallback needs a worker thread
+        text = await _run_in_executor(
+            self._dispatch_cli, prompt, stop, deadline, client_error
+        )
+        return text, None, "cli"
+
+    def _dispatch(
+        self,
+        prompt: str,
+        stop: Optional[List[str]],
+        kwargs: Dict[str, Any],
+        deadline: Deadline,
+    ) -> Tuple[str, Any, str]:
+        """Run one request; returns (text, raw response or None, backend)."""
+        _check_deadline(deadline, "Ollama call")
+        client_error = None
+        if _client_module(self.base_url) is not None:
+            breaker = circuit_breakers.get(("client", self.base_url or "default"))
+            if breaker.allow():
+                policy = self.retry or RetryPolicy(max_attempts=1)
                 try:
-                    if hasattr(ollama, "chat"):
-                        resp = ollama.chat(
-                            self.model,
-                            messages=[{"role": "user", "content": prompt}],
-                            **(self.ollama_kwargs or {}),
+                    with tracing.span("ollama.client", base_url=self.base_url):
+                        reply = policy.call(
+                            lambda: self._request_client(
+                                prompt, deadline, kwargs, stop
+                            ),
+                            deadline,
                         )
-                    elif hasattr(ollama, "Ollama"):
-                        client = ollama.Ollama()
-                        if hasattr(client, "chat"):
-                            resp = client.chat(
-                                self.model,
-                                messages=[{"role": "user", "content": prompt}],
-                                **(self.ollama_kwargs or {}),
-                            )
-                        elif hasattr(client, "predict"):
-                            resp = client.predict(
-                                self.model, prompt, **(self.ollama_kwargs or {})
-                            )
-                        else:
-                            resp = None
+                except OllamaCancelledError:
+                    raise
                 except Exception as e:
-                    # Try CLI fallback
-                    try:
-                        return _call_ollama_cli(self.model, prompt)
-                    except Exception:
-                        raise OllamaClientError(
-                            f"Error using Ollama Python client: {e}"
-                        )
+                    if is_request_error(e):
+                        # The CLI would fail the same way
+                        raise
+                    breaker.record_failure()
+                    client_error = e
+                else:
+                    breaker.record_success()
+                    if reply is not None:
+                        text, resp = reply
+                        session = self._prefix_session()
+                        if session is not None and resp is not None:
+                            session.record(resp)
+                        return str(text), resp, "client"
+                finally:
+                    # A cancelled probe must not keep the circuit half-open
+                    breaker.release_probe()
+            else:
+                client_error = CircuitOpenError("Ollama Python client circuit is open")
+            if deadline.cancelled() or deadline.expired():
+                # No budget left for the CLI fallback
+                _check_deadline(deadline, "Ollama call")
+        return self._dispatch_cli(prompt, stop, deadline, client_error), None, "cli"
+
+    def _dispatch_cli(
+        self,
+        prompt: str,
+        stop: Optional[List[str]],
+        deadline: Deadline,
+        client_error: Optional[Exception] = None,
+    ) -> str:
+        """Fallback to the CLI after the Python client failed or is missing.
+
+        The CLI has no flags for generation options or system prompts, so
+        the system prompt is prepended and stop sequences are applied to
+        its output afterwards.
+        """
+        if client_error is not None and (self.base_url or "").startswith("fake:"):
+            # The fake backend stands in for all of Ollama; never shell out
+            raise client_error
+        breaker = circuit_breakers.get(("cli", "local"))
+        if not breaker.allow():
+            detail = f"; Python client: {client_error}" if client_error else ""
+            raise CircuitOpenError(
+                f"Ollama backends unavailable (circuit open){detail}"
+            )
+        if self.system_prompt:
+            prompt = f"{self.system_prompt}\n\n{prompt}"
+        try:
+            with tracing.span("ollama.cli"):
+                out = _call_ollama_cli(self.model, prompt, deadline=deadline)
+        except Exception as e:
+            breaker.record_failure()
+            if client_error is not None:
+                raise OllamaClientError(
+                    f"Error using Ollama Python client: {client_error}; "
+                    f"CLI fallback failed: {e}"
+                ) from e
+            raise
+        else:
+            breaker.record_success()
+        finally:
+            breaker.release_probe()
+        return _truncate_at_stop(out, stop)
 
-                # If we got a response from the Python client, extract assistant text
-                if resp is not None:
-                    try:
-                        return str(_extract_assistant_content(resp))
-                    except Exception:
-                        # Fall back to CLI on unexpected parsing errors
-                        try:
-                            return _call_ollama_cli(self.model, prompt)
-                        except Exception as e:
-                            raise OllamaClientError(
-                                f"Error extracting response from Ollama client: {e}"
-                            )
+    def _request_kwargs(
+        self, stop: Optional[List[str]], options: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Client kwargs with generation options merged for the server.
+
+        Precedence (lowest first): `ollama_kwargs["options"]`, `options`,
+        `num_predict`, per-call options, then `stop`.
+        """
+        kwargs = dict(self.ollama_kwargs or {})
+        merged = {**(kwargs.pop("options", None) or {}), **(self.options or {})}
+        if self.num_predict is not None:
+            merged["num_predict"] = self.num_predict
+        merged.update(options)
+        if stop:
+            merged["stop"] = list(stop)
+        if merged:
+            kwargs["options"] = merged
+        if self.keep_alive is not None:
+            kwargs["keep_alive"] = self.keep_alive
+        return kwargs
 
-            # Fallback to CLI
-            return _call_ollama_cli(self.model, prompt)
+    def _prefix_session(self) -> Optional[PrefixSession]:
+        if not self.system_prompt:
+            return None
+        return get_prefix_session(self.model, self.system_prompt, self.base_url)
 
-        async def _acall(self, prompt: str, stop: Optional[List[str]] = None) -> str:
-            # Run the blocking call in a thread to avoid blocking the event loop
-            return await _run_in_executor(self._call, prompt, stop)
+    def prefix_stats(self) -> Optional[Dict[str, Any]]:
+        """Prompt-eval time saved by reusing the system-prompt prefix.
 
-        @property
-        def _identifying_params(self) -> Dict[str, Any]:
-            return {"model": self.model}
+        None when no `system_prompt` is configured. See `prefix.PrefixSession`.
+        """
+        session = self._prefix_session()
+        return None if session is None else session.stats()
 
-        @property
-        def _llm_type(self) -> str:
-            return "ollama"
+    def _warm_prefix(
+        self, session: PrefixSession, deadline: Deadline, kwargs: Dict[str, Any]
+    ) -> None:
+        """Evaluate the system prompt once so later requests reuse its cache.
 
-else:
+        The response's prompt-eval stats are the baseline for `prefix_stats`.
+        Failures are ignored; the real request reports its own errors. The
+        warm-up only gets what is left of the call's budget.
+        """
+        budget = deadline.remaining()
+        if budget is not None and budget <= 0:
+            return
+        options = {**kwargs.get("options", {}), "num_predict": 1}
+        options.pop("stop", None)
+        request = {**kwargs, "options": options}
+        client_module = _client_module(self.base_url)
+        try:
+            if budget is not None and hasattr(client_module, "Client"):
+                # Once per prefix, so a client outside the per-timeout cache
+                resp = client_module.Client(host=self.base_url, timeout=budget).chat(
+                    self.model, messages=_messages("", self.system_prompt), **request
+                )
+            else:
+                resp = _call_ollama_client(
+                    self.model,
+                    "",
+                    base_url=self.base_url,
+                    system=self.system_prompt,
+                    **request,
+                )
+        except Exception:
+            return
+        if resp is not None:
+            session.record_warmup(resp)
 
-    class OllamaLLM:
-        """Fallback minimal wrapper when LangChain LLM base is not present.
+    def _request_client(
+        self,
+        prompt: str,
+        deadline: Deadline,
+        kwargs: Dict[str, Any],
+        stop: Optional[List[str]] = None,
+    ) -> Optional[Tuple[str, Any]]:
+        """One Python-client attempt, hedged across `hedge_urls` if set.
 
-        It supports synchronous `generate_text` and is callable.
+        Replies are streamed when hedging, when `stop` sequences are given
+        or when the call has a timeout or can be cancelled, so generation
+        can be cut off client-side. Each attempt's HTTP timeout is the
+        budget left on `deadline`, which bounds a stalled read, so retries
+        stay within the call's timeout. Returns the text and the response
+        (or final chunk) carrying Ollama's metadata.
         """
+        session = self._prefix_session()
+        if session is not None and session.claim_warmup():
+            self._warm_prefix(session, deadline, kwargs)
+        system = self.system_prompt
+        if self.hedge_urls:
+            endpoints = [self.base_url, *self.hedge_urls]
+            attempts = [
+                functools.partial(
+                    _stream_ollama_client,
+                    self.model,
+                    prompt,
+                    url,
+                    deadline.timeout,
+                    stop=stop,
+                    system=system,
+                    deadline=deadline,
+                    **kwargs,
+                )
+                for url in endpoints
+            ]
+            return hedged_call(
+                attempts,
+                self._hedge_delay(),
+                functools.partial(_check_deadline, deadline, "Ollama call"),
+            )
+        bounded = deadline.timeout is not None or deadline.cancel is not None
+        if (stop or bounded) and hasattr(_client_module(self.base_url), "Client"):
+            return _stream_ollama_client(
+                self.model,
+                prompt,
+                self.base_url,
+                deadline.timeout,
+                lambda: None,
+                threading.Event(),
+                stop=stop,
+                system=system,
+                deadline=deadline,
+                **kwargs,
+            )
+        resp = _call_ollama_client(
+            self.model,
+            prompt,
+            base_url=self.base_url,
+            timeout=deadline.timeout,
+            system=system,
+            **kwargs,
+        )
+        if resp is None:
+            return None
+        # If we got a response, extract the assistant text
+        with tracing.span("ollama.extract"):
+            return _extract_assistant_content(resp), resp
 
-        def __init__(self, model: str, base_url: Optional[str] = None, **ollama_kwargs):
-            self.model = model
-            self.base_url = base_url
-            self.ollama_kwargs = ollama_kwargs
+    def _hedge_delay(self) -> float:
+        if self.hedge_after is not None:
+            return self.hedge_after
+        tracker = first_token_latency.get(self.base_url)
+        if tracker is None or len(tracker) < _MIN_HEDGE_SAMPLES:
+            return DEFAULT_HEDGE_AFTER
+        return tracker.percentile(95)
 
-        def generate_text(self, prompt: str) -> str:
-            # Try the Python client
-            resp = None
-            if FROM_OLLAMA:
-                try:
-                    if hasattr(ollama, "chat"):
-                        resp = ollama.chat(
-                            self.model,
-                            messages=[{"role": "user", "content": prompt}],
-                            **(self.ollama_kwargs or {}),
-                        )
-                    elif hasattr(ollama, "Ollama"):
-                        client = ollama.Ollama()
-                        if hasattr(client, "chat"):
-                            resp = client.chat(
-                                self.model,
-                                messages=[{"role": "user", "content": prompt}],
-                                **(self.ollama_kwargs or {}),
-                            )
-                        elif hasattr(client, "predict"):
-                            resp = client.predict(
-                                self.model, prompt, **(self.ollama_kwargs or {})
-                            )
-                except Exception:
-                    # Fallthrough to CLI fallback
-                    pass
-
-                if resp is not None:
-                    try:
-                        return str(_extract_assistant_content(resp))
-                    except Exception:
-                        # Fall back to CLI on unexpected parsing errors
-                        return _call_ollama_cli(self.model, prompt)
-
-            # CLI fallback
-            return _call_ollama_cli(self.model, prompt)
-
-        async def agenerate_text(self, prompt: str) -> str:
-            return await _run_in_executor(self.generate_text, prompt)
-
-        def __call__(self, prompt: str) -> str:
-            return self.generate_text(prompt)
+
+class SimpleOllamaLLM(_OllamaCallMixin):
+    """Minimal wrapper that works without LangChain.
+
+    `OllamaLLM` falls back to this class when the LangChain LLM base is not
+    present. Use it directly where import time matters and LangChain
+    compatibility doesn't (CLI scripts, serverless workers). It supports
+    synchronous `generate_text` and is callable, and accepts the same
+    parameters as `OllamaLLM`.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        retry: Optional[RetryPolicy] = None,
+        hedge_urls: Optional[List[str]] = None,
+        hedge_after: Optional[float] = None,
+        num_predict: Optional[int] = None,
+        options: Optional[Dict[str, Any]] = None,
+        system_prompt: Optional[str] = None,
+        keep_alive: Optional[Union[float, str]] = None,
+        recorder: Optional[Any] = None,
+        response_cache: Optional[Any] = None,
+        batch_window: Optional[float] = None,
+        max_batch_size: int = 16,
+        transforms: Optional[Sequence[Any]] = None,
+        **ollama_kwargs,
+    ):
+        self.model = model
+        self.base_url = base_url
+        self.timeout = timeout
+        self.retry = retry
+        self.hedge_urls = hedge_urls
+        self.hedge_after = hedge_after
+        self.num_predict = num_predict
+        self.options = options
+        self.system_prompt = system_prompt
+        self.keep_alive = keep_alive
+        self.recorder = recorder
+        self.response_cache = response_cache
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.transforms = transforms
+        self.ollama_kwargs = ollama_kwargs
+
+    def generate_text(
+        self, prompt: str, stop: Optional[List[str]] = None, **options: Any
+    ) -> str:
+        return self._complete(prompt, stop, **options).text
+
+    async def agenerate_text(
+        self, prompt: str, stop: Optional[List[str]] = None, **options: Any
+    ) -> str:
+        return (await self._acomplete(prompt, stop, **options)).text
+
+    def __call__(
+        self, prompt: str, stop: Optional[List[str]] = None, **options: Any
+    ) -> str:
+        return self.generate_text(prompt, stop, **options)
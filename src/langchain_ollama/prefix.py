@@ -0,0 +1,105 @@
+"""Shared system-prompt prefixes and the prompt-eval time they save.
+
+Ollama keeps the KV cache of the last prompt for a loaded model, so when
+every request starts with the same system message the server only has to
+evaluate the new tokens after it. That requires a byte-identical message
+prefix and a model that stays loaded (`keep_alive`).
+
+A ``PrefixSession`` tracks one (endpoint, model, system prompt) prefix. Its
+warm-up request evaluates the prefix once and records how many tokens and
+how much time that took; afterwards each response's ``prompt_eval_count``
+shows whether the prefix was reused. A request counts as a reuse when the
+server evaluated fewer tokens than the prefix alone, so the estimate is
+meant for the usual case of a long system prompt and short user turns.
+"""
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+def _response_field(resp: Any, name: str) -> Any:
+    """Read ``name`` from a dict- or object-shaped Ollama response."""
+    if isinstance(resp, dict):
+        return resp.get(name)
+    return getattr(resp, name, None)
+
+
+class PrefixSession:
+    """Per-model pinned prefix with prompt-eval savings accounting."""
+
+    def __init__(self, model: str, system_prompt: str, base_url: Optional[str] = None):
+        self.model = model
+        self.system_prompt = system_prompt
+        self.base_url = base_url
+        self.prefix_tokens: Optional[int] = None
+        self.prefix_eval_ms: Optional[float] = None
+        self._lock = threading.Lock()
+        self._warm_started = False
+        self._requests = 0
+        self._reused = 0
+        self._prompt_eval_ms = 0.0
+        self._saved_ms = 0.0
+
+    def claim_warmup(self) -> bool:
+        """Return True exactly once, for the caller that should warm up."""
+        with self._lock:
+            if self._warm_started:
+                return False
+            self._warm_started = True
+            return True
+
+    def record_warmup(self, resp: Any) -> None:
+        count = _response_field(resp, "prompt_eval_count")
+        duration = _response_field(resp, "prompt_eval_duration")
+        with self._lock:
+            if count:
+                self.prefix_tokens = count
+            if duration:
+                self.prefix_eval_ms = duration / 1e6
+
+    def record(self, resp: Any) -> None:
+        """Account one completed request from its final response/chunk."""
+        count = _response_field(resp, "prompt_eval_count")
+        duration = _response_field(resp, "prompt_eval_duration")
+        if count is None and duration is None:
+            return
+        with self._lock:
+            self._requests += 1
+            self._prompt_eval_ms += (duration or 0) / 1e6
+            if self.prefix_tokens and count is not None and count < self.prefix_tokens:
+                self._reused += 1
+                self._saved_ms += self.prefix_eval_ms or 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self._requests
+            return {
+                "model": self.model,
+                "prefix_tokens": self.prefix_tokens,
+                "prefix_eval_ms": self.prefix_eval_ms,
+                "requests": requests,
+                "prefix_reused": self._reused,
+                "avg_prompt_eval_ms": (
+                    self._prompt_eval_ms / requests if requests else None
+                ),
+                "saved_prompt_eval_ms": self._saved_ms,
+                "saved_prompt_eval_ms_per_request": (
+                    self._saved_ms / requests if requests else None
+                ),
+            }
+
+
+_sessions: Dict[Tuple[Optional[str], str, str], PrefixSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_prefix_session(
+    model: str, system_prompt: str, base_url: Optional[str] = None
+) -> PrefixSession:
+    """Return the shared session for this endpoint, model and system prompt."""
+    key = (base_url, model, system_prompt)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = PrefixSession(model, system_prompt, base_url)
+        return session
@@ -0,0 +1,171 @@
+"""Record `OllamaLLM` traffic and replay it for load testing.
+
+``RequestRecorder`` appends one compact JSON object per call to a JSONL file
+(timestamp, model, prompt, options, latency, token counts). ``replay``
+re-issues a recorded log with the original inter-arrival times, N times
+faster, or as fast as possible, and reports throughput and latency
+percentiles. ``scripts/replay_requests.py`` is the command-line front end.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .prefix import _response_field
+from .resilience import LatencyTracker
+
+
+class RequestRecorder:
+    """Thread-safe, append-only JSONL log of model calls.
+
+    Each line holds ``ts`` (Unix time the call started), ``model``,
+    ``prompt``, ``system``, ``options``, ``latency_ms``, ``backend``,
+    ``prompt_tokens``/``completion_tokens`` (when Ollama reports them) and
+    ``error`` for failed calls. Keys with no value are omitted.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def record(
+        self,
+        model: str,
+        prompt: str,
+        latency_s: float,
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        response: Any = None,
+        backend: Optional[str] = None,
+        output_chars: Optional[int] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        entry = {
+            "ts": round(time.time() - latency_s, 6),
+            "model": model,
+            "prompt": prompt,
+            "system": system,
+            "options": options or None,
+            "latency_ms": round(latency_s * 1000, 3),
+            "backend": backend,
+            "prompt_tokens": _response_field(response, "prompt_eval_count"),
+            "completion_tokens": _response_field(response, "eval_count"),
+            "output_chars": output_chars,
+            "error": None if error is None else f"{type(error).__name__}: {error}",
+        }
+        line = json.dumps(
+            {k: v for k, v in entry.items() if v is not None},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the records of a JSONL log, skipping blank or corrupt lines."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A torn final line from a crashed writer
+                continue
+
+
+def replay(
+    records: List[Dict[str, Any]],
+    call: Callable[[Dict[str, Any]], Any],
+    speed: float = 1.0,
+    concurrency: int = 32,
+) -> Dict[str, Any]:
+    """Re-issue `records` through `call` and report throughput and latency.
+
+    Requests start at their recorded offsets divided by `speed`
+    (``speed=0`` sends them as fast as `concurrency` allows).
+    """
+    records = sorted(records, key=lambda r: r.get("ts", 0))
+    if not records:
+        return {"requests": 0}
+    latencies = LatencyTracker(window=len(records))
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def run(record: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            call(record)
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+        latencies.record(time.perf_counter() - started)
+
+    first_ts = records[0].get("ts", 0)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        began = time.perf_counter()
+        futures = []
+        for record in records:
+            if speed > 0:
+                due = (record.get("ts", first_ts) - first_ts) / speed
+                delay = due - (time.perf_counter() - began)
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(pool.submit(run, record))
+        wait(futures)
+        elapsed = time.perf_counter() - began
+
+    def ms(pct: float) -> float:
+        return round(latencies.percentile(pct) * 1000, 3)
+
+    return {
+        "requests": len(records),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(records) / elapsed, 2) if elapsed else None,
+        "latency_ms": {"p50": ms(50), "p95": ms(95), "p99": ms(99), "max": ms(100)},
+    }
+
+
+def llm_caller(
+    base_url: Optional[str] = None,
+    model: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> Callable[[Dict[str, Any]], str]:
+    """Build a `replay` callback that sends records through `SimpleOllamaLLM`.
+
+    `model` overrides the recorded model; one wrapper is kept per
+    (model, system prompt) pair.
+    """
+    from .ollama_wrapper import SimpleOllamaLLM
+
+    llms: Dict[Any, SimpleOllamaLLM] = {}
+    lock = threading.Lock()
+
+    def call(record: Dict[str, Any]) -> str:
+        key = (model or record["model"], record.get("system"))
+        with lock:
+            llm = llms.get(key)
+            if llm is None:
+                llm = llms[key] = SimpleOllamaLLM(
+                    model=key[0],
+                    base_url=base_url,
+                    timeout=timeout,
+                    system_prompt=key[1],
+                )
+        options = dict(record.get("options") or {})
+        stop = options.pop("stop", None)
+        return llm.generate_text(record["prompt"], stop, **options)
+
+    return call
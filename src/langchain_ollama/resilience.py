@@ -0,0 +1,394 @@
+"""Failure-handling primitives for the Ollama backends.
+
+- ``CircuitBreaker``: stops calling a backend after repeated failures and
+  lets a single probe through once a cool-down has passed (half-open).
+- ``BreakerRegistry``: one breaker per backend/endpoint key.
+- ``Deadline``: an overall time budget shared by every attempt of a call.
+- ``RetryPolicy``: exponential backoff with full jitter for transient errors.
+- ``hedged_call``: race a backup request against a slow first one.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Classic three-state circuit breaker.
+
+    Parameters:
+        failure_threshold: consecutive failures that open the circuit
+        recovery_timeout: seconds to stay open before allowing a probe
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._cooled_down():
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now.
+
+        While open, returns False until ``recovery_timeout`` has elapsed;
+        then exactly one caller is let through as the half-open probe.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and self._cooled_down():
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """End a half-open probe without a verdict.
+
+        For calls that were cancelled or failed in a way that says nothing
+        about the backend; the state is unchanged and the next caller is
+        let through as a new probe. Harmless after `record_success` or
+        `record_failure`, so call it from a ``finally``.
+        """
+        with self._lock:
+            self._probing = False
+
+    def reset(self) -> None:
+        self.record_success()
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.recovery_timeout
+
+
+class BreakerRegistry:
+    """Lazily creates one ``CircuitBreaker`` per backend/endpoint key."""
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._breakers: Dict[Hashable, CircuitBreaker] = {}
+
+    def get(self, key: Hashable) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(
+                    self.failure_threshold, self.recovery_timeout
+                )
+            return breaker
+
+    def configure(
+        self,
+        failure_threshold: Optional[int] = None,
+        recovery_timeout: Optional[float] = None,
+    ) -> None:
+        """Change the defaults; existing breakers are dropped and recreated."""
+        with self._lock:
+            if failure_threshold is not None:
+                self.failure_threshold = failure_threshold
+            if recovery_timeout is not None:
+                self.recovery_timeout = recovery_timeout
+            self._breakers.clear()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._breakers.clear()
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            items = list(self._breakers.items())
+        return {
+            ":".join(map(str, k)) if isinstance(k, tuple) else str(k): b.state
+            for k, b in items
+        }
+
+
+class Deadline:
+    """Overall time budget for a call; ``timeout=None`` means unbounded.
+
+    ``cancel`` is an optional event the caller sets to abandon the call
+    (e.g. from an asyncio task that was cancelled); code holding the
+    deadline checks ``cancelled()`` and sleeps with ``sleep()``.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+    ):
+        self.timeout = timeout
+        self.cancel = cancel
+        self.expires_at = None if timeout is None else time.monotonic() + timeout
+
+    def remaining(self, cap: Optional[float] = None) -> Optional[float]:
+        """Seconds left (never negative), optionally capped at ``cap``."""
+        if self.expires_at is None:
+            return cap
+        left = max(0.0, self.expires_at - time.monotonic())
+        return left if cap is None else min(cap, left)
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def cancelled(self) -> bool:
+        return self.cancel is not None and self.cancel.is_set()
+
+    def sleep(self, seconds: float) -> bool:
+        """Sleep up to ``seconds``; returns True if cancelled meanwhile."""
+        if self.cancel is None:
+            time.sleep(seconds)
+            return False
+        return self.cancel.wait(seconds)
+
+
+# HTTP statuses worth retrying: timeouts, throttling and server-side hiccups
+# such as Ollama answering 503 while a model is still loading.
+_TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# httpx transport errors, matched by name so httpx needn't be imported.
+_TRANSIENT_NAMES = {
+    "ConnectError",
+    "ConnectTimeout",
+    "PoolTimeout",
+    "ReadError",
+    "ReadTimeout",
+    "RemoteProtocolError",
+    "WriteError",
+}
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Return True for errors where an identical retry may succeed."""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    if getattr(exc, "status_code", None) in _TRANSIENT_STATUS:
+        return True
+    if type(exc).__name__ in _TRANSIENT_NAMES:
+        return True
+    return "loading model" in str(exc).lower()
+
+
+def is_request_error(exc: BaseException) -> bool:
+    """Return True for 4xx responses blaming the request, not the backend.
+
+    An unknown model (404) or invalid options (400) say nothing about the
+    endpoint's health, so they must not count towards its circuit breaker.
+    Timeouts and throttling (408, 429) are excluded.
+    """
+    status = getattr(exc, "status_code", None)
+    return (
+        isinstance(status, int)
+        and 400 <= status < 500
+        and status not in _TRANSIENT_STATUS
+    )
+
+
+@dataclass
+class RetryPolicy:
+    """Retry idempotent calls with exponential backoff and full jitter.
+
+    Parameters:
+        max_attempts: total attempts including the first one
+        base_delay: backoff before the first retry, doubled per attempt
+        max_delay: upper bound for a single backoff
+        retry_on: predicate deciding whether an exception is retryable
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 0.25
+    max_delay: float = 4.0
+    retry_on: Callable[[BaseException], bool] = is_transient_error
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number ``attempt`` (1-based), fully jittered."""
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+    def call(self, fn: Callable[[], Any], deadline: Optional[Deadline] = None) -> Any:
+        """Call ``fn`` until it succeeds, attempts run out or ``deadline`` passes."""
+        attempt = 1
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.retry_on(e):
+                    raise
+                delay = self.backoff(attempt)
+                if deadline is None:
+                    time.sleep(delay)
+                elif deadline.remaining(delay) < delay or deadline.sleep(delay):
+                    raise
+                attempt += 1
+
+    async def acall(
+        self, fn: Callable[[], Any], deadline: Optional[Deadline] = None
+    ) -> Any:
+        """Async ``call``: ``fn`` returns an awaitable, backoff uses asyncio."""
+        import asyncio
+
+        attempt = 1
+        while True:
+            try:
+                return await fn()
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.retry_on(e):
+                    raise
+                delay = self.backoff(attempt)
+                if deadline is not None:
+                    if deadline.cancelled() or deadline.remaining(delay) < delay:
+                        raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+class LatencyTracker:
+    """Rolling window of latency samples with percentile lookup."""
+
+    def __init__(self, window: int = 256):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            data = sorted(self._samples)
+        if not data:
+            return None
+        index = min(len(data) - 1, max(0, round(pct / 100 * len(data)) - 1))
+        return data[index]
+
+
+# Hedged attempts block on network I/O, so a small shared pool is enough.
+_hedge_pool = ThreadPoolExecutor(thread_name_prefix="ollama-hedge")
+# How often a hedged call with a `check` runs it while waiting.
+_HEDGE_POLL = 0.05
+
+
+class _Attempt:
+    def __init__(self, cond: threading.Condition):
+        self._cond = cond
+        self.cancel = threading.Event()
+        self.has_output = False
+        self.done = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def on_token(self) -> None:
+        if not self.has_output:
+            with self._cond:
+                self.has_output = True
+                self._cond.notify_all()
+
+    def run(self, fn: Callable[..., Any]) -> None:
+        try:
+            result, error = fn(self.on_token, self.cancel), None
+        except BaseException as e:
+            result, error = None, e
+        with self._cond:
+            self.result, self.error, self.done = result, error, True
+            self._cond.notify_all()
+
+
+def hedged_call(
+    attempts: Sequence[Callable[[Callable[[], None], threading.Event], Any]],
+    hedge_after: float,
+    check: Optional[Callable[[], None]] = None,
+) -> Any:
+    """Run ``attempts[0]``, adding the next attempt while nothing has streamed.
+
+    Each attempt is called as ``fn(on_token, cancel)``: it must call
+    ``on_token()`` when its first output token arrives and should stop
+    early once ``cancel`` is set. Whenever the current attempts have
+    produced no token for ``hedge_after`` seconds (or all have failed) the
+    next attempt is started. The first attempt to stream a token wins; the
+    others are cancelled. If every attempt fails, the last error is raised.
+
+    ``check`` is called every few milliseconds while waiting (e.g. to
+    enforce a `Deadline`); whatever it raises cancels all attempts and is
+    raised from here.
+    """
+    cond = threading.Condition()
+    started: List[_Attempt] = []
+    pending = list(attempts)
+
+    def launch() -> float:
+        attempt = _Attempt(cond)
+        started.append(attempt)
+        _hedge_pool.submit(attempt.run, pending.pop(0))
+        return time.monotonic() + hedge_after
+
+    def wait(seconds: Optional[float]) -> None:
+        if check is not None:
+            seconds = _HEDGE_POLL if seconds is None else min(seconds, _HEDGE_POLL)
+        cond.wait(seconds)
+        if check is not None:
+            try:
+                check()
+            except BaseException:
+                for attempt in started:
+                    attempt.cancel.set()
+                raise
+
+    with cond:
+        next_hedge = launch()
+        while True:
+            winner = next(
+                (a for a in started if a.has_output or (a.done and not a.error)),
+                None,
+            )
+            if winner is not None:
+                break
+            exhausted = all(a.done for a in started)
+            if pending and (exhausted or time.monotonic() >= next_hedge):
+                next_hedge = launch()
+                continue
+            if exhausted:
+                raise started[-1].error
+            wait(next_hedge - time.monotonic() if pending else None)
+        for attempt in started:
+            if attempt is not winner:
+                attempt.cancel.set()
+        while not winner.done:
+            wait(None)
+    if winner.error is not None:
+        raise winner.error
+    return winner.result
@@ -0,0 +1,250 @@
+"""Route each request to one of several models.
+
+Small local models answer short questions quickly, large ones handle long
+contexts. ``ModelRouter`` holds one wrapper per model, ordered from the
+smallest to the largest, and for every request picks the first model that
+
+- accepts the prompt (its ``max_prompt_tokens`` is at least the estimated
+  prompt size), and
+- is predicted to answer within the caller's latency budget, if any.
+
+Predictions come from live per-model stats: the time each prompt token
+took to evaluate and the rest of the request (load, generation). Models
+without enough samples yet are assumed to fit, so they get measured.
+Prompts longer than every limit go to the last, largest model.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from .history import estimate_tokens
+from .resilience import LatencyTracker
+from .usage import Completion
+
+# Samples a model needs before its latency estimate is trusted
+_MIN_SAMPLES = 3
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """A routable model.
+
+    ``max_prompt_tokens`` is the longest prompt (in estimated tokens) the
+    model should be given; None means no limit.
+    """
+
+    model: str
+    max_prompt_tokens: Optional[int] = None
+
+
+def parse_routes(spec: str) -> List[ModelRoute]:
+    """Parse ``"llama3.2:1b=2048,llama3.1:8b"`` into routes.
+
+    Entries are comma-separated, smallest model first; ``=N`` sets the
+    model's `max_prompt_tokens`.
+    """
+    routes = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        model, _, limit = entry.partition("=")
+        routes.append(ModelRoute(model.strip(), int(limit) if limit else None))
+    return routes
+
+
+class _ModelStats:
+    def __init__(self):
+        # Seconds per prompt token, and the rest of each request in seconds
+        self.prefill = LatencyTracker()
+        self.overhead = LatencyTracker()
+        self.requests = 0
+        self.routed = 0
+
+
+class ModelRouter:
+    """Choose a model per request by prompt size and latency budget.
+
+    Parameters:
+        routes: `ModelRoute`s or model names, smallest/fastest first
+        llm_factory: builds the wrapper for one model (default
+            `ollama_wrapper.OllamaLLM`); called as ``llm_factory(model=...,
+            **llm_kwargs)``
+        percentile: latency percentile used for predictions (default p90)
+        llm_kwargs: passed to every wrapper (base_url, timeout, ...)
+
+    `complete`, `acomplete` and calling the router work like the wrappers
+    and take an extra `latency_budget` in seconds.
+    """
+
+    def __init__(
+        self,
+        routes: Sequence[Union[ModelRoute, str]],
+        llm_factory: Optional[Callable[..., Any]] = None,
+        percentile: float = 90,
+        **llm_kwargs: Any,
+    ):
+        if not routes:
+            raise ValueError("at least one route is required")
+        if llm_factory is None:
+            from .ollama_wrapper import OllamaLLM as llm_factory
+        self.routes = [
+            r if isinstance(r, ModelRoute) else ModelRoute(r) for r in routes
+        ]
+        self.percentile = percentile
+        self.llms = {
+            r.model: llm_factory(model=r.model, **llm_kwargs) for r in self.routes
+        }
+        self._stats = {r.model: _ModelStats() for r in self.routes}
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> str:
+        """The fallback (largest) model."""
+        return self.routes[-1].model
+
+    def estimate(self, model: str, prompt_tokens: int) -> Optional[float]:
+        """Predicted seconds for a prompt of `prompt_tokens` on `model`.
+
+        None until the model has answered a few requests.
+        """
+        stats = self._stats[model]
+        if len(stats.overhead) < _MIN_SAMPLES:
+            return None
+        predicted = stats.overhead.percentile(self.percentile)
+        per_token = stats.prefill.percentile(self.percentile)
+        if per_token is not None:
+            predicted += per_token * prompt_tokens
+        return predicted
+
+    def choose(self, prompt: str, latency_budget: Optional[float] = None) -> ModelRoute:
+        """The route a request for `prompt` would take."""
+        tokens = estimate_tokens(prompt)
+        fitting = [
+            r
+            for r in self.routes
+            if r.max_prompt_tokens is None or tokens <= r.max_prompt_tokens
+        ]
+        if not fitting:
+            # Longer than every limit: only the largest model has a chance
+            return self.routes[-1]
+        if latency_budget is None:
+            return fitting[0]
+        estimates = [self.estimate(r.model, tokens) for r in fitting]
+        for route, predicted in zip(fitting, estimates):
+            if predicted is None or predicted <= latency_budget:
+                return route
+        # Nothing fits the budget: take the fastest that accepts the prompt
+        return min(zip(fitting, estimates), key=lambda pair: pair[1])[0]
+
+    def record(self, model: str, completion: Completion, seconds: float) -> None:
+        """Add one finished request on `model` to its latency stats."""
+        stats = self._stats.get(model)
+        if stats is None or completion.backend == "cache":
+            return
+        prefill = 0.0
+        if completion.prompt_tokens and completion.prompt_eval_ms is not None:
+            prefill = completion.prompt_eval_ms / 1000
+            stats.prefill.record(prefill / completion.prompt_tokens)
+        stats.overhead.record(max(0.0, seconds - prefill))
+        with self._lock:
+            stats.requests += 1
+
+    def _route(self, prompt: str, latency_budget: Optional[float]) -> ModelRoute:
+        route = self.choose(prompt, latency_budget)
+        with self._lock:
+            self._stats[route.model].routed += 1
+        return route
+
+    def complete(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        latency_budget: Optional[float] = None,
+        **options: Any,
+    ) -> Completion:
+        route = self._route(prompt, latency_budget)
+        started = time.monotonic()
+        result = self.llms[route.model].complete(prompt, stop, **options)
+        self.record(route.model, result, time.monotonic() - started)
+        return result
+
+    async def acomplete(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        latency_budget: Optional[float] = None,
+        **options: Any,
+    ) -> Completion:
+        route = self._route(prompt, latency_budget)
+        started = time.monotonic()
+        result = await self.llms[route.model].acomplete(prompt, stop, **options)
+        self.record(route.model, result, time.monotonic() - started)
+        return result
+
+    def __call__(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        latency_budget: Optional[float] = None,
+        **options: Any,
+    ) -> str:
+        return self.complete(prompt, stop, latency_budget, **options).text
+
+    def stream_text(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        latency_budget: Optional[float] = None,
+        **options: Any,
+    ) -> Iterator[str]:
+        """The routed wrapper's `stream_text`; not added to latency stats."""
+        route = self._route(prompt, latency_budget)
+        return self.llms[route.model].stream_text(prompt, stop, **options)
+
+    def astream_text(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        latency_budget: Optional[float] = None,
+        **options: Any,
+    ) -> AsyncIterator[str]:
+        route = self._route(prompt, latency_budget)
+        return self.llms[route.model].astream_text(prompt, stop, **options)
+
+    def embed(self, texts: Any, model: Optional[str] = None) -> Any:
+        """Embeddings through the fallback model's wrapper."""
+        return self.llms[self.model].embed(texts, model=model)
+
+    async def aembed(self, texts: Any, model: Optional[str] = None) -> Any:
+        return await self.llms[self.model].aembed(texts, model=model)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-model request counts and latency estimates."""
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 3)
+
+        out = {}
+        for route in self.routes:
+            stats = self._stats[route.model]
+            out[route.model] = {
+                "max_prompt_tokens": route.max_prompt_tokens,
+                "routed": stats.routed,
+                "requests": stats.requests,
+                "overhead_ms": ms(stats.overhead.percentile(self.percentile)),
+                "prefill_ms_per_token": ms(stats.prefill.percentile(self.percentile)),
+            }
+        return out
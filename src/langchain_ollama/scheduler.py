@@ -0,0 +1,244 @@
+"""Priority request scheduler for sharing one Ollama server.
+
+Interactive chat traffic and batch jobs compete for the same model. The
+scheduler sits in front of the model call and decides which request runs
+next:
+
+- priority classes (e.g. ``interactive`` before ``batch``)
+- a concurrency cap per class plus a global cap
+- round-robin (fair) queuing between sessions/tenants inside a class
+- requests whose deadline already passed are dropped instead of run
+
+It works for threaded callers (``submit`` / ``map``) and for asyncio code
+such as the FastAPI examples (``await scheduler.run(...)``).
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from . import tracing
+
+
+class SchedulerError(RuntimeError):
+    pass
+
+
+class DeadlineExceeded(SchedulerError):
+    """Raised for requests dropped because their caller already timed out."""
+
+
+@dataclass(frozen=True)
+class PriorityClass:
+    """A named class of requests.
+
+    Lower ``priority`` values are dispatched first. ``max_concurrency``
+    caps how many requests of this class may run at the same time.
+    """
+
+    name: str
+    priority: int
+    max_concurrency: int
+
+
+DEFAULT_CLASSES = (
+    PriorityClass("interactive", priority=0, max_concurrency=4),
+    PriorityClass("batch", priority=10, max_concurrency=1),
+)
+
+
+@dataclass
+class _Job:
+    fn: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    future: Future
+    deadline: Optional[float]
+    # time.perf_counter() at submit, for the "scheduler.queue" trace span
+    queued_at: float = 0.0
+
+
+class _ClassState:
+    def __init__(self, spec: PriorityClass):
+        self.spec = spec
+        self.running = 0
+        self.queued = 0
+        # session key -> pending jobs; iteration order is the round-robin order
+        self.sessions: "OrderedDict[Any, deque]" = OrderedDict()
+
+    def push(self, session: Any, job: _Job) -> None:
+        self.sessions.setdefault(session, deque()).append(job)
+        self.queued += 1
+
+    def pop(self) -> _Job:
+        session, jobs = next(iter(self.sessions.items()))
+        job = jobs.popleft()
+        if jobs:
+            # Move the session to the back so other sessions get a turn.
+            self.sessions.move_to_end(session)
+        else:
+            del self.sessions[session]
+        self.queued -= 1
+        return job
+
+
+class RequestScheduler:
+    """Dispatch model calls by priority class with fair per-session queuing.
+
+    Parameters:
+        classes: priority classes to accept (default: interactive + batch)
+        max_concurrency: global cap on requests running at once; this is
+            also the size of the worker thread pool
+    """
+
+    def __init__(
+        self,
+        classes: Optional[Sequence[PriorityClass]] = None,
+        max_concurrency: int = 4,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+        self.max_concurrency = max_concurrency
+        self._classes: Dict[str, _ClassState] = {
+            c.name: _ClassState(c) for c in (classes or DEFAULT_CLASSES)
+        }
+        # Dispatch order never changes, so sort once.
+        self._order: List[_ClassState] = sorted(
+            self._classes.values(), key=lambda s: s.spec.priority
+        )
+        self._lock = threading.Lock()
+        self._running = 0
+        self._anon = itertools.count()
+        self._counters = {"submitted": 0, "completed": 0, "dropped": 0}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="ollama-sched"
+        )
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        priority: str = "interactive",
+        session: Optional[str] = None,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Future:
+        """Queue ``fn(*args, **kwargs)`` and return a ``Future`` for its result.
+
+        ``timeout`` (seconds from now) or ``deadline`` (``time.monotonic()``
+        value) mark when the caller stops waiting; if the request has not
+        started by then it is dropped with ``DeadlineExceeded``. Cancelling
+        the returned future before it starts also removes the request.
+        """
+        state = self._classes.get(priority)
+        if state is None:
+            raise SchedulerError(f"Unknown priority class: {priority!r}")
+        if timeout is not None:
+            limit = time.monotonic() + timeout
+            deadline = limit if deadline is None else min(deadline, limit)
+
+        job = _Job(fn, args, kwargs, Future(), deadline, time.perf_counter())
+        # Requests without a session each get their own queue slot so they
+        # do not all share (and get throttled as) a single tenant.
+        key = session if session is not None else ("anon", next(self._anon))
+        with self._lock:
+            self._counters["submitted"] += 1
+            state.push(key, job)
+            self._dispatch_locked()
+        return job.future
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Async variant of ``submit`` that awaits the result.
+
+        Cancelling the awaiting task (e.g. a client disconnect or an
+        ``asyncio.wait_for`` timeout) drops the request if it is still queued.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def map(
+        self,
+        fn: Callable[[Any], Any],
+        items: Iterable[Any],
+        priority: str = "batch",
+        session: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> List[Any]:
+        """Run ``fn`` over ``items`` at ``priority`` and return results in order."""
+        futures = [
+            self.submit(fn, item, priority=priority, session=session, timeout=timeout)
+            for item in items
+        ]
+        return [f.result() for f in futures]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._running,
+                "max_concurrency": self.max_concurrency,
+                "classes": {
+                    name: {
+                        "running": s.running,
+                        "queued": s.queued,
+                        "sessions": len(s.sessions),
+                        "max_concurrency": s.spec.max_concurrency,
+                    }
+                    for name, s in self._classes.items()
+                },
+                **self._counters,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _dispatch_locked(self) -> None:
+        now = time.monotonic()
+        while self._running < self.max_concurrency:
+            state = next(
+                (
+                    s
+                    for s in self._order
+                    if s.queued and s.running < s.spec.max_concurrency
+                ),
+                None,
+            )
+            if state is None:
+                return
+            job = state.pop()
+            if not job.future.set_running_or_notify_cancel():
+                self._counters["dropped"] += 1
+                continue
+            if job.deadline is not None and now >= job.deadline:
+                self._counters["dropped"] += 1
+                job.future.set_exception(
+                    DeadlineExceeded("Request dropped: caller deadline passed")
+                )
+                continue
+            state.running += 1
+            self._running += 1
+            self._executor.submit(self._run_job, state, job)
+
+    def _run_job(self, state: _ClassState, job: _Job) -> None:
+        tracing.record(
+            "scheduler.queue",
+            job.queued_at,
+            time.perf_counter(),
+            priority=state.spec.name,
+        )
+        try:
+            result = job.fn(*job.args, **job.kwargs)
+        except BaseException as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+        finally:
+            with self._lock:
+                state.running -= 1
+                self._running -= 1
+                self._counters["completed"] += 1
+                self._dispatch_locked()
@@ -0,0 +1,433 @@
+"""SQLite-backed state that several server processes can share.
+
+Running the example servers with more than one worker (``uvicorn
+--workers N``, gunicorn) gives every process its own module globals, so
+state that must be shared lives in one SQLite file in WAL mode instead:
+
+- ``ResponseCache``: replies for identical requests, used by the wrappers'
+  `response_cache` option
+- ``SessionStore``: chat histories, loaded as ``ConversationHistory``
+- ``ConversationArchive``: a ``SessionStore`` with a per-session index,
+  recent-window loading and the Ollama ``context`` of each session, so a
+  restarted server resumes a chat without re-sending its transcript
+- ``SharedUsageTracker``: per-session token usage, same interface as
+  ``usage.UsageTracker``
+
+All of them may use the same database file. Connections are per thread and
+per process, so the objects can be created before the server forks.
+``MemorySessionStore`` is the single-process equivalent of ``SessionStore``.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from .history import ConversationHistory, estimate_tokens
+from .usage import Completion
+
+
+class _SQLite:
+    """Per-thread, fork-safe connections to one database in WAL mode."""
+
+    _SCHEMA = ""
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._conn().executescript(self._SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            # Never reuse a connection inherited across fork()
+            conn = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+
+class ResponseCache(_SQLite):
+    """Replies keyed by the full request, shared across processes.
+
+    Parameters:
+        path: SQLite database file
+        ttl: seconds an entry stays valid (default: forever)
+        max_entries: oldest entries are evicted beyond this size
+
+    Only identical requests (model, system prompt, prompt and options)
+    hit, so it pays off for repeated deterministic prompts; sampling
+    options such as a non-zero temperature are not taken into account.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS response_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            created REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS response_cache_created
+            ON response_cache (created);
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = None,
+        max_entries: int = 10000,
+        timeout: float = 30.0,
+    ):
+        super().__init__(path, timeout)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+
+    @staticmethod
+    def key(model: str, prompt: str, **request: Any) -> str:
+        """Stable key for a request; `request` holds system, options, ..."""
+        blob = json.dumps(
+            {"model": model, "prompt": prompt, **request},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = (
+            self._conn()
+            .execute("SELECT value, created FROM response_cache WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is not None and self.ttl is not None:
+            if time.time() - row[1] > self.ttl:
+                self._conn().execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO response_cache (key, value, created) "
+            "VALUES (?, ?, ?)",
+            (key, json.dumps(value, separators=(",", ":")), time.time()),
+        )
+        self._puts += 1
+        if self._puts % 100 == 0:
+            self._evict()
+
+    def _evict(self) -> None:
+        self._conn().execute(
+            "DELETE FROM response_cache WHERE key IN (SELECT key FROM "
+            "response_cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM response_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counts of this process plus the shared entry count."""
+        (entries,) = (
+            self._conn().execute("SELECT COUNT(*) FROM response_cache").fetchone()
+        )
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "entries": entries,
+        }
+
+
+class SessionStore(_SQLite):
+    """Chat histories shared by all workers, one row per turn."""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS session_turns (
+            session TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            text TEXT NOT NULL,
+            tokens INTEGER,
+            PRIMARY KEY (session, seq)
+        ) WITHOUT ROWID;
+    """
+
+    def append(
+        self, session: str, role: str, text: str, tokens: Optional[int] = None
+    ) -> None:
+        # A single INSERT ... SELECT is atomic, so concurrent workers never
+        # hand out the same sequence number.
+        self._conn().execute(
+            "INSERT INTO session_turns (session, seq, role, text, tokens) "
+            "SELECT ?, COALESCE(MAX(seq) + 1, 0), ?, ?, ? "
+            "FROM session_turns WHERE session = ?",
+            (session, role, text, tokens, session),
+        )
+
+    def load(self, session: str) -> ConversationHistory:
+        history = ConversationHistory()
+        rows = self._conn().execute(
+            "SELECT role, text, tokens FROM session_turns "
+            "WHERE session = ? ORDER BY seq",
+            (session,),
+        )
+        for role, text, tokens in rows:
+            history.append(role, text, tokens)
+        return history
+
+    def delete(self, session: str) -> None:
+        self._conn().execute("DELETE FROM session_turns WHERE session = ?", (session,))
+
+
+class ConversationArchive(SessionStore):
+    """Append-only conversation log with an index row per session.
+
+    Turns go to the same table as `SessionStore`, so existing histories
+    stay readable. The index row holds the turn count and token total
+    (point lookups instead of scanning the log), plus the Ollama `context`
+    returned with the session's latest reply: the token ids of the whole
+    conversation so far. A server that restarts can pass that context to
+    `complete_in_context` and send only the new message, rather than
+    re-rendering and re-evaluating the transcript. `load(session, recent=n)`
+    reads just the last `n` turns for display or for priming a session that
+    has no context.
+    """
+
+    _SCHEMA = (
+        SessionStore._SCHEMA
+        + """
+        CREATE TABLE IF NOT EXISTS session_index (
+            session TEXT PRIMARY KEY,
+            turns INTEGER NOT NULL,
+            tokens INTEGER NOT NULL,
+            context BLOB,
+            context_turns INTEGER,
+            updated REAL NOT NULL
+        ) WITHOUT ROWID;
+    """
+    )
+
+    def append(
+        self, session: str, role: str, text: str, tokens: Optional[int] = None
+    ) -> int:
+        """Add a turn; returns its sequence number."""
+        conn = self._conn()
+        # The write lock is taken up front, so the index row read below
+        # cannot change before the turn is inserted
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT turns, tokens FROM session_index WHERE session = ?",
+                (session,),
+            ).fetchone()
+            if row is None:
+                # Histories written by a plain SessionStore have no index yet
+                row = conn.execute(
+                    "SELECT COUNT(*), "
+                    "COALESCE(SUM(COALESCE(tokens, (LENGTH(text) + 3) / 4)), 0) "
+                    "FROM session_turns WHERE session = ?",
+                    (session,),
+                ).fetchone()
+            seq, total = row
+            conn.execute(
+                "INSERT INTO session_turns (session, seq, role, text, tokens) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (session, seq, role, text, tokens),
+            )
+            total += estimate_tokens(text) if tokens is None else tokens
+            conn.execute(
+                "INSERT INTO session_index (session, turns, tokens, updated) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (session) DO UPDATE SET "
+                "turns = excluded.turns, tokens = excluded.tokens, "
+                "updated = excluded.updated",
+                (session, seq + 1, total, time.time()),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return seq
+
+    def load(self, session: str, recent: Optional[int] = None) -> ConversationHistory:
+        """The session's turns, or only the last `recent` of them."""
+        if recent is None:
+            return super().load(session)
+        history = ConversationHistory()
+        # Walks the primary key backwards, so the cost does not depend on
+        # how long the session is
+        rows = self._conn().execute(
+            "SELECT role, text, tokens FROM session_turns "
+            "WHERE session = ? ORDER BY seq DESC LIMIT ?",
+            (session, max(recent, 0)),
+        )
+        for role, text, tokens in reversed(rows.fetchall()):
+            history.append(role, text, tokens)
+        return history
+
+    def info(self, session: str) -> Optional[Dict[str, Any]]:
+        """Turn count, token total, turns covered by the stored context
+        and last update time; None for unknown sessions."""
+        row = (
+            self._conn()
+            .execute(
+                "SELECT turns, tokens, context_turns, updated "
+                "FROM session_index WHERE session = ?",
+                (session,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        turns, tokens, context_turns, updated = row
+        return {
+            "turns": turns,
+            "tokens": tokens,
+            "context_turns": context_turns,
+            "updated": updated,
+        }
+
+    def set_context(
+        self, session: str, context: Optional[Sequence[int]], turns: int = 0
+    ) -> None:
+        """Store Ollama's `context` covering the first `turns` turns, or
+        forget it (`context=None`)."""
+        blob = None if context is None else array("I", context).tobytes()
+        self._conn().execute(
+            "UPDATE session_index SET context = ?, context_turns = ? "
+            "WHERE session = ?",
+            (blob, None if context is None else turns, session),
+        )
+
+    def context(self, session: str) -> Optional[Tuple[List[int], int]]:
+        """The stored context and the number of turns it covers."""
+        row = (
+            self._conn()
+            .execute(
+                "SELECT context, context_turns FROM session_index "
+                "WHERE session = ? AND context IS NOT NULL",
+                (session,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        ids = array("I")
+        ids.frombytes(row[0])
+        return ids.tolist(), row[1]
+
+    def delete(self, session: str) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM session_turns WHERE session = ?", (session,))
+            conn.execute("DELETE FROM session_index WHERE session = ?", (session,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class MemorySessionStore:
+    """In-process `SessionStore` for single-worker servers."""
+
+    def __init__(self):
+        self._histories: Dict[str, ConversationHistory] = {}
+
+    def append(
+        self, session: str, role: str, text: str, tokens: Optional[int] = None
+    ) -> None:
+        history = self._histories.get(session)
+        if history is None:
+            history = self._histories[session] = ConversationHistory()
+        history.append(role, text, tokens)
+
+    def load(self, session: str) -> ConversationHistory:
+        history = self._histories.get(session)
+        return ConversationHistory() if history is None else history
+
+    def delete(self, session: str) -> None:
+        self._histories.pop(session, None)
+
+
+class SharedUsageTracker(_SQLite):
+    """`usage.UsageTracker` whose totals live in SQLite."""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS session_usage (
+            session TEXT PRIMARY KEY,
+            requests INTEGER NOT NULL,
+            prompt_tokens INTEGER NOT NULL,
+            completion_tokens INTEGER NOT NULL
+        );
+    """
+
+    def record(self, session: Hashable, completion: Completion) -> Dict[str, Any]:
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO session_usage VALUES (?, 1, ?, ?) "
+            "ON CONFLICT (session) DO UPDATE SET requests = requests + 1, "
+            "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+            "completion_tokens = completion_tokens + excluded.completion_tokens",
+            (
+                str(session),
+                completion.prompt_tokens or 0,
+                completion.completion_tokens or 0,
+            ),
+        )
+        return self.get(session)
+
+    def get(self, session: Hashable) -> Dict[str, Any]:
+        row = (
+            self._conn()
+            .execute(
+                "SELECT requests, prompt_tokens, completion_tokens "
+                "FROM session_usage WHERE session = ?",
+                (str(session),),
+            )
+            .fetchone()
+        )
+        return self._view(*(row or (0, 0, 0)))
+
+    def totals(self) -> Dict[str, Any]:
+        sessions, requests, prompt, completion = (
+            self._conn()
+            .execute(
+                "SELECT COUNT(*), COALESCE(SUM(requests), 0), "
+                "COALESCE(SUM(prompt_tokens), 0), "
+                "COALESCE(SUM(completion_tokens), 0) FROM session_usage"
+            )
+            .fetchone()
+        )
+        return {"sessions": sessions, **self._view(requests, prompt, completion)}
+
+    def reset(self, session: Optional[Hashable] = None) -> None:
+        if session is None:
+            self._conn().execute("DELETE FROM session_usage")
+        else:
+            self._conn().execute(
+                "DELETE FROM session_usage WHERE session = ?", (str(session),)
+            )
+
+    @staticmethod
+    def _view(requests: int, prompt: int, completion: int) -> Dict[str, Any]:
+        return {
+            "requests": requests,
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+        }
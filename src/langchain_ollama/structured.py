@@ -0,0 +1,408 @@
+"""Structured (JSON schema) output with incremental validation.
+
+``complete_structured(prompt, Model)`` on either ``OllamaLLM`` sends the
+Pydantic model's JSON schema as Ollama's ``format`` and returns a
+``Model`` instance. The reply is parsed while it streams: as soon as the
+text can no longer become a document matching the schema (a wrong type,
+an unknown key where none are allowed, a string outside an ``enum``,
+trailing prose) the stream is closed, which stops generation, and
+``StructuredOutputError`` is raised instead of paying for the rest of a
+reply that would fail validation anyway.
+
+The incremental check covers ``type``, ``properties``, ``required``,
+``additionalProperties``, ``items``, ``enum``/``const``, ``maxItems``/
+``minItems``, ``anyOf``/``oneOf`` (by type) and local ``$ref``s, which is
+what Pydantic emits for plain models. Everything else is left to the
+final Pydantic validation.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Set
+
+from .transforms import Transform
+
+_LITERALS = {"t": "true", "f": "false", "n": "null"}
+_NUMBER_CHARS = set("0123456789+-.eE")
+
+
+class StructuredOutputError(ValueError):
+    """The reply does not match the requested schema.
+
+    `text` is the reply received up to the point of failure.
+    """
+
+    def __init__(self, message: str, text: str = ""):
+        super().__init__(message)
+        self.text = text
+
+
+def json_schema(schema: Any) -> Dict[str, Any]:
+    """The JSON schema of a Pydantic model class (v1 or v2) or a dict."""
+    if isinstance(schema, dict):
+        return schema
+    if hasattr(schema, "model_json_schema"):
+        return schema.model_json_schema()
+    return schema.schema()
+
+
+def parse(schema: Any, text: str) -> Any:
+    """Validate a complete reply: a `schema` instance, or the parsed JSON."""
+    try:
+        if isinstance(schema, dict):
+            return json.loads(text)
+        if hasattr(schema, "model_validate_json"):
+            return schema.model_validate_json(text)
+        return schema.parse_raw(text)
+    except ValueError as e:
+        # Pydantic's ValidationError is a ValueError in both major versions
+        raise StructuredOutputError(f"reply does not match schema: {e}", text) from e
+
+
+class _Container:
+    __slots__ = ("kind", "schema", "state", "keys", "key", "items")
+
+    def __init__(self, kind: str, schema: Dict[str, Any]):
+        self.kind = kind
+        self.schema = schema
+        # object: "key", "colon", "value", "next"; array: "value", "next"
+        self.state = "first"
+        self.keys: Set[str] = set()
+        self.key: Optional[str] = None
+        self.items = 0
+
+
+class JSONPrefixParser:
+    """Checks JSON text chunk by chunk against a JSON schema.
+
+    `feed` raises `StructuredOutputError` as soon as no continuation of the
+    text seen so far can match; `finish` raises if the document is
+    incomplete.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.root = schema
+        self._stack: List[_Container] = []
+        self._text: List[str] = []
+        # What the next characters are: "value", "string", "number",
+        # "literal", "after" (a value just ended) or "done"
+        self._mode = "value"
+        self._value_schema: Dict[str, Any] = schema
+        self._token = ""
+        self._is_key = False
+        self._escape = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._text)
+
+    def feed(self, text: str) -> None:
+        self._text.append(text)
+        for char in text:
+            self._char(char)
+
+    def finish(self) -> None:
+        if self._mode in ("number", "literal") and not self._stack:
+            self._end_scalar()
+        if self._mode != "done":
+            self._fail("reply ended before the JSON document was complete")
+
+    # -- schema helpers -----------------------------------------------------
+
+    def _resolve(self, schema: Any) -> Dict[str, Any]:
+        if not isinstance(schema, dict):
+            # `true` / `false` subschemas; false is handled by the caller
+            return {}
+        while "$ref" in schema and schema["$ref"].startswith("#/"):
+            node: Any = self.root
+            for part in schema["$ref"][2:].split("/"):
+                node = node[part.replace("~1", "/").replace("~0", "~")]
+            schema = {**node, **{k: v for k, v in schema.items() if k != "$ref"}}
+        if "allOf" in schema and len(schema["allOf"]) == 1:
+            # Pydantic v1 wraps referenced fields with descriptions like this
+            schema = {**self._resolve(schema["allOf"][0]), **schema}
+            del schema["allOf"]
+        return schema
+
+    def _types(self, schema: Dict[str, Any]) -> Optional[Set[str]]:
+        """JSON types `schema` allows, or None for any."""
+        if "const" in schema:
+            return {_json_type(schema["const"])}
+        if "enum" in schema:
+            return {_json_type(v) for v in schema["enum"]}
+        declared = schema.get("type")
+        if declared is not None:
+            types = {declared} if isinstance(declared, str) else set(declared)
+            if "number" in types:
+                types.add("integer")
+            return types
+        for combiner in ("anyOf", "oneOf"):
+            if combiner in schema:
+                union: Set[str] = set()
+                for option in schema[combiner]:
+                    option_types = self._types(self._resolve(option))
+                    if option_types is None:
+                        return None
+                    union |= option_types
+                return union
+        return None
+
+    def _branch(self, schema: Dict[str, Any], kind: str) -> Dict[str, Any]:
+        """The part of `schema` that applies to a value of JSON type `kind`."""
+        kinds = {kind, "integer"} if kind == "number" else {kind}
+        for combiner in ("anyOf", "oneOf"):
+            if combiner in schema:
+                matching = [
+                    s
+                    for s in map(self._resolve, schema[combiner])
+                    if (self._types(s) or kinds) & kinds
+                ]
+                # Ambiguous unions are only checked by type
+                return matching[0] if len(matching) == 1 else {}
+        return schema
+
+    # -- parser -------------------------------------------------------------
+
+    def _fail(self, reason: str) -> None:
+        raise StructuredOutputError(
+            f"reply diverged from the schema: {reason}", self.text
+        )
+
+    def _char(self, char: str) -> None:
+        mode = self._mode
+        if mode == "string":
+            self._string_char(char)
+        elif mode == "number":
+            if char in _NUMBER_CHARS:
+                self._token += char
+            else:
+                self._end_scalar()
+                self._char(char)
+        elif mode == "literal":
+            self._token += char
+            target = _LITERALS[self._token[0]]
+            if not target.startswith(self._token):
+                self._fail(f"invalid literal {self._token!r}")
+            if self._token == target:
+                self._end_scalar()
+        elif char.isspace():
+            return
+        elif mode == "value":
+            self._start_value(char)
+        elif mode == "after":
+            self._after_value(char)
+        elif mode == "key":
+            if char == "}" and self._stack[-1].state == "first":
+                self._close()
+                return
+            if char != '"':
+                self._fail(f"expected a key, got {char!r}")
+            self._start_string(is_key=True)
+        elif mode == "colon":
+            if char != ":":
+                self._fail(f"expected ':', got {char!r}")
+            self._mode = "value"
+        else:
+            self._fail(f"unexpected {char!r} after the JSON document")
+
+    def _start_value(self, char: str) -> None:
+        top = self._stack[-1] if self._stack else None
+        if top is not None and top.kind == "array" and char == "]":
+            if top.state != "first":
+                self._fail("expected a value, got ']'")
+            self._close()
+            return
+        if char == "{":
+            kind = "object"
+        elif char == "[":
+            kind = "array"
+        elif char == '"':
+            kind = "string"
+        elif char == "-" or char.isdigit():
+            kind = "number"
+        elif char in _LITERALS:
+            kind = "boolean" if char in "tf" else "null"
+        else:
+            self._fail(f"unexpected {char!r} where a value should start")
+        schema = self._resolve(self._value_schema)
+        types = self._types(schema)
+        if (
+            types is not None
+            and kind not in types
+            and not (kind == "number" and "integer" in types)
+        ):
+            self._fail(f"{kind} where the schema allows {sorted(types)}")
+        schema = self._branch(schema, kind)
+        if top is not None and top.kind == "array":
+            top.items += 1
+            top.state = "value"
+            limit = top.schema.get("maxItems")
+            if limit is not None and top.items > limit:
+                self._fail(f"more than {limit} items")
+        if kind in ("object", "array"):
+            self._stack.append(_Container(kind, schema))
+            self._mode = "key" if kind == "object" else "value"
+            if kind == "array":
+                self._value_schema = self._resolve(schema.get("items", {}))
+            return
+        self._value_schema = schema
+        if kind == "string":
+            self._start_string(is_key=False)
+        else:
+            self._token = char
+            self._mode = "number" if kind == "number" else "literal"
+
+    def _start_string(self, is_key: bool) -> None:
+        self._mode = "string"
+        self._token = ""
+        self._is_key = is_key
+        self._escape = False
+
+    def _string_char(self, char: str) -> None:
+        if self._escape:
+            self._escape = False
+            self._token += char
+            return
+        if char == "\\":
+            self._escape = True
+            self._token += char
+            return
+        if char != '"':
+            self._token += char
+            self._check_string_prefix()
+            return
+        value = json.loads(f'"{self._token}"')
+        if self._is_key:
+            self._end_key(value)
+        else:
+            self._check_enum(value)
+            self._value_done()
+
+    def _allowed(self) -> Optional[List[str]]:
+        """Strings the current string may still become, if restricted."""
+        if self._is_key:
+            top = self._stack[-1]
+            if top.schema.get("additionalProperties", True) is not False:
+                return None
+            return [k for k in top.schema.get("properties", {}) if k not in top.keys]
+        schema = self._value_schema
+        if "const" in schema:
+            return [schema["const"]]
+        if "enum" in schema:
+            return [v for v in schema["enum"] if isinstance(v, str)]
+        return None
+
+    def _check_string_prefix(self) -> None:
+        if "\\" in self._token:
+            return  # checked once the string is complete
+        allowed = self._allowed()
+        if allowed is not None and not any(a.startswith(self._token) for a in allowed):
+            what = "key" if self._is_key else "value"
+            self._fail(f"{what} {self._token!r}... is not one of {allowed}")
+
+    def _check_enum(self, value: Any) -> None:
+        schema = self._value_schema
+        if "const" in schema and value != schema["const"]:
+            self._fail(f"{value!r} is not {schema['const']!r}")
+        if "enum" in schema and value not in schema["enum"]:
+            self._fail(f"{value!r} is not one of {schema['enum']}")
+
+    def _end_key(self, key: str) -> None:
+        top = self._stack[-1]
+        if key in top.keys:
+            self._fail(f"duplicate key {key!r}")
+        properties = top.schema.get("properties", {})
+        extra = top.schema.get("additionalProperties", True)
+        if key not in properties and extra is False:
+            self._fail(f"unexpected key {key!r}")
+        top.keys.add(key)
+        top.key = key
+        top.state = "value"
+        self._value_schema = self._resolve(
+            properties.get(key, extra if isinstance(extra, dict) else {})
+        )
+        self._mode = "colon"
+
+    def _end_scalar(self) -> None:
+        token = self._token
+        if self._mode == "literal":
+            if token != _LITERALS[token[0]]:
+                self._fail(f"invalid literal {token!r}")
+            value: Any = json.loads(token)
+        else:
+            try:
+                value = json.loads(token)
+            except ValueError:
+                self._fail(f"invalid number {token!r}")
+            types = self._types(self._value_schema)
+            if isinstance(value, float) and not value.is_integer():
+                if types is not None and "number" not in types:
+                    self._fail(f"{token} where the schema wants an integer")
+        self._check_enum(value)
+        self._value_done()
+
+    def _value_done(self) -> None:
+        self._mode = "after" if self._stack else "done"
+
+    def _after_value(self, char: str) -> None:
+        top = self._stack[-1]
+        closing = "}" if top.kind == "object" else "]"
+        if char == closing:
+            self._close()
+        elif char == ",":
+            top.state = "next"
+            if top.kind == "object":
+                self._mode = "key"
+            else:
+                self._mode = "value"
+                self._value_schema = self._resolve(top.schema.get("items", {}))
+        else:
+            self._fail(f"expected ',' or {closing!r}, got {char!r}")
+
+    def _close(self) -> None:
+        top = self._stack.pop()
+        if top.kind == "object":
+            missing = [k for k in top.schema.get("required", ()) if k not in top.keys]
+            if missing:
+                self._fail(f"missing required keys {missing}")
+        else:
+            limit = top.schema.get("minItems")
+            if limit is not None and top.items < limit:
+                self._fail(f"fewer than {limit} items")
+        self._value_done()
+
+
+def _json_type(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    return "array" if isinstance(value, list) else "object"
+
+
+class SchemaValidator(Transform):
+    """Pipeline stage that raises `StructuredOutputError` on divergence.
+
+    Passes text through unchanged; raising from a stage ends
+    `stream_text`, which closes the HTTP stream.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        super().__init__()
+
+    def reset(self) -> None:
+        self.parser = JSONPrefixParser(self.schema)
+
+    def feed(self, text: str) -> str:
+        self.parser.feed(text)
+        return text
+
+    def flush(self) -> str:
+        self.parser.finish()
+        return ""
@@ -0,0 +1,273 @@
+"""Opt-in request tracing and a sampling profiler.
+
+When a request is slow, spans show where the time went: the HTTP handler,
+scheduler and executor queues, request building, the Ollama client call
+or response parsing. Tracing is off by default and ``span()`` then returns
+a shared no-op object, so the instrumented code pays one global lookup.
+
+    from langchain_ollama import tracing
+
+    recorder = tracing.enable()
+    ...  # run some requests
+    recorder.dump("trace.json")  # open in chrome://tracing or ui.perfetto.dev
+
+``enable(opentelemetry=True)`` also emits every span through the
+OpenTelemetry API when ``opentelemetry-api`` is installed, for export to
+Jaeger, Tempo and the like.
+
+``sample_stacks(seconds)`` samples the stacks of all threads (model calls
+run in worker threads, which ``cProfile`` does not see) and ``collapsed()``
+renders them in the folded format read by flamegraph.pl and speedscope.
+"""
+
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+class TraceRecorder:
+    """Bounded in-memory buffer of finished spans.
+
+    Parameters:
+        max_events: oldest spans are dropped beyond this many
+    """
+
+    def __init__(self, max_events: int = 100000):
+        self._events: Deque[Tuple[Any, ...]] = deque(maxlen=max_events)
+        self._threads: Dict[int, str] = {}
+
+    def add(
+        self,
+        name: str,
+        start: float,
+        end: float,
+        args: Optional[Dict[str, Any]] = None,
+        async_id: Optional[int] = None,
+    ) -> None:
+        """Record a span; `start`/`end` are ``time.perf_counter()`` values.
+
+        Spans with an `async_id` may overlap others on the same thread
+        (e.g. concurrent requests on one event loop) and are exported as
+        async events.
+        """
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        # deque.append is atomic, so recording needs no lock
+        self._events.append((name, start, end, tid, args, async_id))
+
+    def clear(self) -> None:
+        self._events.clear()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def export(self) -> Dict[str, Any]:
+        """The spans in Chrome trace event format."""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = [
+            {
+                "ph": "M",
+                "name": "thread_name",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": n},
+            }
+            for tid, n in list(self._threads.items())
+        ]
+        for name, start, end, tid, args, async_id in list(self._events):
+            ts = start * 1e6
+            if async_id is None:
+                events.append(
+                    {
+                        "ph": "X",
+                        "name": name,
+                        "pid": pid,
+                        "tid": tid,
+                        "ts": ts,
+                        "dur": (end - start) * 1e6,
+                        "args": args or {},
+                    }
+                )
+            else:
+                common = {"cat": "async", "name": name, "pid": pid, "tid": tid}
+                events.append(
+                    {**common, "ph": "b", "id": async_id, "ts": ts, "args": args or {}}
+                )
+                events.append({**common, "ph": "e", "id": async_id, "ts": end * 1e6})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.export(), f, default=str)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Count, total and max milliseconds per span name."""
+        out: Dict[str, Dict[str, Any]] = {}
+        for name, start, end, *_ in list(self._events):
+            ms = (end - start) * 1000
+            entry = out.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+        for entry in out.values():
+            entry["total_ms"] = round(entry["total_ms"], 3)
+            entry["max_ms"] = round(entry["max_ms"], 3)
+        return out
+
+
+_recorder: Optional[TraceRecorder] = None
+_otel_tracer: Any = None
+_async_ids = itertools.count(1)
+
+
+def enable(
+    recorder: Optional[TraceRecorder] = None, opentelemetry: bool = False
+) -> TraceRecorder:
+    """Start recording spans (into `recorder`, or a new one) and return it.
+
+    With `opentelemetry`, spans are also started on the global
+    OpenTelemetry tracer provider; raises ImportError without
+    ``opentelemetry-api``.
+    """
+    global _recorder, _otel_tracer
+    if opentelemetry:
+        from opentelemetry import trace
+
+        _otel_tracer = trace.get_tracer("langchain_ollama")
+    _recorder = recorder or _recorder or TraceRecorder()
+    return _recorder
+
+
+def disable() -> None:
+    global _recorder, _otel_tracer
+    _recorder = _otel_tracer = None
+
+
+def active() -> Optional[TraceRecorder]:
+    """The recorder spans currently go to, or None when tracing is off."""
+    return _recorder
+
+
+def enabled() -> bool:
+    return _recorder is not None or _otel_tracer is not None
+
+
+def _otel_attributes(args: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        k: v if isinstance(v, (str, bool, int, float)) else str(v)
+        for k, v in args.items()
+        if v is not None
+    }
+
+
+class _Span:
+    __slots__ = ("name", "args", "async_id", "start", "_otel", "_otel_span")
+
+    def __init__(self, name: str, args: Dict[str, Any], async_id: Optional[int]):
+        self.name = name
+        self.args = args
+        self.async_id = async_id
+        self._otel = None
+
+    def set(self, **args: Any) -> None:
+        """Attach more attributes, e.g. the backend that answered."""
+        self.args.update(args)
+
+    def __enter__(self) -> "_Span":
+        if _otel_tracer is not None:
+            self._otel = _otel_tracer.start_as_current_span(
+                self.name, attributes=_otel_attributes(self.args)
+            )
+            self._otel_span = self._otel.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        recorder = _recorder
+        if recorder is not None:
+            recorder.add(self.name, self.start, end, self.args, self.async_id)
+        if self._otel is not None:
+            # Attributes set inside the span are only known now
+            self._otel_span.set_attributes(_otel_attributes(self.args))
+            self._otel.__exit__(exc_type, exc, tb)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def set(self, **args: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, concurrent: bool = False, **args: Any) -> Any:
+    """Context manager timing the enclosed block as span `name`.
+
+    Pass `concurrent=True` for spans that overlap others on the same thread,
+    such as request handlers on an event loop. Keyword arguments become
+    span attributes.
+    """
+    if _recorder is None and _otel_tracer is None:
+        return _NO_SPAN
+    return _Span(name, args, next(_async_ids) if concurrent else None)
+
+
+def record(name: str, start: float, end: float, **args: Any) -> None:
+    """Record an already timed span (``time.perf_counter()`` values)."""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.add(name, start, end, args)
+
+
+def sample_stacks(
+    seconds: float, interval: float = 0.005, max_depth: int = 64
+) -> Counter:
+    """Sample every thread's stack for `seconds`; folded stack -> count.
+
+    Each key is ``thread;outer_function;...;inner_function`` with frames
+    as ``function (file:line)``; idle threads show up too, so look for the
+    stacks under request handlers and worker threads.
+    """
+    me = threading.get_ident()
+    stacks: Counter = Counter()
+    stop_at = time.monotonic() + seconds
+    while time.monotonic() < stop_at:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for tid, frame in sys._current_frames().items():
+            if tid == me:
+                continue
+            parts = []
+            while frame is not None and len(parts) < max_depth:
+                code = frame.f_code
+                parts.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                    f":{frame.f_lineno})"
+                )
+                frame = frame.f_back
+            parts.append(names.get(tid, str(tid)))
+            stacks[";".join(reversed(parts))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def collapsed(stacks: Counter) -> str:
+    """Folded stacks (``stack count`` per line) for flame graph tools."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,236 @@
+"""Incremental post-processing of model output.
+
+Replies used to be cleaned up only once the whole text had arrived. A
+``Pipeline`` runs the same steps on streamed chunks instead: every stage
+consumes text as it arrives and emits what it can already decide about,
+holding back only the few characters that might still change meaning (a
+half-received ``<think>`` tag, trailing whitespace). Filtered output can
+therefore stream to users without buffering the response.
+
+    pipeline = Pipeline([DropThinking(), StripWhitespace()])
+    for piece in pipeline.stream(chunks):
+        send(piece)
+
+Stages are small objects with ``feed(text) -> text`` and ``flush() ->
+text``; plain ``str -> str`` functions work as stateless stages. Pass
+stages as ``transforms=[...]`` to either ``OllamaLLM`` and they apply to
+``stream_text`` as well as to complete replies. A pipeline holds the
+state of one reply; ``Pipeline.start()`` returns a fresh copy.
+"""
+
+import copy
+import json
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+)
+
+
+class Transform:
+    """Base class for pipeline stages.
+
+    Subclasses set up per-reply state in `reset()`, called on creation and
+    for every new reply.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        pass
+
+    def feed(self, text: str) -> str:
+        """Consume the next chunk; return the text that can be emitted."""
+        return text
+
+    def flush(self) -> str:
+        """The reply has ended; return anything still held back."""
+        return ""
+
+    def start(self) -> "Transform":
+        """A copy of this stage with fresh state, for one reply."""
+        stage = copy.copy(self)
+        stage.reset()
+        return stage
+
+
+class _Function(Transform):
+    """A ``str -> str`` function applied to each chunk."""
+
+    def __init__(self, fn: Any):
+        self.fn = fn
+        super().__init__()
+
+    def feed(self, text: str) -> str:
+        return self.fn(text)
+
+
+def _partial_suffix(text: str, tag: str) -> int:
+    """Length of the longest end of `text` that starts `tag`."""
+    for size in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:size]):
+            return size
+    return 0
+
+
+class DropThinking(Transform):
+    """Remove reasoning sections such as ``<think>...</think>``.
+
+    Reasoning models may emit their chain of thought inline before the
+    answer. Text inside the tags is dropped as it arrives; an unterminated
+    section is dropped entirely.
+    """
+
+    def __init__(self, open_tag: str = "<think>", close_tag: str = "</think>"):
+        self.open_tag = open_tag
+        self.close_tag = close_tag
+        super().__init__()
+
+    def reset(self) -> None:
+        self._buffer = ""
+        self._inside = False
+
+    def feed(self, text: str) -> str:
+        buffer, out = self._buffer + text, []
+        while buffer:
+            tag = self.close_tag if self._inside else self.open_tag
+            index = buffer.find(tag)
+            if index >= 0:
+                if not self._inside:
+                    out.append(buffer[:index])
+                buffer = buffer[index + len(tag) :]
+                self._inside = not self._inside
+                continue
+            # Hold back a possible start of the tag until the next chunk
+            keep = _partial_suffix(buffer, tag)
+            if not self._inside:
+                out.append(buffer[: len(buffer) - keep])
+            buffer = buffer[len(buffer) - keep :]
+            break
+        self._buffer = buffer
+        return "".join(out)
+
+    def flush(self) -> str:
+        return "" if self._inside else self._buffer
+
+
+class StripWhitespace(Transform):
+    """Drop leading and trailing whitespace of the whole reply.
+
+    Whitespace inside the reply is held back only until the next
+    non-whitespace text arrives.
+    """
+
+    def reset(self) -> None:
+        self._started = False
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        text = self._pending + text
+        body = text.rstrip()
+        self._pending = text[len(body) :]
+        return body
+
+    def flush(self) -> str:
+        # Trailing whitespace of the reply is dropped
+        return ""
+
+
+class DetectJSON(Transform):
+    """Pass text through and tell whether the reply is a JSON document.
+
+    `looks_like_json` is known from the first non-whitespace character;
+    after the reply ends, `value` holds the parsed document (``None`` if
+    the reply was not valid JSON) and `is_json` says whether it parsed.
+    """
+
+    def reset(self) -> None:
+        self._text = []
+        self.looks_like_json: Optional[bool] = None
+        self.is_json = False
+        self.value: Any = None
+
+    def feed(self, text: str) -> str:
+        if self.looks_like_json is None and text.strip():
+            self.looks_like_json = text.lstrip()[0] in "{["
+        self._text.append(text)
+        return text
+
+    def flush(self) -> str:
+        if self.looks_like_json:
+            try:
+                self.value = json.loads("".join(self._text))
+                self.is_json = True
+            except ValueError:
+                pass
+        self._text = []
+        return ""
+
+
+class Pipeline:
+    """Stages applied in order to the chunks of one reply.
+
+    Parameters:
+        stages: `Transform` instances or ``str -> str`` functions
+    """
+
+    def __init__(self, stages: Sequence[Any] = ()):
+        self.stages = [s if isinstance(s, Transform) else _Function(s) for s in stages]
+
+    def start(self) -> "Pipeline":
+        """A pipeline with fresh stage state for a new reply."""
+        pipeline = Pipeline()
+        pipeline.stages = [stage.start() for stage in self.stages]
+        return pipeline
+
+    def find(self, kind: type) -> Optional[Transform]:
+        """The first stage of type `kind`, e.g. to read `DetectJSON.value`."""
+        return next((s for s in self.stages if isinstance(s, kind)), None)
+
+    def feed(self, text: str) -> str:
+        for stage in self.stages:
+            if not text:
+                break
+            text = stage.feed(text)
+        return text
+
+    def flush(self) -> str:
+        # A stage's held-back text still passes through the later stages
+        text = ""
+        for stage in self.stages:
+            text = stage.feed(text) if text else ""
+            text += stage.flush()
+        return text
+
+    def stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Transformed text for `chunks`, yielded as soon as it is known."""
+        for chunk in chunks:
+            out = self.feed(chunk)
+            if out:
+                yield out
+        out = self.flush()
+        if out:
+            yield out
+
+    async def astream(self, chunks: AsyncIterable[str]) -> AsyncIterator[str]:
+        async for chunk in chunks:
+            out = self.feed(chunk)
+            if out:
+                yield out
+        out = self.flush()
+        if out:
+            yield out
+
+    def apply(self, text: str) -> str:
+        """Transform a complete reply."""
+        return self.feed(text) + self.flush()
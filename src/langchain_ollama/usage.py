@@ -0,0 +1,277 @@
+"""Token usage accounting and per-session rate limits.
+
+Ollama reports how many tokens each request evaluated (``prompt_eval_count``)
+and generated (``eval_count``), plus where the time went. ``Completion``
+keeps those next to the reply text; ``UsageTracker`` sums them per session
+and ``SessionLimiter`` uses token buckets so one heavy user can't saturate
+the model for everyone else.
+"""
+
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Hashable, Optional
+
+from .prefix import _response_field
+
+
+def _ms(ns: Any) -> Optional[float]:
+    # Ollama reports durations in nanoseconds
+    return None if ns is None else ns / 1e6
+
+
+@dataclass
+class Completion:
+    """A reply plus the metadata Ollama returned with it.
+
+    Token counts and durations are None when the backend did not report
+    them (the CLI fallback never does).
+    """
+
+    text: str
+    model: str
+    backend: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_ms: Optional[float] = None
+    load_ms: Optional[float] = None
+    prompt_eval_ms: Optional[float] = None
+    eval_ms: Optional[float] = None
+
+    @classmethod
+    def from_response(
+        cls, text: str, resp: Any, model: str, backend: str
+    ) -> "Completion":
+        return cls(
+            text=text,
+            model=_response_field(resp, "model") or model,
+            backend=backend,
+            prompt_tokens=_response_field(resp, "prompt_eval_count"),
+            completion_tokens=_response_field(resp, "eval_count"),
+            total_ms=_ms(_response_field(resp, "total_duration")),
+            load_ms=_ms(_response_field(resp, "load_duration")),
+            prompt_eval_ms=_ms(_response_field(resp, "prompt_eval_duration")),
+            eval_ms=_ms(_response_field(resp, "eval_duration")),
+        )
+
+    @property
+    def total_tokens(self) -> int:
+        return (self.prompt_tokens or 0) + (self.completion_tokens or 0)
+
+    def usage(self) -> Dict[str, Any]:
+        """Everything except the text, e.g. for an API response."""
+        fields = asdict(self)
+        del fields["text"]
+        fields["total_tokens"] = self.total_tokens
+        return fields
+
+
+class UsageTracker:
+    """Thread-safe running totals of token usage per session."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[Hashable, Dict[str, Any]] = {}
+
+    def record(self, session: Hashable, completion: Completion) -> Dict[str, Any]:
+        """Add one completion to `session` and return its updated totals."""
+        with self._lock:
+            totals = self._sessions.setdefault(
+                session,
+                {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0},
+            )
+            totals["requests"] += 1
+            totals["prompt_tokens"] += completion.prompt_tokens or 0
+            totals["completion_tokens"] += completion.completion_tokens or 0
+            return self._view(totals)
+
+    def get(self, session: Hashable) -> Dict[str, Any]:
+        with self._lock:
+            totals = self._sessions.get(session)
+            if totals is None:
+                return {
+                    "requests": 0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "total_tokens": 0,
+                }
+            return self._view(totals)
+
+    def totals(self) -> Dict[str, Any]:
+        """Usage summed over all sessions."""
+        with self._lock:
+            summed = {
+                "sessions": len(self._sessions),
+                "requests": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+            }
+            for totals in self._sessions.values():
+                for key, value in totals.items():
+                    summed[key] += value
+        return self._view(summed)
+
+    def reset(self, session: Optional[Hashable] = None) -> None:
+        with self._lock:
+            if session is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session, None)
+
+    @staticmethod
+    def _view(totals: Dict[str, Any]) -> Dict[str, Any]:
+        view = dict(totals)
+        view["total_tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+        return view
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`.
+
+    `consume` may drive the level negative (debt) so work whose cost is
+    only known afterwards, like generated tokens, is still accounted for;
+    the bucket then has to refill before `try_acquire` succeeds again.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._level = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(
+            self.capacity, self._level + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self._level < amount:
+                return False
+            self._level -= amount
+            return True
+
+    def consume(self, amount: float) -> None:
+        with self._lock:
+            self._refill()
+            self._level -= amount
+
+    def retry_after(self, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        with self._lock:
+            self._refill()
+            missing = amount - self._level
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float("inf")
+
+    def is_full(self) -> bool:
+        """True once refilled to capacity, i.e. as good as a new bucket."""
+        with self._lock:
+            self._refill()
+            return self._level >= self.capacity
+
+
+class QuotaExceeded(RuntimeError):
+    """Raised by `SessionLimiter.check`; `retry_after` is in seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SessionLimiter:
+    """Per-session request rate and token quota.
+
+    Parameters:
+        requests_per_minute: sustained request rate per session (None
+            disables the request limit)
+        burst: requests a session may make back to back (default: one
+            minute's worth)
+        tokens_per_minute: prompt + generated tokens a session may use
+            per minute (None disables the token quota)
+        sweep_interval: seconds between sweeps that drop the buckets of
+            idle sessions
+
+    Buckets live in this process, so each worker of a multi-process
+    server enforces the limits on its own.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        burst: Optional[int] = None,
+        tokens_per_minute: Optional[float] = None,
+        sweep_interval: float = 60.0,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.tokens_per_minute = tokens_per_minute
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._requests: Dict[Hashable, TokenBucket] = {}
+        self._tokens: Dict[Hashable, TokenBucket] = {}
+        self._swept = time.monotonic()
+
+    def check(self, session: Hashable) -> None:
+        """Admit one request for `session` or raise `QuotaExceeded`."""
+        tokens = self._bucket(self._tokens, session, self.tokens_per_minute, None)
+        if tokens is not None and tokens.retry_after(0) > 0:
+            raise QuotaExceeded(
+                "token quota exceeded", retry_after=tokens.retry_after(0)
+            )
+        requests = self._bucket(
+            self._requests, session, self.requests_per_minute, self.burst
+        )
+        if requests is not None and not requests.try_acquire():
+            raise QuotaExceeded("too many requests", retry_after=requests.retry_after())
+
+    def charge(self, session: Hashable, completion: Completion) -> None:
+        """Count the tokens `completion` used against the session's quota."""
+        tokens = self._bucket(self._tokens, session, self.tokens_per_minute, None)
+        if tokens is not None:
+            tokens.consume(completion.total_tokens)
+
+    def _bucket(
+        self,
+        buckets: Dict[Hashable, TokenBucket],
+        session: Hashable,
+        per_minute: Optional[float],
+        capacity: Optional[float],
+    ) -> Optional[TokenBucket]:
+        if per_minute is None:
+            return None
+        with self._lock:
+            if time.monotonic() - self._swept >= self.sweep_interval:
+                self._sweep()
+            bucket = buckets.get(session)
+            if bucket is None:
+                bucket = buckets[session] = TokenBucket(
+                    per_minute / 60.0, capacity or per_minute
+                )
+            return bucket
+
+    def sessions(self) -> int:
+        """Sessions that currently hold a bucket."""
+        with self._lock:
+            return len(self._requests.keys() | self._tokens.keys())
+
+    def sweep(self) -> int:
+        """Drop the buckets of idle sessions; returns how many were dropped."""
+        with self._lock:
+            return self._sweep()
+
+    def _sweep(self) -> int:
+        # A full bucket behaves exactly like a new one, so forgetting it
+        # changes no limit
+        dropped = 0
+        for buckets in (self._requests, self._tokens):
+            for session in [s for s, b in buckets.items() if b.is_full()]:
+                del buckets[session]
+                dropped += 1
+        self._swept = time.monotonic()
+        return dropped
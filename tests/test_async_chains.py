@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+import types
+
+import pytest
+
+from langchain_ollama import ollama_wrapper
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.prompts import PromptTemplate  # noqa: E402
+from langchain_core.runnables import RunnableParallel  # noqa: E402
+
+from langchain_ollama.langchain_llm import OllamaLLM  # noqa: E402
+
+
+class FakeAsyncClient:
+    """`ollama.AsyncClient` answering after `delay` seconds."""
+
+    delay = 0.2
+    calls = []
+
+    def __init__(self, host=None, timeout=None):
+        pass
+
+    async def chat(self, model, messages, stream=False, **kwargs):
+        prompt = messages[-1]["content"]
+        FakeAsyncClient.calls.append(threading.get_ident())
+        if stream:
+            return self._stream(prompt)
+        await asyncio.sleep(self.delay)
+        return {
+            "model": model,
+            "message": {"content": f"re: {prompt}"},
+            "done": True,
+            "prompt_eval_count": 3,
+            "eval_count": 2,
+        }
+
+    async def _stream(self, prompt):
+        try:
+            for token in ["re: ", prompt, "\nUser:", " more"]:
+                await asyncio.sleep(0.01)
+                yield {"message": {"content": token}}
+        finally:
+            FakeAsyncClient.closed = True
+
+
+@pytest.fixture
+def fake_ollama(monkeypatch):
+    FakeAsyncClient.calls = []
+    FakeAsyncClient.closed = False
+
+    def chat(model, messages, **kwargs):
+        time.sleep(FakeAsyncClient.delay)
+        return {"message": {"content": f"re: {messages[-1]['content']}"}}
+
+    module = types.SimpleNamespace(AsyncClient=FakeAsyncClient, chat=chat)
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(ollama_wrapper, "ollama", module)
+    return module
+
+
+def test_abatch_runs_all_prompts_concurrently_on_the_event_loop(fake_ollama):
+    llm = OllamaLLM(model="m")
+
+    async def main():
+        started = time.monotonic()
+        replies = await llm.abatch([f"q{i}" for i in range(8)])
+        return replies, time.monotonic() - started, threading.get_ident()
+
+    replies, elapsed, loop_thread = asyncio.run(main())
+    assert replies == [f"re: q{i}" for i in range(8)]
+    assert elapsed < 8 * FakeAsyncClient.delay / 2
+    # Every request was made from the event loop thread itself
+    assert set(FakeAsyncClient.calls) == {loop_thread}
+
+
+def test_runnable_parallel_branches_overlap(fake_ollama):
+    llm = OllamaLLM(model="m")
+    chain = RunnableParallel(
+        joke=PromptTemplate.from_template("joke about {topic}") | llm,
+        poem=PromptTemplate.from_template("poem about {topic}") | llm,
+    )
+
+    async def main():
+        started = time.monotonic()
+        out = await chain.ainvoke({"topic": "cats"})
+        return out, time.monotonic() - started
+
+    out, elapsed = asyncio.run(main())
+    assert out == {"joke": "re: joke about cats", "poem": "re: poem about cats"}
+    assert elapsed < 2 * FakeAsyncClient.delay
+
+
+def test_generate_reports_usage_per_prompt(fake_ollama):
+    llm = OllamaLLM(model="m")
+    result = asyncio.run(llm.agenerate(["a", "b"]))
+    assert [g[0].text for g in result.generations] == ["re: a", "re: b"]
+    assert result.generations[0][0].generation_info["completion_tokens"] == 2
+    assert result.llm_output["token_usage"]["total_tokens"] == 10
+
+
+def test_sync_batch_runs_prompts_concurrently(fake_ollama):
+    llm = OllamaLLM(model="m")
+    started = time.monotonic()
+    assert llm.batch(["a", "b", "c", "d"]) == ["re: a", "re: b", "re: c", "re: d"]
+    assert time.monotonic() - started < 4 * FakeAsyncClient.delay / 2
+
+
+def test_stop_sequence_streams_and_closes_the_async_stream(fake_ollama):
+    llm = OllamaLLM(model="m")
+    reply = asyncio.run(llm.ainvoke("hi", stop=["\nUser:"]))
+    assert reply == "re: hi"
+    assert FakeAsyncClient.closed
+
+
+def test_async_timeout_raises_ollama_timeout(fake_ollama):
+    llm = OllamaLLM(model="m", timeout=0.05)
+    with pytest.raises(ollama_wrapper.OllamaTimeoutError):
+        asyncio.run(llm.acomplete("hi"))
+
+
+def test_async_client_error_falls_back_to_cli(fake_ollama, monkeypatch):
+    async def broken(self, *args, **kwargs):
+        raise ConnectionError("refused")
+
+    monkeypatch.setattr(FakeAsyncClient, "chat", broken)
+    monkeypatch.setattr(
+        ollama_wrapper, "_call_ollama_cli", lambda model, prompt, deadline: "cli"
+    )
+    ollama_wrapper.circuit_breakers.reset()
+    result = asyncio.run(OllamaLLM(model="m").acomplete("hi"))
+    assert (result.text, result.backend) == ("cli", "cli")
+
+
+def test_sync_batch_larger_than_the_group_pool_with_batching(request):
+    from langchain_ollama import fake
+    from langchain_ollama.fake import FakeOllama
+
+    url = fake.register(request.node.name, FakeOllama(reply="ok"))
+    llm = OllamaLLM(model="m", base_url=url, batch_window=0.01, timeout=5)
+    # Callers waiting on batch futures must not take the threads the
+    # grouped calls run on
+    prompts = [str(i) for i in range(ollama_wrapper._group_pool._max_workers + 4)]
+    assert llm.batch(prompts) == ["ok"] * len(prompts)
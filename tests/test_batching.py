@@ -0,0 +1,145 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from langchain_ollama import fake, ollama_wrapper
+from langchain_ollama.batching import MicroBatcher
+from langchain_ollama.fake import FakeOllama
+from langchain_ollama.ollama_wrapper import OllamaLLM, OllamaTimeoutError
+
+
+def test_concurrent_items_are_coalesced_within_the_window():
+    batches = []
+
+    def double(items):
+        batches.append(list(items))
+        return [i * 2 for i in items]
+
+    batcher = MicroBatcher(double, window=0.05, max_batch=8)
+    futures = [batcher.submit(i) for i in range(5)]
+    assert [f.result(5) for f in futures] == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2, 3, 4]]
+
+    stats = batcher.stats()
+    assert (stats["batches"], stats["items"], stats["largest"]) == (1, 5, 5)
+    assert stats["queue_wait_ms"]["p95"] >= 0
+    batcher.close()
+
+
+def test_max_batch_splits_large_bursts():
+    sizes = []
+    batcher = MicroBatcher(
+        lambda items: sizes.append(len(items)) or items, window=0.05, max_batch=3
+    )
+    futures = [batcher.submit(i) for i in range(7)]
+    assert [f.result(5) for f in futures] == list(range(7))
+    assert sorted(sizes, reverse=True) == [3, 3, 1]
+    batcher.close()
+
+
+def test_per_item_errors_and_batch_failures():
+    def check(items):
+        return [ValueError(i) if i < 0 else i for i in items]
+
+    batcher = MicroBatcher(check, window=0.02)
+    ok, bad = batcher.submit(1), batcher.submit(-1)
+    assert ok.result(5) == 1
+    with pytest.raises(ValueError):
+        bad.result(5)
+
+    failing = MicroBatcher(lambda items: 1 / 0, window=0.01)
+    with pytest.raises(ZeroDivisionError):
+        failing(1)
+    assert failing.stats()["errors"] == 1
+    batcher.close()
+    failing.close()
+
+
+def test_close_flushes_pending_items():
+    batcher = MicroBatcher(lambda items: items, window=10)
+    future = batcher.submit("x")
+    batcher.close()
+    assert future.result(1) == "x"
+    with pytest.raises(RuntimeError):
+        batcher.submit("y")
+
+
+class _FakeEmbedClient:
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, model, input, **kwargs):
+        self.calls.append(list(input))
+        return {"embeddings": [[float(len(text))] for text in input]}
+
+
+def test_embed_without_batching(monkeypatch):
+    client = _FakeEmbedClient()
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(ollama_wrapper, "ollama", client)
+    llm = OllamaLLM(model="embed-model")
+    assert llm.embed("abc") == [3.0]
+    assert llm.embed(["a", "bb"]) == [[1.0], [2.0]]
+    assert client.calls == [["abc"], ["a", "bb"]]
+
+
+def test_concurrent_embeds_share_one_request(monkeypatch):
+    client = _FakeEmbedClient()
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(ollama_wrapper, "ollama", client)
+    llm = OllamaLLM(model="embed-batch-model", batch_window=0.05, max_batch_size=16)
+    texts = ["a" * n for n in range(1, 9)]
+    with ThreadPoolExecutor(8) as pool:
+        vectors = list(pool.map(llm.embed, texts))
+    assert vectors == [[float(n)] for n in range(1, 9)]
+    assert len(client.calls) < len(texts)
+    stats = ollama_wrapper.batch_stats()["embed:embed-batch-model@default"]
+    assert stats["items"] == 8
+
+
+def test_batched_embed_is_bounded_by_the_timeout(request):
+    url = fake.register(request.node.name, FakeOllama(load_delay=2))
+    llm = OllamaLLM(model="m", base_url=url, batch_window=0.01)
+    started = time.monotonic()
+    with pytest.raises(OllamaTimeoutError):
+        llm.embed(["a", "b"], timeout=0.2)
+    assert time.monotonic() - started < 0.5
+
+
+def test_generation_batches_start_together(monkeypatch):
+    started = []
+    lock = threading.Lock()
+
+    def fake_chat(model, messages, **kwargs):
+        with lock:
+            started.append(time.monotonic())
+        return {"message": {"content": messages[-1]["content"].upper()}}
+
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(
+        ollama_wrapper, "ollama", type("M", (), {"chat": staticmethod(fake_chat)})
+    )
+    llm = OllamaLLM(model="gen-batch-model", batch_window=0.05)
+    with ThreadPoolExecutor(4) as pool:
+        replies = list(pool.map(lambda p: llm.complete(p).text, ["a", "b", "c", "d"]))
+    assert replies == ["A", "B", "C", "D"]
+    stats = ollama_wrapper.batch_stats()["generate:gen-batch-model@default"]
+    assert stats["batches"] < 4
+    assert max(started) - min(started) < 0.05
+
+
+def test_batched_generation_keeps_full_parallelism(request):
+    backend = FakeOllama(reply="a b c d e", token_delay=0.05)
+    url = fake.register(request.node.name, backend)
+    llm = OllamaLLM(model="m", base_url=url, batch_window=0.01)
+    started = time.monotonic()
+    with ThreadPoolExecutor(32) as pool:
+        replies = list(pool.map(lambda i: llm.complete(str(i)).text, range(32)))
+    elapsed = time.monotonic() - started
+    assert replies == ["a b c d e"] * 32
+    # A batch frees its slot once its calls are started, so two batches of
+    # 16 don't serialise everything behind the slowest call
+    assert backend.stats()["peak"] == 32
+    assert elapsed < 0.25 * 2
@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+from langchain_ollama import ollama_wrapper
+from langchain_ollama.ollama_wrapper import (
+    OllamaCancelledError,
+    OllamaLLM,
+    OllamaTimeoutError,
+    _run_cli,
+)
+from langchain_ollama.resilience import Deadline, RetryPolicy
+
+
+class SlowStreamClient:
+    """Streams one token every `delay` seconds and notes when it is closed."""
+
+    def __init__(self, delay=0.05, tokens=100):
+        self.delay = delay
+        self.tokens = tokens
+        self.closed = threading.Event()
+
+    def chat(self, model, messages, stream=False, **kwargs):
+        def gen():
+            try:
+                for _ in range(self.tokens):
+                    time.sleep(self.delay)
+                    yield {"message": {"content": "tok "}}
+            finally:
+                self.closed.set()
+
+        return gen()
+
+
+@pytest.fixture
+def slow_client(monkeypatch):
+    client = SlowStreamClient()
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(
+        ollama_wrapper, "ollama", type("M", (), {"Client": object, "chat": None})
+    )
+    monkeypatch.setattr(ollama_wrapper, "_get_client", lambda url, t: client)
+    return client
+
+
+def test_per_call_timeout_overrides_instance_and_closes_stream(slow_client):
+    llm = OllamaLLM(model="slow-model", timeout=60)
+    started = time.monotonic()
+    with pytest.raises(OllamaTimeoutError):
+        llm.complete("Hi", timeout=0.2)
+    assert time.monotonic() - started < 1.0
+    assert slow_client.closed.is_set()
+
+
+def test_cancel_event_aborts_a_running_call(slow_client):
+    llm = OllamaLLM(model="slow-model")
+    cancel = threading.Event()
+    threading.Timer(0.15, cancel.set).start()
+    with pytest.raises(OllamaCancelledError):
+        llm.complete("Hi", cancel=cancel)
+    assert slow_client.closed.is_set()
+
+
+def test_cancelling_the_async_task_aborts_the_http_stream(slow_client):
+    llm = OllamaLLM(model="slow-model")
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(llm.ainvoke("Hi"), 0.15)
+
+    asyncio.run(main())
+    # The worker thread notices the cancellation at the next token
+    assert slow_client.closed.wait(1.0)
+
+
+def test_cancel_kills_the_cli_process():
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    started = time.monotonic()
+    with pytest.raises(OllamaCancelledError):
+        _run_cli("sleep 5", None, cancel)
+    assert time.monotonic() - started < 2.0
+
+
+def test_cli_timeout_without_hard_coded_cap():
+    code, out, _ = _run_cli("echo hi", None, threading.Event())
+    assert (code, out.strip()) == (0, b"hi")
+    with pytest.raises(Exception) as exc:
+        _run_cli("sleep 5", 0.1, threading.Event())
+    assert "timed out" in str(exc.value)
+
+
+def test_retry_backoff_stops_when_cancelled():
+    cancel = threading.Event()
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        cancel.set()
+        raise ConnectionError("reset")
+
+    policy = RetryPolicy(max_attempts=5, base_delay=10, max_delay=10)
+    started = time.monotonic()
+    with pytest.raises(ConnectionError):
+        policy.call(flaky, Deadline(None, cancel))
+    assert len(calls) == 1
+    assert time.monotonic() - started < 1.0
+
+
+@pytest.fixture
+def flaky_server():
+    """Answers the first chat with a 503 after 0.8s, then stalls."""
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            requests.append(self.path)
+            if len(requests) == 1:
+                time.sleep(0.8)
+                body = b'{"error": "model is loading"}'
+                self.send_response(503)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                time.sleep(3)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_retries_share_the_call_timeout(flaky_server):
+    pytest.importorskip("ollama")
+    url, requests = flaky_server
+    llm = OllamaLLM(
+        model="m", base_url=url, retry=RetryPolicy(max_attempts=3, base_delay=0.01)
+    )
+    started = time.monotonic()
+    with pytest.raises(OllamaTimeoutError):
+        llm.complete("Hi", timeout=1.0)
+    assert time.monotonic() - started < 1.2
+    assert len(requests) == 2
+
+
+def test_fastapi_request_timeout_cancels_the_model_call(monkeypatch):
+    import examples.fastapi_server as server
+
+    cancelled = threading.Event()
+
+    class BlockingLLM:
+        def __call__(self, prompt, cancel=None, **kwargs):
+            if cancel.wait(5):
+                cancelled.set()
+            return "too late"
+
+    monkeypatch.setattr(server, "llm", BlockingLLM())
+    client = TestClient(server.app)
+    resp = client.post("/chat", json={"text": "Hi", "timeout": 0.2})
+    assert resp.status_code == 504
+    assert cancelled.wait(2)
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+
+from langchain_ollama import fake
+from langchain_ollama.fake import FakeOllama, FakeOllamaServer, FakeResponseError
+from langchain_ollama.ollama_wrapper import SimpleOllamaLLM
+from langchain_ollama.resilience import RetryPolicy
+
+
+def echo(prompt):
+    return f"You said: {prompt}"
+
+
+def test_fake_url_replaces_the_client(request):
+    url = fake.register(request.node.name, FakeOllama(reply=echo))
+    llm = SimpleOllamaLLM(model="m", base_url=url)
+    result = llm.complete("hello there")
+    assert (result.text, result.backend) == ("You said: hello there", "client")
+    assert result.completion_tokens == 4
+    assert result.prompt_tokens == 3
+
+
+def test_query_parameters_configure_a_fake():
+    backend = fake.get_fake("fake://?token_delay=0.01&error_status=500")
+    assert (backend.token_delay, backend.error_status) == (0.01, 500)
+    with pytest.raises(ValueError):
+        fake.get_fake("fake://?bogus=1")
+
+
+def test_streaming_honours_stop_and_num_predict(request):
+    url = fake.register(request.node.name, FakeOllama(reply="one two three four"))
+    llm = SimpleOllamaLLM(model="m", base_url=url, timeout=5)
+    assert llm.complete("hi", stop=[" three"]).text == "one two"
+    assert llm.complete("hi", num_predict=3).text == "one two three"
+
+
+def test_injected_errors_are_retried_and_never_reach_the_cli(request):
+    backend = FakeOllama()
+    url = fake.register(request.node.name, backend)
+    backend.fail_next(1)
+    retrying = SimpleOllamaLLM(
+        model="m", base_url=url, retry=RetryPolicy(max_attempts=2, base_delay=0)
+    )
+    assert retrying("hi") == fake.DEFAULT_REPLY
+    backend.fail_next(1)
+    with pytest.raises(FakeResponseError) as exc:
+        SimpleOllamaLLM(model="m", base_url=url)("hi")
+    assert exc.value.status_code == 503
+    assert backend.stats()["errors"] == 2
+
+
+def test_load_delay_is_paid_once_per_model(request):
+    backend = FakeOllama(load_delay=0.1)
+    url = fake.register(request.node.name, backend)
+    llm = SimpleOllamaLLM(model="m", base_url=url)
+    assert llm.complete("hi").load_ms == pytest.approx(100)
+    assert llm.complete("hi").load_ms == 0
+    assert [m["name"] for m in backend.ps()["models"]] == ["m"]
+
+
+def test_async_fan_out_with_limited_parallel_slots(request):
+    backend = FakeOllama(token_delay=0.005, max_parallel=4)
+    url = fake.register(request.node.name, backend)
+    llm = SimpleOllamaLLM(model="m", base_url=url)
+
+    async def main():
+        return await asyncio.gather(*(llm.acomplete(f"q{i}") for i in range(40)))
+
+    started = time.monotonic()
+    results = asyncio.run(main())
+    assert all(r.text == fake.DEFAULT_REPLY for r in results)
+    # 40 requests of ~45 ms, four at a time
+    assert time.monotonic() - started < 2
+    assert backend.stats()["peak"] <= 4
+    assert backend.stats()["in_flight"] == 0
+
+
+def test_embeddings_are_deterministic(request):
+    url = fake.register(request.node.name, FakeOllama(embedding_dim=4))
+    llm = SimpleOllamaLLM(model="m", base_url=url)
+    a, b, a2 = llm.embed(["a", "b", "a"])
+    assert len(a) == 4 and a == a2 and a != b
+
+
+def test_http_server_speaks_the_ollama_api():
+    ollama = pytest.importorskip("ollama")
+    backend = FakeOllama(reply=echo)
+    with FakeOllamaServer(backend) as server:
+        client = ollama.Client(host=server.url)
+        resp = client.chat("m", messages=[{"role": "user", "content": "hi"}])
+        assert resp.message.content == "You said: hi"
+        chunks = list(
+            client.chat("m", messages=[{"role": "user", "content": "x"}], stream=True)
+        )
+        assert "".join(c.message.content for c in chunks) == "You said: x"
+        assert chunks[-1].done and chunks[-1].eval_count == 3
+
+        llm = SimpleOllamaLLM(model="m", base_url=server.url, timeout=5)
+        assert llm("over http", stop=["http"]) == "You said: over"
+
+        backend.fail_next(1)
+        with pytest.raises(ollama.ResponseError) as exc:
+            list(
+                client.chat(
+                    "m", messages=[{"role": "user", "content": "hi"}], stream=True
+                )
+            )
+        assert exc.value.status_code == 503
@@ -1,3 +1,4 @@
+import pytest
 from fastapi.testclient import TestClient
 
 import examples.fastapi_server as server
@@ -17,6 +18,13 @@ def _ensure_repo_in_path():
 _ensure_repo_in_path()
 
 
+@pytest.fixture(autouse=True)
+def _fresh_health_cache():
+    # /health caches probe results; each test injects a different LLM.
+    server._get_health_monitor().invalidate()
+    yield
+
+
 class FakeLLM:
     def __call__(self, prompt: str):
         return "Hello from fake"
@@ -45,3 +53,47 @@ def test_fastapi_health_failure(monkeypatch):
     data = resp.json()
     assert data["ok"] is False
     assert "boom" in data["error"]
+
+
+def test_fastapi_health_is_cached(monkeypatch):
+    calls = []
+
+    class CountingLLM:
+        def __call__(self, prompt: str):
+            calls.append(prompt)
+            return "Hello"
+
+    monkeypatch.setattr(server, "llm", CountingLLM())
+    client = TestClient(server.app)
+    first = client.get("/health").json()
+    second = client.get("/health").json()
+    assert first["ok"] is True and second["ok"] is True
+    assert len(calls) == 1
+    assert "latency_ms" in first["probes"][0]
+
+
+def test_fastapi_health_probe_bypasses_the_response_cache(
+    monkeypatch, request, tmp_path
+):
+    from langchain_ollama import fake
+    from langchain_ollama.fake import FakeOllama
+    from langchain_ollama.ollama_wrapper import OllamaLLM
+    from langchain_ollama.store import ResponseCache
+
+    backend = FakeOllama()
+    url = fake.register(request.node.name, backend)
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    monkeypatch.setenv("OLLAMA_BASE_URL", url)
+    monkeypatch.setattr(server, "MODEL", "probe-model")
+    monkeypatch.setattr(server, "health_monitor", None)
+    monkeypatch.setattr(server, "response_cache", cache)
+    monkeypatch.setattr(
+        server,
+        "llm",
+        OllamaLLM(model="probe-model", base_url=url, response_cache=cache),
+    )
+    server.llm.complete(server._get_health_monitor().prompt)
+    backend.error_rate = 1.0
+    data = TestClient(server.app).get("/health").json()
+    assert data["ok"] is False
+    assert backend.stats()["requests"] == 2
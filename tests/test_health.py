@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from langchain_ollama import fake
+from langchain_ollama.fake import FakeOllama
+from langchain_ollama.health import HealthMonitor, ProbeTarget, probe, probe_all
+from langchain_ollama.ollama_wrapper import SimpleOllamaLLM
+
+
+class SlowLLM:
+    def __init__(self, delay, reply="Hi"):
+        self.delay = delay
+        self.reply = reply
+        self.calls = 0
+
+    def __call__(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.reply
+
+
+def test_probes_run_concurrently():
+    targets = [ProbeTarget(f"m{i}", llm=SlowLLM(0.2)) for i in range(3)]
+    started = time.perf_counter()
+    result = asyncio.run(probe_all(targets, "Hi", timeout=5))
+    assert time.perf_counter() - started < 0.5
+    assert result["ok"] is True
+    assert [p["model"] for p in result["probes"]] == ["m0", "m1", "m2"]
+    assert all(p["latency_ms"] >= 150 for p in result["probes"])
+
+
+def test_probe_timeout_marks_target_unhealthy():
+    res = asyncio.run(probe(ProbeTarget("slow", llm=SlowLLM(0.5)), "Hi", timeout=0.05))
+    assert res["ok"] is False
+    assert "timed out" in res["error"]
+
+
+def test_probe_timeout_also_ends_the_model_call(request):
+    backend = FakeOllama(reply="tok " * 100, token_delay=0.05)
+    url = fake.register(request.node.name, backend)
+    # The wrapper's own timeout is far longer than the probe's
+    llm = SimpleOllamaLLM(model="m", base_url=url, timeout=60)
+    started = time.perf_counter()
+    # asyncio.run waits for the probe's worker thread before returning
+    res = asyncio.run(probe(ProbeTarget("m", llm=llm), "Hi", timeout=0.1))
+    assert time.perf_counter() - started < 1.0
+    assert res["ok"] is False
+    assert backend.stats()["in_flight"] == 0
+
+
+def test_one_failing_model_fails_the_aggregate():
+    class Broken:
+        def __call__(self, prompt):
+            raise RuntimeError("model not found")
+
+    targets = [ProbeTarget("good", llm=SlowLLM(0)), ProbeTarget("bad", llm=Broken())]
+    result = asyncio.run(probe_all(targets, "Hi", timeout=5))
+    assert result["ok"] is False
+    assert result["probes"][0]["ok"] is True
+    assert "model not found" in result["probes"][1]["error"]
+
+
+def test_monitor_caches_and_refreshes_in_background():
+    llm = SlowLLM(0)
+    monitor = HealthMonitor([ProbeTarget("m", llm=llm)], cache_seconds=60)
+
+    async def scenario():
+        await asyncio.gather(monitor.check(), monitor.check())
+        assert llm.calls == 1
+        monitor.start(interval=0.01)
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+    assert llm.calls > 2
+    assert monitor.latest()["ok"] is True
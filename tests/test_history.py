@@ -0,0 +1,79 @@
+import pytest
+
+from langchain_ollama.history import ConversationHistory, estimate_tokens
+
+
+def test_prompt_matches_the_old_transcript_format():
+    history = ConversationHistory()
+    history.append("user", "Hi")
+    history.append("assistant", "Hello! ¿Qué tal?")
+    history.append("user", "Fine")
+    assert history.text == "User: Hi\nAssistant: Hello! ¿Qué tal?\nUser: Fine\n"
+    assert history.prompt() == history.text + "Assistant:"
+    assert history.prompt("user").endswith("User:")
+
+
+def test_turns_round_trip():
+    turns = [("user", "a"), ("assistant", "multi\nline"), ("system", "")]
+    history = ConversationHistory(turns)
+    assert len(history) == 3
+    assert list(history) == turns
+    assert history[1] == ("assistant", "multi\nline")
+    assert history[-1] == ("system", "")
+
+
+def test_prompt_is_cached_until_the_next_append():
+    history = ConversationHistory([("user", "Hi")])
+    first = history.prompt()
+    assert history.prompt() is first
+    history.append("assistant", "Hello")
+    assert history.prompt() is not first
+    assert history.prompt().endswith("Assistant: Hello\nAssistant:")
+
+
+def test_rendered_text_is_extended_on_the_next_render():
+    history = ConversationHistory([("user", "Hi")])
+    assert history.prompt() == "User: Hi\nAssistant:"
+    history.append("assistant", "¿Qué tal? 👋")
+    history.append("user", "Bien")
+    # Only the new turns are decoded, yet the result matches a full render
+    assert history.text == bytes(history._buf).decode()
+    assert history.prompt() == history.text + "Assistant:"
+
+
+def test_append_after_prompt_does_not_copy_the_transcript():
+    history = ConversationHistory()
+    for i in range(20000):
+        history.append("user", "message %d" % i)
+    history.prompt()
+    rendered = history._text
+    history.append("assistant", "reply")
+    # Appending leaves the rendered text alone; the next render extends it
+    assert history._text is rendered
+    assert history._rendered < len(history._buf)
+    assert history.prompt().endswith("Assistant: reply\nAssistant:")
+
+
+def test_token_count_uses_reported_counts_when_given():
+    history = ConversationHistory()
+    history.append("user", "x" * 40)
+    history.append("assistant", "whatever", tokens=3)
+    assert history.token_count == estimate_tokens("x" * 40) + 3
+
+
+def test_custom_roles_and_clear():
+    history = ConversationHistory([("tool", "42")])
+    assert history.text == "Tool: 42\n"
+    history.clear()
+    assert len(history) == 0 and history.text == "" and history.token_count == 0
+
+
+def test_history_is_compact():
+    history = ConversationHistory()
+    for i in range(1000):
+        history.append("user" if i % 2 else "assistant", "message %d" % i)
+    assert not hasattr(history, "__dict__")
+    # Transcript bytes plus a few bytes of bookkeeping per turn
+    assert history.nbytes() < len(history.text.encode()) + 10 * len(history)
+    with pytest.raises(IndexError):
+        history[1000]
@@ -0,0 +1,29 @@
+import os
+import sys
+
+
+def _ensure_repo_in_path():
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+
+
+def test_wrapper_import_is_lazy_and_fast():
+    _ensure_repo_in_path()
+    from scripts.check_import_time import check_import_time
+
+    # Generous budget for slow CI runners; the heavy-import check is the
+    # part that catches regressions reliably.
+    res = check_import_time(budget_ms=1000)
+    assert res["heavy_imports"] == []
+    assert res["ok"] is True
+
+
+def test_lazy_names_resolve_on_access():
+    from langchain_ollama import ollama_wrapper
+
+    assert ollama_wrapper.OllamaLLM is not None
+    assert isinstance(ollama_wrapper.LC_HAS_LLM, bool)
+    assert isinstance(ollama_wrapper.FROM_OLLAMA, bool)
+    if not ollama_wrapper.LC_HAS_LLM:
+        assert ollama_wrapper.OllamaLLM is ollama_wrapper.SimpleOllamaLLM
@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import examples.fastapi_server as server
+from langchain_ollama import fake, ollama_wrapper
+from langchain_ollama.fake import FakeOllama
+from langchain_ollama.metrics import CallStats
+from langchain_ollama.ollama_wrapper import SimpleOllamaLLM
+
+
+def test_call_stats_counts_in_flight_and_recent_calls():
+    stats = CallStats()
+    with stats.track("a"):
+        with pytest.raises(ValueError):
+            with stats.track("b"):
+                raise ValueError
+        snapshot = stats.stats()
+        assert snapshot["in_flight"] == 1
+        assert snapshot["models"]["a"]["in_flight"] == 1
+    snapshot = stats.stats()
+    assert (snapshot["in_flight"], snapshot["oldest_in_flight_s"]) == (0, None)
+    assert (snapshot["recent"], snapshot["recent_errors"]) == (2, 1)
+    assert snapshot["models"]["b"]["errors"] == 1
+    assert sum(snapshot["latency_ms"]["histogram"].values()) == 2
+    assert snapshot["latency_ms"]["histogram"]["<=50"] == 2
+
+
+def test_wrapper_calls_are_counted_while_running(request):
+    url = fake.register(request.node.name, FakeOllama(reply="a b c", token_delay=0.1))
+    llm = SimpleOllamaLLM(model=request.node.name, base_url=url)
+    thread = threading.Thread(target=llm.complete, args=("hi",))
+    thread.start()
+    time.sleep(0.1)
+    running = ollama_wrapper.call_stats.stats()["models"][request.node.name]
+    thread.join()
+    assert running["in_flight"] == 1 and running["oldest_s"] > 0
+    list(llm.stream_text("hi"))
+    done = ollama_wrapper.call_stats.stats()["models"][request.node.name]
+    assert (done["in_flight"], done["recent"], done["errors"]) == (0, 2, 0)
+
+
+def test_loaded_models_and_executor_stats(request):
+    url = fake.register(request.node.name, FakeOllama())
+    SimpleOllamaLLM(model="tiny", base_url=url).complete("hi")
+    assert [m["name"] for m in ollama_wrapper.loaded_models(url)] == ["tiny"]
+    pools = ollama_wrapper.executor_stats()
+    assert set(pools) == {"async", "fanout", "group", "hedge"}
+    assert pools["async"]["max_workers"] == 64
+
+
+def test_admin_stats_endpoint(monkeypatch, request):
+    url = fake.register(request.node.name, FakeOllama())
+    monkeypatch.setenv("OLLAMA_BASE_URL", url)
+    monkeypatch.setattr(server, "llm", SimpleOllamaLLM(model="m", base_url=url))
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secret")
+    client = TestClient(server.app)
+    assert client.post("/chat", json={"text": "hi"}).status_code == 200
+    assert client.get("/admin/stats").status_code == 403
+    data = client.get("/admin/stats", headers={"X-Admin-Token": "secret"}).json()
+    assert data["calls"]["models"]["m"]["recent"] >= 1
+    assert data["scheduler"]["classes"]["interactive"]["queued"] == 0
+    assert data["loaded_models"][0]["name"] == "m"
+    assert "async" in data["executors"]
@@ -59,3 +59,65 @@ def test_error_when_no_client_and_no_cli(monkeypatch):
     llm = OllamaLLM(model="test-model")
     with pytest.raises(OllamaClientError):
         _ = llm._call("Hi") if hasattr(llm, "_call") else llm.generate_text("Hi")
+
+
+def _generate(llm, prompt, stop=None):
+    if hasattr(llm, "_call"):
+        return llm._call(prompt, stop=stop)
+    return llm.generate_text(prompt, stop=stop)
+
+
+def test_generation_options_forwarded_to_server(monkeypatch):
+    captured = {}
+
+    def fake_chat(model, messages, **kwargs):
+        captured.update(kwargs)
+        return {"message": {"role": "assistant", "content": "ok"}}
+
+    monkeypatch.setattr("langchain_ollama.ollama_wrapper.FROM_OLLAMA", True)
+    monkeypatch.setattr(
+        "langchain_ollama.ollama_wrapper.ollama",
+        type("M", (), {"chat": staticmethod(fake_chat)}),
+    )
+    llm = OllamaLLM(model="test-model", num_predict=64, options={"temperature": 0})
+    assert _generate(llm, "Hi") == "ok"
+    assert captured["options"] == {"temperature": 0, "num_predict": 64}
+
+
+def test_stop_sequence_ends_stream_early(monkeypatch):
+    pulled = []
+
+    class FakeClient:
+        def chat(self, model, messages, stream=False, **kwargs):
+            assert stream is True
+            assert kwargs["options"]["stop"] == ["\nUser:"]
+            for piece in ["Sure", ".\nUs", "er: next", " turn", " more"]:
+                pulled.append(piece)
+                yield {"message": {"content": piece}}
+
+    monkeypatch.setattr("langchain_ollama.ollama_wrapper.FROM_OLLAMA", True)
+    monkeypatch.setattr(
+        "langchain_ollama.ollama_wrapper._get_client", lambda url, t: FakeClient()
+    )
+    llm = OllamaLLM(model="test-model")
+    assert _generate(llm, "Hi", stop=["\nUser:"]) == "Sure."
+    # Stop straddled a chunk boundary; nothing after it was pulled
+    assert pulled == ["Sure", ".\nUs", "er: next"]
+
+
+def test_cli_output_truncated_at_stop(monkeypatch):
+    monkeypatch.setattr("langchain_ollama.ollama_wrapper.FROM_OLLAMA", False)
+    monkeypatch.setattr(
+        "langchain_ollama.ollama_wrapper.shutil.which", lambda name: "/bin/ollama"
+    )
+
+    class Completed:
+        returncode = 0
+        stdout = b"Answer here\nUser: made-up turn"
+        stderr = b""
+
+    monkeypatch.setattr(
+        "langchain_ollama.ollama_wrapper.subprocess.run", lambda *a, **k: Completed()
+    )
+    llm = OllamaLLM(model="test-model")
+    assert _generate(llm, "Hi", stop=["\nUser:"]) == "Answer here"
@@ -0,0 +1,95 @@
+import time
+
+from langchain_ollama import ollama_wrapper
+from langchain_ollama.ollama_wrapper import OllamaLLM
+from langchain_ollama.prefix import PrefixSession
+from langchain_ollama.resilience import Deadline
+
+SYSTEM = "You are a terse assistant. " * 50
+
+
+def _call(llm, prompt):
+    return llm._call(prompt) if hasattr(llm, "_call") else llm.generate_text(prompt)
+
+
+def test_system_prompt_is_a_stable_prefix_and_savings_are_measured(monkeypatch):
+    calls = []
+
+    def fake_chat(model, messages, **kwargs):
+        calls.append((messages, kwargs))
+        if kwargs["options"].get("num_predict") == 1:
+            # Warm-up: the whole prefix is evaluated
+            return {
+                "message": {"content": ""},
+                "prompt_eval_count": 500,
+                "prompt_eval_duration": 250_000_000,
+            }
+        # Later turns: only the new user tokens are evaluated
+        return {
+            "message": {"content": "ok"},
+            "prompt_eval_count": 12,
+            "prompt_eval_duration": 6_000_000,
+        }
+
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(
+        ollama_wrapper, "ollama", type("M", (), {"chat": staticmethod(fake_chat)})
+    )
+    llm = OllamaLLM(
+        model="prefix-model", system_prompt=SYSTEM, keep_alive="30m", num_predict=50
+    )
+    assert _call(llm, "first") == "ok"
+    assert _call(llm, "second") == "ok"
+
+    # One warm-up, then the two real requests
+    assert len(calls) == 3
+    for messages, kwargs in calls:
+        assert messages[0] == {"role": "system", "content": SYSTEM}
+        assert kwargs["keep_alive"] == "30m"
+    assert calls[1][0][1] == {"role": "user", "content": "first"}
+
+    stats = llm.prefix_stats()
+    assert stats["prefix_tokens"] == 500
+    assert stats["requests"] == 2
+    assert stats["prefix_reused"] == 2
+    assert stats["saved_prompt_eval_ms"] == 500.0
+    assert stats["avg_prompt_eval_ms"] == 6.0
+
+
+def test_prefix_miss_is_not_counted_as_saving():
+    session = PrefixSession("m", "sys")
+    session.record_warmup({"prompt_eval_count": 100, "prompt_eval_duration": 1e8})
+    session.record({"prompt_eval_count": 130, "prompt_eval_duration": 1.3e8})
+    stats = session.stats()
+    assert stats["prefix_reused"] == 0
+    assert stats["saved_prompt_eval_ms"] == 0.0
+    assert session.claim_warmup() is True
+    assert session.claim_warmup() is False
+
+
+def test_no_stats_without_system_prompt():
+    assert OllamaLLM(model="m").prefix_stats() is None
+
+
+def test_warm_up_only_gets_the_remaining_budget(monkeypatch):
+    timeouts = []
+
+    class Client:
+        def __init__(self, host=None, timeout=None):
+            timeouts.append(timeout)
+
+        def chat(self, model, messages, **kwargs):
+            return {"message": {"content": ""}, "prompt_eval_count": 500}
+
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(ollama_wrapper, "ollama", type("M", (), {"Client": Client}))
+    llm = OllamaLLM(model="prefix-model", system_prompt=SYSTEM)
+    session = PrefixSession("prefix-model", SYSTEM)
+    deadline = Deadline(1.0)
+    time.sleep(0.2)
+    llm._warm_prefix(session, deadline, {})
+    assert 0 < timeouts[0] <= 0.8
+    assert session.prefix_tokens == 500
+    # An exhausted budget skips the warm-up
+    llm._warm_prefix(session, Deadline(0), {})
+    assert len(timeouts) == 1
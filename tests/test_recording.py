@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+import time
+
+from langchain_ollama import ollama_wrapper
+from langchain_ollama.ollama_wrapper import OllamaLLM
+from langchain_ollama.recording import RequestRecorder, read_records, replay
+
+
+def _call(llm, prompt, **options):
+    if hasattr(llm, "_call"):
+        return llm._call(prompt, **options)
+    return llm.generate_text(prompt, **options)
+
+
+def test_recorder_captures_calls(tmp_path, monkeypatch):
+    def fake_chat(model, messages, **kwargs):
+        return {
+            "message": {"content": "hello"},
+            "prompt_eval_count": 7,
+            "eval_count": 3,
+        }
+
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(
+        ollama_wrapper, "ollama", type("M", (), {"chat": staticmethod(fake_chat)})
+    )
+    path = tmp_path / "requests.jsonl"
+    recorder = RequestRecorder(str(path))
+    llm = OllamaLLM(model="rec-model", recorder=recorder)
+    assert _call(llm, "Hi", temperature=0) == "hello"
+    recorder.close()
+
+    (record,) = list(read_records(str(path)))
+    assert record["model"] == "rec-model"
+    assert record["prompt"] == "Hi"
+    assert record["options"] == {"temperature": 0}
+    assert record["backend"] == "client"
+    assert record["prompt_tokens"] == 7
+    assert record["completion_tokens"] == 3
+    assert record["latency_ms"] >= 0
+
+
+def test_read_records_skips_torn_lines(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_text(json.dumps({"ts": 1, "prompt": "a"}) + '\n\n{"ts": 2, "pro')
+    assert [r["prompt"] for r in read_records(str(path))] == ["a"]
+
+
+def test_replay_keeps_inter_arrival_timing_and_reports_percentiles():
+    records = [
+        {"ts": 100.0 + i * 0.1, "model": "m", "prompt": str(i)} for i in range(4)
+    ]
+    seen = []
+
+    def call(record):
+        seen.append(record["prompt"])
+        if record["prompt"] == "3":
+            raise RuntimeError("boom")
+
+    started = time.perf_counter()
+    report = replay(records, call, speed=2.0)
+    # 0.3s of recorded traffic at 2x speed
+    assert 0.13 <= time.perf_counter() - started < 1.0
+    assert sorted(seen) == ["0", "1", "2", "3"]
+    assert report["requests"] == 4
+    assert report["errors"] == 1
+    assert set(report["latency_ms"]) == {"p50", "p95", "p99", "max"}
+
+    fast = replay(records, lambda r: None, speed=0)
+    assert fast["duration_s"] < 0.1
+
+
+def test_replay_script_against_fake_calls(tmp_path, monkeypatch, capsys):
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+    from scripts import replay_requests
+
+    path = tmp_path / "log.jsonl"
+    path.write_text(json.dumps({"ts": 1, "model": "m", "prompt": "Hi"}) + "\n")
+    monkeypatch.setattr(
+        "langchain_ollama.recording.llm_caller", lambda *a: (lambda record: "ok")
+    )
+    assert replay_requests.main([str(path), "--speed", "0"]) == 0
+    assert json.loads(capsys.readouterr().out)["requests"] == 1
@@ -0,0 +1,312 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from langchain_ollama import fake, ollama_wrapper
+from langchain_ollama.fake import FakeOllama, FakeResponseError
+from langchain_ollama.ollama_wrapper import (
+    CircuitOpenError,
+    OllamaCancelledError,
+    OllamaLLM,
+)
+from langchain_ollama.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    Deadline,
+    LatencyTracker,
+    RetryPolicy,
+    hedged_call,
+    is_request_error,
+    is_transient_error,
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_breakers():
+    ollama_wrapper.circuit_breakers.configure(failure_threshold=2, recovery_timeout=60)
+    yield
+    ollama_wrapper.circuit_breakers.configure(failure_threshold=5, recovery_timeout=10)
+
+
+def _call(llm, prompt):
+    return llm._call(prompt) if hasattr(llm, "_call") else llm.generate_text(prompt)
+
+
+def test_breaker_opens_and_half_open_probe():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is True
+    # Only one probe is let through while half-open
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow() is True
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_cancelled_half_open_probe_is_released(request):
+    ollama_wrapper.circuit_breakers.configure(
+        failure_threshold=1, recovery_timeout=0.05
+    )
+    backend = FakeOllama(reply="a b c d e f", token_delay=0.05)
+    url = fake.register(request.node.name, backend)
+    llm = OllamaLLM(model="m", base_url=url)
+    backend.fail_next()
+    with pytest.raises(FakeResponseError):
+        llm.complete("Hi")
+    breaker = ollama_wrapper.circuit_breakers.get(("client", url))
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    with pytest.raises(OllamaCancelledError):
+        llm.complete("Hi", cancel=cancel)
+    # The cancelled probe gave no verdict; the next call probes again
+    assert breaker.state == HALF_OPEN
+    assert llm.complete("Hi").text == "a b c d e f"
+    assert breaker.state == CLOSED
+
+
+def test_cancelled_async_probe_is_released(request):
+    ollama_wrapper.circuit_breakers.configure(
+        failure_threshold=1, recovery_timeout=0.05
+    )
+    backend = FakeOllama(reply="a b c d e f", token_delay=0.05)
+    url = fake.register(request.node.name, backend)
+    llm = OllamaLLM(model="m", base_url=url)
+    breaker = ollama_wrapper.circuit_breakers.get(("client", url))
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(llm.ainvoke("Hi"), 0.1)
+        assert breaker.state == HALF_OPEN
+        return await llm.ainvoke("Hi")
+
+    assert asyncio.run(main()) == "a b c d e f"
+    assert breaker.state == CLOSED
+    assert backend.stats()["requests"] == 2
+
+
+def test_request_errors_do_not_open_the_circuit(request):
+    backend = FakeOllama(reply="ok", error_status=404)
+    url = fake.register(request.node.name, backend)
+    backend.fail_next(3)
+    for _ in range(3):
+        # Not CircuitOpenError, although the threshold is 2
+        with pytest.raises(FakeResponseError):
+            OllamaLLM(model="missing-model", base_url=url).complete("Hi")
+    assert OllamaLLM(model="good-model", base_url=url).complete("Hi").text == "ok"
+    assert ollama_wrapper.circuit_breakers.get(("client", url)).state == CLOSED
+    assert not is_request_error(FakeResponseError("loading", 503))
+    assert not is_request_error(FakeResponseError("slow down", 429))
+
+
+def test_deadline_remaining():
+    assert Deadline(None).remaining() is None
+    assert Deadline(None).remaining(30) == 30
+    d = Deadline(0.5)
+    assert 0 < d.remaining(30) <= 0.5
+    assert Deadline(0).expired()
+
+
+def test_outage_fails_fast_once_circuit_opens(monkeypatch):
+    calls = []
+
+    def failing_chat(*a, **k):
+        calls.append("client")
+        raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(
+        ollama_wrapper, "ollama", type("M", (), {"chat": staticmethod(failing_chat)})
+    )
+    monkeypatch.setattr(ollama_wrapper.shutil, "which", lambda name: None)
+
+    llm = OllamaLLM(model="test-model")
+    for _ in range(2):
+        with pytest.raises(ollama_wrapper.OllamaClientError):
+            _call(llm, "Hi")
+    assert calls == ["client", "client"]
+
+    with pytest.raises(CircuitOpenError):
+        _call(llm, "Hi")
+    # The open circuit short-circuits without touching the backend
+    assert calls == ["client", "client"]
+
+
+def test_cli_chain_shares_one_deadline(monkeypatch):
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", False)
+    monkeypatch.setattr(ollama_wrapper.shutil, "which", lambda name: "/bin/ollama")
+    budgets = []
+
+    class Failed:
+        returncode = 1
+        stdout = b""
+        stderr = b"error"
+
+    def fake_run(cmd, **kwargs):
+        budgets.append(kwargs["timeout"])
+        time.sleep(0.05)
+        return Failed()
+
+    monkeypatch.setattr(ollama_wrapper.subprocess, "run", fake_run)
+    llm = OllamaLLM(model="test-model", timeout=0.08)
+    with pytest.raises(ollama_wrapper.OllamaClientError, match="timed out"):
+        _call(llm, "Hi")
+    # The second command only gets what is left of the overall budget and
+    # the third is never started.
+    assert len(budgets) == 2
+    assert budgets[1] < 0.08
+
+
+def test_retry_policy_retries_transient_errors():
+    outcomes = [ConnectionError("reset"), TimeoutError("slow"), "ok"]
+
+    def flaky():
+        result = outcomes.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+    assert policy.call(flaky) == "ok"
+
+
+def test_retry_policy_does_not_retry_permanent_errors():
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ValueError("model not found")
+
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=5, base_delay=0.001).call(broken)
+    assert len(calls) == 1
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=3.0)
+    delays = [policy.backoff(5) for _ in range(50)]
+    assert all(0 <= d <= 3.0 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_transient_error_classification():
+    class ResponseError(Exception):
+        status_code = 503
+
+    assert is_transient_error(ResponseError("busy"))
+    assert is_transient_error(RuntimeError("error loading model"))
+    assert not is_transient_error(RuntimeError("bad request"))
+
+
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker()
+    assert tracker.percentile(95) is None
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+    assert tracker.percentile(95) == pytest.approx(0.095)
+    assert tracker.percentile(50) == pytest.approx(0.05)
+
+
+def test_hedged_call_cancels_the_slow_attempt():
+    slow_cancelled = threading.Event()
+
+    def slow(on_token, cancel):
+        cancel.wait(5)
+        slow_cancelled.set()
+        return "slow"
+
+    def fast(on_token, cancel):
+        on_token()
+        return "fast"
+
+    assert hedged_call([slow, fast], hedge_after=0.02) == "fast"
+    assert slow_cancelled.wait(5)
+
+
+def test_hedged_call_keeps_first_attempt_when_it_streams():
+    backups = []
+
+    def primary(on_token, cancel):
+        on_token()
+        return "primary"
+
+    def backup(on_token, cancel):
+        backups.append(1)
+        return "backup"
+
+    assert hedged_call([primary, backup], hedge_after=1.0) == "primary"
+    assert backups == []
+
+
+def test_hedged_call_raises_when_all_attempts_fail():
+    def failing(on_token, cancel):
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        hedged_call([failing, failing], hedge_after=1.0)
+
+
+def test_hedged_call_stops_when_the_check_fails():
+    cancelled = []
+
+    def stalled(on_token, cancel):
+        cancel.wait(5)
+        cancelled.append(cancel.is_set())
+
+    deadline = Deadline(0.1)
+
+    def check():
+        if deadline.expired():
+            raise TimeoutError("expired")
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        hedged_call([stalled, stalled], hedge_after=0.02, check=check)
+    assert time.monotonic() - started < 0.5
+    time.sleep(0.05)
+    assert cancelled == [True, True]
+
+
+def test_wrapper_hedges_to_backup_endpoint(monkeypatch):
+    class FakeClient:
+        def __init__(self, delay):
+            self.delay = delay
+
+        def chat(self, model, messages, stream=False, **kwargs):
+            time.sleep(self.delay)
+            for word in ("Hello", " there"):
+                yield {"message": {"role": "assistant", "content": word}}
+
+    clients = {None: FakeClient(1.0), "http://backup:11434": FakeClient(0)}
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(ollama_wrapper, "_get_client", lambda url, t: clients[url])
+
+    llm = OllamaLLM(
+        model="test-model", hedge_urls=["http://backup:11434"], hedge_after=0.05
+    )
+    started = time.monotonic()
+    assert _call(llm, "Hi") == "Hello there"
+    assert time.monotonic() - started < 0.9
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from langchain_ollama.router import ModelRoute, ModelRouter, parse_routes
+from langchain_ollama.usage import Completion
+
+
+class FakeLLM:
+    def __init__(self, model, **kwargs):
+        self.model = model
+        self.kwargs = kwargs
+        self.prompts = []
+
+    def complete(self, prompt, stop=None, **options):
+        self.prompts.append(prompt)
+        return Completion(
+            text=f"{self.model}: ok",
+            model=self.model,
+            backend="client",
+            prompt_tokens=10,
+            completion_tokens=5,
+            prompt_eval_ms=10.0,
+        )
+
+    async def acomplete(self, prompt, stop=None, **options):
+        return self.complete(prompt, stop, **options)
+
+
+def make_router(**kwargs):
+    return ModelRouter(
+        [ModelRoute("small", max_prompt_tokens=100), ModelRoute("large")],
+        llm_factory=FakeLLM,
+        **kwargs,
+    )
+
+
+def seed(router, model, seconds, n=5):
+    done = Completion(text="", model=model, backend="client")
+    for _ in range(n):
+        router.record(model, done, seconds)
+
+
+def test_parse_routes():
+    assert parse_routes("llama3.2:1b=2048, llama3.1:8b") == [
+        ModelRoute("llama3.2:1b", 2048),
+        ModelRoute("llama3.1:8b"),
+    ]
+
+
+def test_short_prompts_go_to_the_small_model_long_ones_to_the_large():
+    router = make_router(base_url="http://h:11434")
+    assert router.llms["small"].kwargs == {"base_url": "http://h:11434"}
+    assert router("hi") == "small: ok"
+    assert router("x" * 1000) == "large: ok"
+    assert router.stats()["small"]["routed"] == 1
+    assert router.stats()["large"]["routed"] == 1
+
+
+def test_prompt_longer_than_every_limit_falls_back_to_the_last_model():
+    router = ModelRouter(
+        [ModelRoute("a", 10), ModelRoute("b", 20)], llm_factory=FakeLLM
+    )
+    assert router.choose("x" * 1000).model == "b"
+
+
+def test_latency_budget_uses_live_stats():
+    router = make_router()
+    # Unmeasured models are assumed to fit
+    assert router.choose("hi", latency_budget=0.5).model == "small"
+    seed(router, "small", 2.0)
+    seed(router, "large", 0.3)
+    assert router.estimate("small", 1) == pytest.approx(2.0)
+    assert router.choose("hi", latency_budget=0.5).model == "large"
+    # Without a budget the smallest model that accepts the prompt wins
+    assert router.choose("hi").model == "small"
+    # No model fits: the fastest one is used
+    assert router.choose("hi", latency_budget=0.1).model == "large"
+
+
+def test_prefill_rate_scales_the_estimate_with_prompt_size():
+    router = make_router()
+    for _ in range(3):
+        router.complete("hi")
+    # 10 ms per 10 prompt tokens -> 1 ms per token
+    assert router.stats()["small"]["prefill_ms_per_token"] == pytest.approx(1.0)
+    small, large = router.estimate("small", 0), router.estimate("small", 1000)
+    assert large - small == pytest.approx(1.0)
+
+
+def test_cache_hits_do_not_count_as_latency_samples():
+    router = make_router()
+    seed(router, "small", 0.001)
+    router.record("small", Completion("", "small", "cache"), 5.0)
+    assert router.stats()["small"]["requests"] == 5
+
+
+def test_acomplete_passes_the_budget():
+    router = make_router()
+    seed(router, "small", 2.0)
+    result = asyncio.run(router.acomplete("hi", latency_budget=0.5))
+    assert result.model == "large"
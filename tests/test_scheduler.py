@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from langchain_ollama.scheduler import (
+    DeadlineExceeded,
+    PriorityClass,
+    RequestScheduler,
+    SchedulerError,
+)
+
+
+def _blocked_scheduler(classes=None, max_concurrency=1):
+    """Return a scheduler whose only slot is held until `release` is set."""
+    sched = RequestScheduler(classes=classes, max_concurrency=max_concurrency)
+    release = threading.Event()
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    blocker = sched.submit(hold)
+    assert started.wait(5)
+    return sched, release, blocker
+
+
+def test_interactive_runs_before_batch():
+    sched, release, blocker = _blocked_scheduler()
+    order = []
+    futures = [
+        sched.submit(order.append, "batch-1", priority="batch"),
+        sched.submit(order.append, "batch-2", priority="batch"),
+        sched.submit(order.append, "chat", priority="interactive"),
+    ]
+    release.set()
+    for f in [blocker] + futures:
+        f.result(timeout=5)
+    assert order == ["chat", "batch-1", "batch-2"]
+    sched.shutdown()
+
+
+def test_fair_queuing_between_sessions():
+    sched, release, blocker = _blocked_scheduler()
+    order = []
+    futures = [sched.submit(order.append, f"a{i}", session="a") for i in range(3)]
+    futures += [sched.submit(order.append, f"b{i}", session="b") for i in range(2)]
+    release.set()
+    for f in [blocker] + futures:
+        f.result(timeout=5)
+    assert order == ["a0", "b0", "a1", "b1", "a2"]
+    sched.shutdown()
+
+
+def test_per_class_concurrency_cap():
+    sched = RequestScheduler(
+        classes=[PriorityClass("batch", priority=0, max_concurrency=1)],
+        max_concurrency=4,
+    )
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def work():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.pop()
+
+    sched.map(lambda _: work(), range(5), priority="batch")
+    assert max(peak) == 1
+    sched.shutdown()
+
+
+def test_expired_requests_are_dropped():
+    sched, release, blocker = _blocked_scheduler()
+    ran = []
+    late = sched.submit(ran.append, "late", timeout=0.01)
+    time.sleep(0.05)
+    release.set()
+    with pytest.raises(DeadlineExceeded):
+        late.result(timeout=5)
+    assert ran == []
+    assert sched.stats()["dropped"] == 1
+    sched.shutdown()
+
+
+def test_async_cancel_removes_queued_request():
+    sched, release, blocker = _blocked_scheduler()
+    ran = []
+
+    async def caller():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(sched.run(ran.append, "x"), timeout=0.01)
+
+    asyncio.run(caller())
+    release.set()
+    blocker.result(timeout=5)
+    sched.shutdown()
+    assert ran == []
+
+
+def test_unknown_priority_rejected():
+    sched = RequestScheduler()
+    with pytest.raises(SchedulerError):
+        sched.submit(lambda: None, priority="vip")
+    sched.shutdown()
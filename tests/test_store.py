@@ -0,0 +1,158 @@
+import multiprocessing
+import time
+
+from langchain_ollama import fake, ollama_wrapper
+from langchain_ollama.fake import FakeOllama
+from langchain_ollama.ollama_wrapper import OllamaLLM, SimpleOllamaLLM
+from langchain_ollama.store import (
+    ConversationArchive,
+    MemorySessionStore,
+    ResponseCache,
+    SessionStore,
+    SharedUsageTracker,
+)
+from langchain_ollama.usage import Completion
+
+
+def _fake_ollama(monkeypatch, calls):
+    def fake_chat(model, messages, **kwargs):
+        calls.append(messages[-1]["content"])
+        return {"message": {"content": "reply"}, "eval_count": 2}
+
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(
+        ollama_wrapper, "ollama", type("M", (), {"chat": staticmethod(fake_chat)})
+    )
+
+
+def test_response_cache_answers_identical_requests(tmp_path, monkeypatch):
+    calls = []
+    _fake_ollama(monkeypatch, calls)
+    cache = ResponseCache(str(tmp_path / "state.db"))
+    llm = OllamaLLM(model="cache-model", response_cache=cache)
+
+    first = llm.complete("Hi", temperature=0)
+    second = llm.complete("Hi", temperature=0)
+    llm.complete("Hi", temperature=0.5)
+    assert calls == ["Hi", "Hi"]
+    assert first.backend == "client"
+    assert (second.text, second.backend, second.completion_tokens) == (
+        "reply",
+        "cache",
+        2,
+    )
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+
+def test_response_cache_ttl_and_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.db"), ttl=0.05, max_entries=3)
+    cache.put("k", {"text": "v"})
+    assert cache.get("k") == {"text": "v"}
+    time.sleep(0.06)
+    assert cache.get("k") is None
+
+    for i in range(10):
+        cache.put(f"k{i}", {"text": i})
+    cache._evict()
+    assert cache.stats()["entries"] == 3
+    assert cache.get("k9") is not None
+
+
+def _append_turns(path, worker):
+    store = SessionStore(path)
+    for i in range(20):
+        store.append("shared", "user", f"{worker}-{i}")
+
+
+def test_session_store_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = SessionStore(path)
+    store.append("s1", "user", "Hi")
+    store.append("s1", "assistant", "Hello", tokens=3)
+    history = store.load("s1")
+    assert list(history) == [("user", "Hi"), ("assistant", "Hello")]
+    assert history.prompt() == "User: Hi\nAssistant: Hello\nAssistant:"
+
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_append_turns, args=(path, w)) for w in range(2)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+    assert len(store.load("shared")) == 40
+
+    store.delete("s1")
+    assert len(store.load("s1")) == 0
+
+
+def test_memory_session_store_matches_sqlite_store():
+    store = MemorySessionStore()
+    store.append("s", "user", "Hi")
+    assert store.load("s") is store.load("s")
+    assert list(store.load("s")) == [("user", "Hi")]
+    assert len(store.load("other")) == 0
+
+
+def test_conversation_archive_index_and_recent_window(tmp_path):
+    path = str(tmp_path / "state.db")
+    # Sessions written before the index existed are picked up
+    SessionStore(path).append("old", "user", "12345678")
+    archive = ConversationArchive(path)
+    assert archive.append("old", "assistant", "hi", tokens=5) == 1
+    assert archive.info("old")["turns"] == 2
+    assert archive.info("old")["tokens"] == 7
+
+    for i in range(10):
+        archive.append("s", "user" if i % 2 == 0 else "assistant", f"turn {i}")
+    assert archive.info("missing") is None
+    assert list(archive.load("s", recent=3)) == [
+        ("assistant", "turn 7"),
+        ("user", "turn 8"),
+        ("assistant", "turn 9"),
+    ]
+    assert len(archive.load("s")) == 10
+
+    assert archive.context("s") is None
+    archive.set_context("s", [1, 70000, 3], turns=10)
+    # A new instance, e.g. after a restart, finds everything again
+    restarted = ConversationArchive(path)
+    assert restarted.context("s") == ([1, 70000, 3], 10)
+    assert restarted.info("s")["context_turns"] == 10
+    restarted.set_context("s", None)
+    assert restarted.context("s") is None
+    restarted.delete("s")
+    assert restarted.info("s") is None and len(restarted.load("s")) == 0
+
+
+def test_complete_in_context_sends_only_the_new_message(request):
+    prompts = []
+
+    def reply(prompt):
+        prompts.append(prompt)
+        return "ok"
+
+    url = fake.register(request.node.name, FakeOllama(reply=reply))
+    llm = SimpleOllamaLLM(model="m", base_url=url)
+    first, context = llm.complete_in_context("User: a long first message\nAssistant:")
+    assert first.text == "ok" and context
+    second, longer = llm.complete_in_context("User: next\nAssistant:", context)
+    assert longer[: len(context)] == context and len(longer) > len(context)
+    assert prompts[-1] == "User: next\nAssistant:"
+    assert second.prompt_tokens < first.prompt_tokens
+
+
+def test_shared_usage_tracker(tmp_path):
+    tracker = SharedUsageTracker(str(tmp_path / "state.db"))
+    tracker.record("a", Completion("x", "m", "client", 10, 5))
+    totals = tracker.record("a", Completion("y", "m", "client", 20, 5))
+    assert totals == {
+        "requests": 2,
+        "prompt_tokens": 30,
+        "completion_tokens": 10,
+        "total_tokens": 40,
+    }
+    tracker.record("b", Completion("z", "m", "cli"))
+    assert tracker.totals()["sessions"] == 2
+    assert tracker.get("missing")["requests"] == 0
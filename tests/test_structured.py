@@ -0,0 +1,117 @@
+import asyncio
+import json
+from enum import Enum
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel, ConfigDict
+
+from langchain_ollama import fake
+from langchain_ollama.fake import FakeOllama
+from langchain_ollama.ollama_wrapper import OllamaLLM, SimpleOllamaLLM
+from langchain_ollama.structured import (
+    JSONPrefixParser,
+    StructuredOutputError,
+    json_schema,
+)
+
+
+class Mood(str, Enum):
+    happy = "happy"
+    sad = "sad"
+
+
+class Item(BaseModel):
+    name: str
+    qty: int
+
+
+class Order(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    customer: str
+    mood: Mood
+    items: List[Item]
+    note: Optional[str] = None
+
+
+GOOD = {
+    "customer": "Ada",
+    "mood": "happy",
+    "items": [{"name": "tea", "qty": 2}],
+    "note": None,
+}
+
+
+def check(schema, text, chunk=1):
+    parser = JSONPrefixParser(json_schema(schema))
+    for i in range(0, len(text), chunk):
+        parser.feed(text[i : i + chunk])
+    parser.finish()
+
+
+def test_valid_documents_pass_in_any_chunking():
+    for chunk in (1, 4, 1000):
+        check(Order, json.dumps(GOOD), chunk)
+        check(Order, json.dumps(GOOD, indent=2), chunk)
+    check({"type": "array", "items": {"type": "number"}}, "[1, -2.5e3, 0]")
+    check({}, '"anything"')
+
+
+@pytest.mark.parametrize(
+    "prefix",
+    [
+        "Sure! Here",  # prose instead of JSON
+        '{"customer": 42',  # wrong type
+        '{"custom',  # no such key, and extra keys are forbidden
+        '{"customer": "Ada", "mood": "ang',  # not an enum value
+        '{"customer": "Ada", "mood": "sad", "items": [{"name": "x", "qty": 1.5',
+        '{"customer": "Ada", "items": [], "mood": "sad"} and more',
+    ],
+)
+def test_divergence_is_detected_on_the_prefix(prefix):
+    parser = JSONPrefixParser(json_schema(Order))
+    with pytest.raises(StructuredOutputError) as info:
+        parser.feed(prefix)
+        parser.finish()
+    assert info.value.text == prefix
+
+
+def test_missing_required_keys_and_truncation():
+    with pytest.raises(StructuredOutputError, match="missing required"):
+        check(Order, '{"customer": "Ada"}')
+    with pytest.raises(StructuredOutputError, match="complete"):
+        check(Order, '{"customer": "Ada", ')
+
+
+def test_complete_structured_returns_a_typed_object(request):
+    url = fake.register(request.node.name, FakeOllama(reply=json.dumps(GOOD)))
+    llm = SimpleOllamaLLM(model="m", base_url=url)
+    order = llm.complete_structured("order tea", Order)
+    assert isinstance(order, Order)
+    assert order.items[0].qty == 2 and order.mood is Mood.happy
+    assert llm.complete_structured("order", {"type": "object"}) == GOOD
+    assert asyncio.run(llm.acomplete_structured("order tea", Order)) == order
+
+
+def test_divergent_generation_is_aborted_early(request):
+    bad = '{"customer": 7, ' + '"padding padding padding", ' * 200 + "}"
+    backend = FakeOllama(reply=bad, token_delay=0.005)
+    url = fake.register(request.node.name, backend)
+    llm = SimpleOllamaLLM(model="m", base_url=url)
+    with pytest.raises(StructuredOutputError) as info:
+        llm.complete_structured("order", Order, attempts=2)
+    # Stopped at the bad value, not after the 600-odd tokens of the reply
+    assert len(info.value.text) < 30
+    assert backend.stats()["requests"] == 2
+    assert backend.stats()["in_flight"] == 0
+    with pytest.raises(StructuredOutputError):
+        asyncio.run(llm.acomplete_structured("order", Order))
+    assert backend.stats()["in_flight"] == 0
+
+
+def test_langchain_with_structured_output(request):
+    url = fake.register(request.node.name, FakeOllama(reply=json.dumps(GOOD)))
+    chain = OllamaLLM(model="m", base_url=url).with_structured_output(Order)
+    assert chain.invoke("order tea").customer == "Ada"
+    assert asyncio.run(chain.ainvoke("order tea")).customer == "Ada"
@@ -0,0 +1,113 @@
+import threading
+import time
+import types
+
+import pytest
+from fastapi.testclient import TestClient
+
+from langchain_ollama import ollama_wrapper, tracing
+from langchain_ollama.ollama_wrapper import SimpleOllamaLLM
+
+
+@pytest.fixture
+def recorder():
+    rec = tracing.enable(tracing.TraceRecorder())
+    yield rec
+    tracing.disable()
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    def chat(model, messages, **kwargs):
+        return {"message": {"content": "hello"}, "done": True, "eval_count": 1}
+
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(ollama_wrapper, "ollama", types.SimpleNamespace(chat=chat))
+
+
+def test_spans_are_free_no_ops_when_disabled():
+    assert tracing.active() is None
+    with tracing.span("anything", key="value") as span:
+        span.set(more=1)
+    assert tracing.span("a") is tracing.span("b")
+
+
+def test_wrapper_call_records_each_step(recorder, fake_client):
+    assert SimpleOllamaLLM(model="m")("Hi") == "hello"
+    names = [e["name"] for e in recorder.export()["traceEvents"] if e["ph"] == "X"]
+    assert {
+        "ollama.complete",
+        "ollama.build_request",
+        "ollama.client",
+        "ollama.extract",
+    } <= set(names)
+    complete = next(
+        e
+        for e in recorder.export()["traceEvents"]
+        if e.get("name") == "ollama.complete"
+    )
+    assert complete["args"] == {"model": "m", "backend": "client"}
+    assert complete["dur"] >= 0
+    assert recorder.summary()["ollama.complete"]["count"] == 1
+
+
+def test_failed_spans_carry_the_error(recorder):
+    with pytest.raises(ValueError):
+        with tracing.span("step"):
+            raise ValueError("boom")
+    (event,) = [e for e in recorder.export()["traceEvents"] if e["ph"] == "X"]
+    assert event["args"] == {"error": "ValueError"}
+
+
+def test_concurrent_spans_export_as_async_events(recorder):
+    with tracing.span("outer", concurrent=True):
+        pass
+    phases = [e["ph"] for e in recorder.export()["traceEvents"]]
+    assert phases.count("b") == phases.count("e") == 1
+
+
+def test_sample_stacks_sees_other_threads():
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=busy_worker, name="busy")
+    thread.start()
+    try:
+        stacks = tracing.sample_stacks(0.1, interval=0.005)
+    finally:
+        stop.set()
+        thread.join()
+    folded = tracing.collapsed(stacks)
+    assert any(
+        line.startswith("busy;") and "busy_worker" in line
+        for line in folded.splitlines()
+    )
+
+
+def test_fastapi_debug_endpoints(monkeypatch):
+    import examples.fastapi_server as server
+
+    monkeypatch.setattr(server, "TRACE", "1")
+    monkeypatch.setattr(server, "llm", lambda prompt, **kwargs: "hi")
+    client = TestClient(server.app)
+    try:
+        assert client.post("/chat", json={"text": "Hi"}).json() == {"reply": "hi"}
+        summary = client.get("/debug/trace", params={"summary": True}).json()
+        assert summary["http POST /chat"]["count"] == 1
+        assert summary["scheduler.queue"]["count"] == 1
+        profile = client.get("/debug/profile", params={"seconds": 0.05})
+        assert profile.status_code == 200 and profile.text
+    finally:
+        tracing.disable()
+
+
+def test_fastapi_debug_endpoints_are_off_by_default(monkeypatch):
+    import examples.fastapi_server as server
+
+    monkeypatch.setattr(server, "TRACE", None)
+    client = TestClient(server.app)
+    assert client.get("/debug/trace").status_code == 404
+    assert client.get("/debug/profile").status_code == 404
@@ -0,0 +1,107 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import examples.fastapi_server as server
+from langchain_ollama import fake
+from langchain_ollama.fake import FakeOllama
+from langchain_ollama.ollama_wrapper import SimpleOllamaLLM
+from langchain_ollama.transforms import (
+    DetectJSON,
+    DropThinking,
+    Pipeline,
+    StripWhitespace,
+)
+
+REPLY = "  <think>The user greets me.</think>\n\nHello there, world.  "
+
+
+def split(text, size=3):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_drop_thinking_handles_tags_split_across_chunks():
+    pipeline = Pipeline([DropThinking(), StripWhitespace()])
+    for size in (1, 2, 3, 7, len(REPLY)):
+        chunks = split(REPLY, size)
+        assert "".join(pipeline.start().stream(chunks)) == "Hello there, world."
+
+
+def test_text_streams_before_the_reply_ends():
+    pipeline = Pipeline([DropThinking()])
+    assert pipeline.feed("<think>x</think>Hel") == "Hel"
+    assert pipeline.feed("lo <thi") == "lo "
+    assert pipeline.feed("nk>hidden") == ""
+    assert pipeline.flush() == ""
+
+
+def test_functions_and_fresh_state_per_reply():
+    template = Pipeline([DropThinking(), str.upper])
+    first = template.start()
+    assert first.feed("<think>unfinished") == ""
+    # A new reply starts outside the reasoning section
+    assert template.start().apply("hi") == "HI"
+
+
+def test_detect_json_reports_the_parsed_value():
+    pipeline = Pipeline([StripWhitespace(), DetectJSON()])
+    assert "".join(pipeline.stream([' {"a":', " [1, 2]}\n"])) == '{"a": [1, 2]}'
+    detect = pipeline.find(DetectJSON)
+    assert detect.is_json and detect.value == {"a": [1, 2]}
+    other = pipeline.start()
+    other.apply("not json")
+    detect = other.find(DetectJSON)
+    assert (detect.looks_like_json, detect.is_json) == (False, False)
+
+
+def test_wrapper_streams_and_completes_through_transforms(request):
+    url = fake.register(request.node.name, FakeOllama(reply=REPLY))
+    llm = SimpleOllamaLLM(
+        model="m", base_url=url, transforms=[DropThinking(), StripWhitespace()]
+    )
+    pieces = list(llm.stream_text("hi"))
+    assert len(pieces) > 1
+    assert "".join(pieces) == "Hello there, world."
+    assert llm.complete("hi").text == "Hello there, world."
+    assert "".join(llm.stream_text("hi", stop=[" world"])) == "Hello there,"
+
+    async def collect():
+        return [p async for p in llm.astream_text("hi")]
+
+    assert "".join(asyncio.run(collect())) == "Hello there, world."
+
+
+def test_closing_the_stream_stops_the_request(request):
+    backend = FakeOllama(reply="one two three four five six")
+    url = fake.register(request.node.name, backend)
+    stream = SimpleOllamaLLM(model="m", base_url=url).stream_text("hi")
+    assert next(stream) == "one"
+    stream.close()
+    assert backend.stats()["in_flight"] == 0
+
+
+def test_fastapi_chat_stream(monkeypatch, request):
+    url = fake.register(request.node.name, FakeOllama(reply=REPLY))
+    llm = SimpleOllamaLLM(
+        model="m", base_url=url, transforms=[DropThinking(), StripWhitespace()]
+    )
+    monkeypatch.setattr(server, "llm", llm)
+    resp = TestClient(server.app).post("/chat/stream", json={"text": "hi"})
+    assert resp.status_code == 200
+    assert resp.text == "Hello there, world."
+
+
+def test_fastapi_chat_stream_marks_a_failure_after_the_first_piece(
+    monkeypatch, request
+):
+    url = fake.register(request.node.name, FakeOllama(reply=REPLY))
+
+    class Failing(SimpleOllamaLLM):
+        def stream_text(self, *args, **kwargs):
+            yield "partial"
+            raise ConnectionError("connection reset")
+
+    monkeypatch.setattr(server, "llm", Failing(model="m", base_url=url))
+    resp = TestClient(server.app).post("/chat/stream", json={"text": "hi"})
+    assert resp.status_code == 200
+    assert resp.text == f"partial{server.STREAM_ERROR_MARKER}connection reset\n"
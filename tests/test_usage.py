@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+from langchain_ollama import ollama_wrapper
+from langchain_ollama.ollama_wrapper import OllamaLLM
+from langchain_ollama.usage import (
+    Completion,
+    QuotaExceeded,
+    SessionLimiter,
+    TokenBucket,
+    UsageTracker,
+)
+
+
+def test_complete_returns_token_counts_and_durations(monkeypatch):
+    def fake_chat(model, messages, **kwargs):
+        return {
+            "model": model,
+            "message": {"content": "Hello"},
+            "prompt_eval_count": 12,
+            "eval_count": 4,
+            "total_duration": 250_000_000,
+            "eval_duration": 80_000_000,
+        }
+
+    monkeypatch.setattr(ollama_wrapper, "FROM_OLLAMA", True)
+    monkeypatch.setattr(
+        ollama_wrapper, "ollama", type("M", (), {"chat": staticmethod(fake_chat)})
+    )
+    result = OllamaLLM(model="usage-model").complete("Hi")
+    assert result.text == "Hello"
+    assert (result.model, result.backend) == ("usage-model", "client")
+    assert (result.prompt_tokens, result.completion_tokens) == (12, 4)
+    assert result.total_tokens == 16
+    assert result.total_ms == pytest.approx(250.0)
+    assert result.eval_ms == pytest.approx(80.0)
+    assert "text" not in result.usage()
+
+
+def test_cli_completion_has_no_token_counts():
+    result = Completion.from_response("out", None, "m", "cli")
+    assert result.prompt_tokens is None
+    assert result.total_tokens == 0
+
+
+def test_usage_tracker_aggregates_per_session():
+    tracker = UsageTracker()
+    tracker.record("a", Completion("x", "m", "client", 10, 5))
+    tracker.record("a", Completion("y", "m", "client", 20, 5))
+    tracker.record("b", Completion("z", "m", "cli"))
+    assert tracker.get("a") == {
+        "requests": 2,
+        "prompt_tokens": 30,
+        "completion_tokens": 10,
+        "total_tokens": 40,
+    }
+    assert tracker.get("missing")["requests"] == 0
+    totals = tracker.totals()
+    assert (totals["sessions"], totals["requests"], totals["total_tokens"]) == (
+        2,
+        3,
+        40,
+    )
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=100.0, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert 0 < bucket.retry_after() <= 0.01
+    time.sleep(0.02)
+    assert bucket.try_acquire()
+
+
+def test_limiter_limits_request_rate_per_session():
+    limiter = SessionLimiter(requests_per_minute=60, burst=2)
+    limiter.check("heavy")
+    limiter.check("heavy")
+    with pytest.raises(QuotaExceeded) as exc:
+        limiter.check("heavy")
+    assert 0 < exc.value.retry_after <= 1.0
+    # Other sessions are unaffected
+    limiter.check("light")
+
+
+def test_limiter_enforces_token_quota_after_the_fact():
+    limiter = SessionLimiter(tokens_per_minute=100)
+    limiter.check("s")
+    limiter.charge("s", Completion("x", "m", "client", 90, 30))
+    with pytest.raises(QuotaExceeded, match="token quota"):
+        limiter.check("s")
+    limiter.check("other")
+
+
+def test_limiter_forgets_idle_sessions():
+    limiter = SessionLimiter(
+        requests_per_minute=6000, burst=1, tokens_per_minute=60, sweep_interval=0
+    )
+    for i in range(100):
+        limiter.check(f"s{i}")
+    limiter.charge("busy", Completion("x", "m", "client", 50, 50))
+    time.sleep(0.02)
+    # Every check sweeps here; only the session still in token debt stays
+    limiter.check("new")
+    assert limiter.sessions() == 2
+    with pytest.raises(QuotaExceeded):
+        limiter.check("busy")